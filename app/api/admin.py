@@ -10,6 +10,7 @@ from app.core.schenma.dashboard_schema import (
 )
 from app.core.services.mysql_service import get_mysql_service, MySQLService
 from app.api.auth import get_current_admin_user
+from app.rag.answer_cache import get_answer_cache
 import os
 import shutil
 from pathlib import Path
@@ -186,6 +187,9 @@ async def upload_document(
         # Lưu vào vector DB
         await chunker.save_document_openai(docs)
         
+        # Câu trả lời RAG đã cache có thể đã lỗi thời với tài liệu mới
+        get_answer_cache().invalidate(route="rag")
+        
         return UploadDocumentResponse(
             success=True,
             message=f"Document {file.filename} uploaded and processed successfully",
@@ -0,0 +1,208 @@
+"""
+Rate limiting and admission control for the LLM-backed endpoints
+Each authenticated user gets a token bucket per route (RATE_LIMITS); an
+empty bucket answers 429 with Retry-After. Admitted requests then share
+ADMISSION_MAX_CONCURRENT graph slots with a bounded wait queue: a full
+queue, or a wait longer than ADMISSION_QUEUE_TIMEOUT_MS, answers 503 with
+Retry-After instead of letting latency grow for everyone.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from fastapi import Depends, HTTPException, status
+
+from app.api.auth import get_current_user
+from app.core.config.config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_MS,
+    RATE_LIMIT_MAX_BUCKETS,
+    RATE_LIMITS
+)
+from app.rag.metrics import LATENCY_BUCKETS, counter, gauge, histogram
+
+# Retry-After bounds in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(min(max(math.ceil(seconds), MIN_RETRY_AFTER), MAX_RETRY_AFTER))}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take a token; 0 when one was available, otherwise seconds until the next one"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets keyed on (user_id, route), least recently used first; a
+    dropped bucket had been idle long enough to be full again or close to it
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]] = RATE_LIMITS, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.limits = dict(limits)
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[Tuple[int, str], TokenBucket]" = OrderedDict()
+        self.stats = {"allowed": 0, "limited": {}}
+
+    def check(self, user_id: int, route: str) -> float:
+        """0 when the request may go ahead, otherwise seconds to wait"""
+        key = (user_id, route)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(*self.limits[route])
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        wait = bucket.take(time.monotonic())
+        if wait:
+            self.stats["limited"][route] = self.stats["limited"].get(route, 0) + 1
+            counter("rate_limited_total", route=route).inc()
+        else:
+            self.stats["allowed"] += 1
+        return wait
+
+    def snapshot(self) -> dict:
+        return {"limits": self.limits, "buckets": len(self.buckets), **self.stats}
+
+
+class AdmissionController:
+    """
+    Concurrency cap with a bounded queue; `async with controller.slot():`
+    holds a slot. An EWMA of how long slots are held sizes Retry-After on rejection.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout_ms: float = ADMISSION_QUEUE_TIMEOUT_MS
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.hold_seconds = 2.0
+        self.in_flight_gauge = gauge("admission_in_flight")
+        self.queue_gauge = gauge("admission_queue_depth")
+        self.wait_hist = histogram("admission_wait_seconds", LATENCY_BUCKETS)
+        self.stats = {"admitted": 0, "queued": 0, "rejected": {"queue_full": 0, "queue_timeout": 0}}
+
+    def retry_after(self) -> float:
+        """Roughly when the queue ahead of a new request will have drained"""
+        return self.hold_seconds * (self.waiting + 1) / self.max_concurrent
+
+    def reject(self, reason: str):
+        self.stats["rejected"][reason] += 1
+        counter("admission_rejected_total", reason=reason).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry later",
+            headers=retry_after_header(self.retry_after())
+        )
+
+    async def acquire(self) -> float:
+        """Take a slot, waiting in the queue if needed; returns the acquire time for release()"""
+        if self.slots.locked():
+            if self.waiting >= self.max_queue:
+                self.reject("queue_full")
+            self.stats["queued"] += 1
+            self.waiting += 1
+            self.queue_gauge.set(self.waiting)
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.reject("queue_timeout")
+            finally:
+                self.waiting -= 1
+                self.queue_gauge.set(self.waiting)
+                self.wait_hist.observe(time.perf_counter() - start)
+        else:
+            await self.slots.acquire()
+        self.active += 1
+        self.in_flight_gauge.set(self.active)
+        self.stats["admitted"] += 1
+        return time.perf_counter()
+
+    def release(self, acquired_at: float):
+        self.active -= 1
+        self.in_flight_gauge.set(self.active)
+        self.slots.release()
+        self.hold_seconds = 0.9 * self.hold_seconds + 0.1 * (time.perf_counter() - acquired_at)
+
+    def slot(self) -> "_Slot":
+        return _Slot(self)
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.active,
+            "queue_depth": self.waiting,
+            "hold_seconds_ewma": round(self.hold_seconds, 3),
+            **self.stats
+        }
+
+
+class _Slot:
+    __slots__ = ("controller", "acquired_at")
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+
+    async def __aenter__(self):
+        self.acquired_at = await self.controller.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.controller.release(self.acquired_at)
+        return False
+
+
+_rate_limiter = RateLimiter()
+_admission = AdmissionController()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _rate_limiter
+
+
+def get_admission_controller() -> AdmissionController:
+    return _admission
+
+
+def rate_limited(route: str):
+    """Dependency: the authenticated user, once their bucket for `route` has a token"""
+    async def dependency(user: dict = Depends(get_current_user)) -> dict:
+        wait = _rate_limiter.check(user["user_id"], route)
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please slow down",
+                headers=retry_after_header(wait)
+            )
+        return user
+    return dependency
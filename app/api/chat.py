@@ -10,6 +10,7 @@ from app.core.schenma.chat_schema import (
 )
 from app.core.services.mysql_service import get_mysql_service, MySQLService
 from app.api.auth import get_current_user
+from app.rag.conversation_memory import get_conversation_memory
 import uuid
 
 router = APIRouter()
@@ -142,6 +143,10 @@ async def delete_session(
             detail="Session not found or already deleted"
         )
     
+    memory = get_conversation_memory()
+    if memory is not None:
+        memory.forget(user_id, session_id)
+    
     return {"success": True, "message": "Session deleted successfully"}
 
 @router.delete("/sessions")
@@ -154,6 +159,10 @@ async def delete_all_sessions(
     
     deleted_count = await db.delete_all_user_sessions(user_id)
     
+    memory = get_conversation_memory()
+    if memory is not None:
+        memory.forget(user_id)
+    
     return {
         "success": True,
         "message": f"Deleted {deleted_count} sessions",
@@ -5,3 +5,113 @@ MODEL_RERANK = "BAAI/bge-reranker-v2-m3"
 EMBEDDING_DIMS = 1024
 DEFAULT_SIMILARITY_TOP_K = 3
 
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Semantic router
+SEMANTIC_ROUTER_MIN_SCORE = 0.30   # best centroid similarity required to skip the LLM
+SEMANTIC_ROUTER_MIN_MARGIN = 0.05  # gap between best and second-best route
+
+# Semantic answer cache
+ANSWER_CACHE_THRESHOLD = 0.95      # cosine similarity for two questions to share an answer
+ANSWER_CACHE_MAX_ENTRIES = 2000
+# TTL in seconds per route; routes not listed (database) are never cached
+ANSWER_CACHE_ROUTE_TTLS = {"rag": 6 * 3600, "web_search": 10 * 60}
+
+# Query embedding cache (float32 vectors, ~4 KB each at 1024 dims)
+EMBEDDING_CACHE_MAX_ENTRIES = 5000
+
+# Shared outbound HTTP connection pools
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 30.0  # seconds
+
+# Database agent
+DB_TOOL_CONCURRENCY = 4  # read-only tool calls run in parallel up to this limit
+
+# Web search result cache (raw Serper responses, keyed on the normalized query)
+SEARCH_CACHE_TTL = 10 * 60          # seconds a result is fresh
+SEARCH_CACHE_STALE_TTL = 30 * 60    # further seconds it is served while being refreshed
+SEARCH_CACHE_MAX_ENTRIES = 1000
+SEARCH_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Web search page reader
+WEB_READER_TOP_N = 4                      # result pages fetched per answer
+WEB_READER_PAGE_TIMEOUT = 3.0             # seconds per page, including the body
+WEB_READER_MAX_PAGE_BYTES = 1024 * 1024   # larger pages are truncated
+WEB_READER_PASSAGE_WORDS = 120
+WEB_READER_MAX_REDIRECTS = 5              # hops followed per page, each target checked like the first
+WEB_CONTEXT_TOKEN_BUDGET = 1500           # tokens of ranked passages in the answer prompt
+
+# Conversation memory for /search with a session_id
+HISTORY_WINDOW_MESSAGES = 40      # newest messages loaded per request
+HISTORY_TOKEN_BUDGET = 1200       # tokens of verbatim turns in the prompt
+HISTORY_SUMMARY_TOKENS = 300      # tokens of rolling summary for older turns
+HISTORY_FOLD_MAX_MESSAGES = 100   # older messages read when a summary has to catch up
+HISTORY_MAX_SESSIONS = 1000       # sessions whose summary is cached in memory
+
+# RAG context packing
+RAG_RETRIEVAL_TOP_K = 8            # candidates retrieved; the token budget decides how many are used
+RAG_CONTEXT_TOKEN_BUDGET = 2000    # tokens of retrieved context in the RAG prompt
+RAG_DEDUP_THRESHOLD = 0.8          # word-trigram Jaccard above which two chunks are duplicates
+
+# Cross-encoder rerank (RAG_RERANK=true)
+RERANK_CANDIDATES = 30             # Qdrant candidates over-fetched for reranking
+RERANK_MAX_LENGTH = 384            # tokens per question/passage pair
+RERANK_MAX_BATCH_PAIRS = 64        # pairs scored in one inference call
+RERANK_MAX_WAIT_MS = 5             # wait for concurrent requests to join a batch
+RERANK_LATENCY_BUDGET_MS = 800     # skip reranking when the estimated wait exceeds this
+RERANK_INITIAL_MS_PER_PAIR = 15.0  # cost estimate until the first batch is measured
+
+# Multi-query retrieval (RAG_MULTI_QUERY=true)
+MULTI_QUERY_VARIANTS = 3              # paraphrases searched next to the original question
+MULTI_QUERY_TIMEOUT_MS = 1500         # give up on paraphrases after this; the original still searches
+MULTI_QUERY_CACHE_TTL = 24 * 3600     # seconds paraphrases of a question are reused
+MULTI_QUERY_CACHE_MAX_ENTRIES = 5000
+RRF_K = 60                            # reciprocal rank fusion constant
+
+# Keyword (BM25) index fused with vector search (RAG_HYBRID=true)
+SPARSE_INDEX_PATH = "data/sparse_index.json"   # relative to the project root
+BM25_K1 = 1.5
+BM25_B = 0.75
+RAG_HYBRID_ALPHA = 0.5             # weight of the vector score; 1 - alpha goes to BM25
+
+# Batch question answering (/search/batch)
+BATCH_MAX_QUESTIONS = 1000        # questions accepted per request
+BATCH_CONCURRENCY = 8             # graphs answered at once unless the request asks otherwise
+BATCH_MAX_CONCURRENCY = 32
+BATCH_EMBED_SIZE = 128            # questions per embeddings request and Qdrant batch
+
+# Request deadlines
+REQUEST_DEADLINE_MS = 20000       # end-to-end budget of one question
+ROUTING_TIMEOUT_MS = 2500         # routing defaults to RAG after this
+ANSWER_RESERVE_MS = 4000          # kept for the answer call when bounding retrieval and tool steps
+WEB_READER_MIN_REMAINING_MS = 8000  # result pages are read only with this much time left
+HISTORY_LOAD_TIMEOUT_MS = 2000    # answer without session history after this
+DEADLINE_GRACE_MS = 5000          # extra time before /search gives up on a graph that ignores its deadline
+
+# Per-user rate limits (token bucket per user and route): requests per minute, burst
+RATE_LIMITS = {
+    "search": (20, 10),
+    "search_stream": (20, 10),
+    "search_batch": (2, 2),
+    "retrieve": (60, 20),
+}
+RATE_LIMIT_MAX_BUCKETS = 20000    # idle buckets beyond this are dropped, oldest first (a full bucket again)
+
+# Admission control for the LLM-backed endpoints
+ADMISSION_MAX_CONCURRENT = 32     # graphs running at once across /search, /search/stream and /search/batch
+ADMISSION_MAX_QUEUE = 64          # requests waiting for a slot; more are shed at once with 503
+ADMISSION_QUEUE_TIMEOUT_MS = 10000  # a queued request gives up with 503 after this
+
+# Outbound OpenAI scheduler, per model (the API's limits are per model and key)
+OPENAI_RATE_LIMITS = {             # requests per minute, tokens per minute
+    "gpt-4o-mini": (500, 200000),
+    "text-embedding-3-small": (3000, 1000000),
+}
+OPENAI_BATCH_RESERVE = 0.2         # share of both budgets batch work leaves free for interactive calls
+OPENAI_BATCH_MAX_IN_FLIGHT = 16    # batch requests outstanding at once per model
+OPENAI_MAX_ATTEMPTS = 4            # tries per call when the API answers 429
+OPENAI_BACKOFF_BASE_S = 1.0        # pause after a 429 without Retry-After; doubles per retry
+OPENAI_BACKOFF_MAX_S = 30.0
+OPENAI_RECOVERY_STEP = 0.02        # budget share regained per successful call after a 429 halved it
+OPENAI_COMPLETION_TOKENS_ESTIMATE = 400  # reserved per chat call until its usage is known
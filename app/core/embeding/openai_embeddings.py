@@ -0,0 +1,164 @@
+"""
+Async helpers for OpenAI query embeddings used by the agentic pipeline
+Query embeddings go through an in-process LRU cache keyed on the model,
+dimensions and normalized text; the text sent to the API is the first
+spelling seen for a key, as the user typed it
+"""
+import asyncio
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config.config import EMBEDDING_DIMS, OPENAI_EMBEDDING_MODEL, EMBEDDING_CACHE_MAX_ENTRIES
+from app.core.services.client_registry import get_client_registry
+from app.core.services.openai_scheduler import get_openai_scheduler
+from app.rag.tokens import count_tokens
+from app.rag.tracing import call_span
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC, collapsed whitespace and case folding"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip().casefold()
+
+
+async def create_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed several texts in a single embeddings request (uncached), within the model's budget"""
+    async def send():
+        with call_span("openai", "embeddings"):
+            return await get_client_registry().openai.embeddings.create(
+                input=texts,
+                model=OPENAI_EMBEDDING_MODEL,
+                dimensions=EMBEDDING_DIMS
+            )
+    
+    response = await get_openai_scheduler(OPENAI_EMBEDDING_MODEL).submit(
+        send, sum(count_tokens(text) for text in texts), usage=lambda r: r.usage.total_tokens
+    )
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+CacheKey = Tuple[str, int, str]
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU of float32 vectors. Misses from one call are fetched in a
+    single request, and concurrent callers missing on the same key wait on
+    that request instead of issuing their own.
+    """
+
+    def __init__(
+        self,
+        fetch_fn: Callable[[List[str]], Awaitable[List[List[float]]]] = create_embeddings,
+        model: str = OPENAI_EMBEDDING_MODEL,
+        dims: int = EMBEDDING_DIMS,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES
+    ):
+        self.fetch_fn = fetch_fn
+        self.model = model
+        self.dims = dims
+        self.max_entries = max_entries
+        self.vectors: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self.inflight: Dict[CacheKey, Tuple[asyncio.Task, int]] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def key(self, text: str) -> CacheKey:
+        return (self.model, self.dims, normalize_text(text))
+
+    def _put(self, key: CacheKey, vector: np.ndarray):
+        self.vectors[key] = vector
+        self.vectors.move_to_end(key)
+        while len(self.vectors) > self.max_entries:
+            self.vectors.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def _fetch(self, keys: List[CacheKey], texts: List[str]) -> List[np.ndarray]:
+        raw = await self.fetch_fn(texts)
+        vectors = [np.asarray(vector, dtype=np.float32) for vector in raw]
+        for key, vector in zip(keys, vectors):
+            self._put(key, vector)
+        return vectors
+
+    def _start_fetch(self, missing: Dict[CacheKey, str]) -> asyncio.Task:
+        keys = list(missing)
+        task = asyncio.ensure_future(self._fetch(keys, list(missing.values())))
+        for index, key in enumerate(keys):
+            self.inflight[key] = (task, index)
+
+        def _done(t: asyncio.Task):
+            for key in keys:
+                if self.inflight.get(key, (None,))[0] is t:
+                    del self.inflight[key]
+            if not t.cancelled():
+                t.exception()  # waiters re-raise it; avoid "never retrieved" noise
+
+        task.add_done_callback(_done)
+        return task
+
+    async def get_many(self, texts: List[str]) -> List[np.ndarray]:
+        """Vectors for texts, in order"""
+        keys = [self.key(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        pending: Dict[CacheKey, Tuple[asyncio.Task, int]] = {}
+        missing: Dict[CacheKey, str] = {}  # first original text of each key, in order
+
+        for i, (key, text) in enumerate(zip(keys, texts)):
+            if key in self.vectors:
+                self.vectors.move_to_end(key)
+                results[i] = self.vectors[key]
+                self.stats["hits"] += 1
+            elif key in pending or key in missing:
+                continue
+            elif key in self.inflight:
+                pending[key] = self.inflight[key]
+                self.stats["coalesced"] += 1
+            else:
+                missing[key] = text
+                self.stats["misses"] += 1
+
+        if missing:
+            task = self._start_fetch(missing)
+            for index, key in enumerate(missing):
+                pending[key] = (task, index)
+
+        for i, key in enumerate(keys):
+            if results[i] is None:
+                task, index = pending[key]
+                # shield so a cancelled caller does not cancel a fetch others wait on
+                results[i] = (await asyncio.shield(task))[index]
+        return results
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "entries": len(self.vectors),
+            "bytes": sum(vector.nbytes for vector in self.vectors.values()),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
+
+
+# Global cache instance
+_embedding_cache: Optional[EmbeddingCache] = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create embedding cache instance"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
+
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed several texts, fetching only cache misses in one request"""
+    return [vector.tolist() for vector in await get_embedding_cache().get_many(texts)]
+
+
+async def embed_query(text: str) -> List[float]:
+    """Embed a single question"""
+    return (await embed_texts([text]))[0]
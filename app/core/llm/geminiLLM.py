@@ -20,8 +20,8 @@ class GeminiLLM:
         """
         response = self.generate_content(prompt)
         
-        # Xu ly query sau khi generative 
-        response = [line.strip("-").strip() for line in response.strip().strip("/n") if line.strip()]
+        # Xu ly query sau khi generative: moi dong mot cau hoi
+        response = [line.strip().lstrip("-*•").strip() for line in response.strip().splitlines() if line.strip()]
 
         return response[:n_variants]
     
\ No newline at end of file
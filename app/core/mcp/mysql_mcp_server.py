@@ -6,8 +6,10 @@ from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import os
-import mysql.connector
-from mysql.connector import Error
+import aiomysql
+from aiomysql import Error
+
+from app.rag.tracing import traced_call
 
 load_dotenv()
 
@@ -39,21 +41,59 @@ class MySQLMCPServer:
         self.user = os.getenv("MYSQL_USER", "root")
         self.password = os.getenv("MYSQL_PASSWORD", "")
         self.database = os.getenv("MYSQL_DATABASE", "dormitory")
+        self.pool = None
+    
+    async def create_pool(self, minsize: int = 1, maxsize: int = 10):
+        """Create a connection pool reused by every tool call"""
+        if not self.pool:
+            try:
+                self.pool = await aiomysql.create_pool(
+                    host=self.host,
+                    port=self.port,
+                    user=self.user,
+                    password=self.password,
+                    db=self.database,
+                    autocommit=True,
+                    minsize=minsize,
+                    maxsize=maxsize
+                )
+            except Error as e:
+                raise RuntimeError(f"MySQL connection failed: {e}")
+    
+    async def close_pool(self):
+        """Close the connection pool"""
+        if self.pool:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
         
-    def _get_connection(self):
-        """Get MySQL connection"""
+    async def _get_connection(self):
+        """Get MySQL connection, from the pool when one was created"""
         try:
-            connection = mysql.connector.connect(
+            if self.pool:
+                return await self.pool.acquire()
+            connection = await aiomysql.connect(
                 host=self.host,
                 port=self.port,
                 user=self.user,
                 password=self.password,
-                database=self.database
+                db=self.database,
+                autocommit=True
             )
             return connection
         except Error as e:
             raise RuntimeError(f"MySQL connection failed: {e}")
     
+    async def _release_connection(self, conn):
+        """Return a connection to the pool, or close it"""
+        if conn.get_transaction_status():
+            # e.g. an early return inside a write transaction
+            await conn.rollback()
+        if self.pool:
+            self.pool.release(conn)
+        else:
+            conn.close()
+    
     def list_resources(self) -> List[MCPResource]:
         """List available MCP resources"""
         return [
@@ -130,7 +170,7 @@ class MySQLMCPServer:
             )
         ]
     
-    def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a tool call"""
         tool_methods = {
             "list_available_rooms": self.list_available_rooms,
@@ -144,17 +184,18 @@ class MySQLMCPServer:
             return {"ok": False, "error": f"Unknown tool: {tool_name}"}
         
         try:
-            return tool_methods[tool_name](**arguments)
+            return await tool_methods[tool_name](**arguments)
         except Exception as e:
             return {"ok": False, "error": f"Tool execution failed: {str(e)}"}
     
     # Tool implementations
-    def list_available_rooms(self) -> Dict[str, Any]:
+    @traced_call("mysql", "list_available_rooms")
+    async def list_available_rooms(self) -> Dict[str, Any]:
         """List available dormitory rooms"""
-        conn = self._get_connection()
+        conn = await self._get_connection()
         try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
+            cursor = await conn.cursor(aiomysql.DictCursor)
+            await cursor.execute("""
                 SELECT 
                     r.room_id,
                     r.building,
@@ -168,26 +209,28 @@ class MySQLMCPServer:
                 HAVING available_slots > 0
                 ORDER BY r.building, r.floor, r.room_number
             """)
-            rooms = cursor.fetchall()
+            rooms = await cursor.fetchall()
             return {"ok": True, "available_rooms": rooms, "total": len(rooms)}
         finally:
-            conn.close()
+            await self._release_connection(conn)
     
-    def add_student(self, mssv: str, ten: str, nam_sinh: int, room_id: str) -> Dict[str, Any]:
+    @traced_call("mysql", "add_student")
+    async def add_student(self, mssv: str, ten: str, nam_sinh: int, room_id: str) -> Dict[str, Any]:
         """Add a student to a dormitory room"""
-        conn = self._get_connection()
+        conn = await self._get_connection()
         try:
-            cursor = conn.cursor(dictionary=True)
+            cursor = await conn.cursor(aiomysql.DictCursor)
+            await conn.begin()
             
             # Check if room exists
-            cursor.execute("SELECT capacity FROM rooms WHERE room_id = %s", (room_id,))
-            room = cursor.fetchone()
+            await cursor.execute("SELECT capacity FROM rooms WHERE room_id = %s", (room_id,))
+            room = await cursor.fetchone()
             if not room:
                 return {"ok": False, "error": f"Room {room_id} does not exist"}
             
             # Count current students in room
-            cursor.execute("SELECT COUNT(*) as count FROM students WHERE room_id = %s", (room_id,))
-            current_count = cursor.fetchone()['count']
+            await cursor.execute("SELECT COUNT(*) as count FROM students WHERE room_id = %s", (room_id,))
+            current_count = (await cursor.fetchone())['count']
             
             # Check if room is full
             if current_count >= room['capacity']:
@@ -199,16 +242,16 @@ class MySQLMCPServer:
                 }
             
             # Check if student already exists
-            cursor.execute("SELECT mssv FROM students WHERE mssv = %s", (mssv,))
-            if cursor.fetchone():
+            await cursor.execute("SELECT mssv FROM students WHERE mssv = %s", (mssv,))
+            if await cursor.fetchone():
                 return {"ok": False, "error": f"Student with ID {mssv} already exists"}
             
             # Add student
-            cursor.execute(
+            await cursor.execute(
                 "INSERT INTO students (mssv, ten, nam_sinh, room_id) VALUES (%s, %s, %s, %s)",
                 (mssv, ten, nam_sinh, room_id)
             )
-            conn.commit()
+            await conn.commit()
             
             return {
                 "ok": True,
@@ -221,52 +264,54 @@ class MySQLMCPServer:
                 }
             }
         except Exception as e:
-            conn.rollback()
+            await conn.rollback()
             return {"ok": False, "error": str(e)}
         finally:
-            conn.close()
+            await self._release_connection(conn)
     
-    def get_student_info(self, mssv: str) -> Dict[str, Any]:
+    @traced_call("mysql", "get_student_info")
+    async def get_student_info(self, mssv: str) -> Dict[str, Any]:
         """Get student information by ID"""
-        conn = self._get_connection()
+        conn = await self._get_connection()
         try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
+            cursor = await conn.cursor(aiomysql.DictCursor)
+            await cursor.execute("""
                 SELECT s.*, r.building, r.floor, r.capacity
                 FROM students s
                 LEFT JOIN rooms r ON s.room_id = r.room_id
                 WHERE s.mssv = %s
             """, (mssv,))
-            student = cursor.fetchone()
+            student = await cursor.fetchone()
             
             if not student:
                 return {"ok": False, "error": f"Student with ID {mssv} not found"}
             
             return {"ok": True, "student": student}
         finally:
-            conn.close()
+            await self._release_connection(conn)
     
-    def get_room_info(self, room_id: str) -> Dict[str, Any]:
+    @traced_call("mysql", "get_room_info")
+    async def get_room_info(self, room_id: str) -> Dict[str, Any]:
         """Get room information and list of students"""
-        conn = self._get_connection()
+        conn = await self._get_connection()
         try:
-            cursor = conn.cursor(dictionary=True)
+            cursor = await conn.cursor(aiomysql.DictCursor)
             
             # Get room info
-            cursor.execute("SELECT * FROM rooms WHERE room_id = %s", (room_id,))
-            room = cursor.fetchone()
+            await cursor.execute("SELECT * FROM rooms WHERE room_id = %s", (room_id,))
+            room = await cursor.fetchone()
             
             if not room:
                 return {"ok": False, "error": f"Room {room_id} not found"}
             
             # Get students in room
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT mssv, ten, nam_sinh
                 FROM students
                 WHERE room_id = %s
                 ORDER BY mssv
             """, (room_id,))
-            students = cursor.fetchall()
+            students = await cursor.fetchall()
             
             return {
                 "ok": True,
@@ -276,34 +321,37 @@ class MySQLMCPServer:
                 "available_slots": room['capacity'] - len(students)
             }
         finally:
-            conn.close()
+            await self._release_connection(conn)
     
-    def remove_student(self, mssv: str) -> Dict[str, Any]:
+    @traced_call("mysql", "remove_student")
+    async def remove_student(self, mssv: str) -> Dict[str, Any]:
         """Remove a student from dormitory"""
-        conn = self._get_connection()
+        conn = await self._get_connection()
         try:
-            cursor = conn.cursor(dictionary=True)
+            cursor = await conn.cursor(aiomysql.DictCursor)
+            await conn.begin()
             
             # Check if student exists
-            cursor.execute("SELECT * FROM students WHERE mssv = %s", (mssv,))
-            student = cursor.fetchone()
+            await cursor.execute("SELECT * FROM students WHERE mssv = %s", (mssv,))
+            student = await cursor.fetchone()
             
             if not student:
                 return {"ok": False, "error": f"Student with ID {mssv} not found"}
             
             # Delete student
-            cursor.execute("DELETE FROM students WHERE mssv = %s", (mssv,))
-            conn.commit()
+            await cursor.execute("DELETE FROM students WHERE mssv = %s", (mssv,))
+            await conn.commit()
             
             return {
                 "ok": True,
-                "message": f"Successfully removed student {student['ten']} (ID: {mssv}) from room {student['room_id']}"
+                "message": f"Successfully removed student {student['ten']} (ID: {mssv}) from room {student['room_id']}",
+                "student": {"mssv": mssv, "ten": student['ten'], "room_id": student['room_id']}
             }
         except Exception as e:
-            conn.rollback()
+            await conn.rollback()
             return {"ok": False, "error": str(e)}
         finally:
-            conn.close()
+            await self._release_connection(conn)
 
 
 # Global MCP server instance
@@ -12,6 +12,10 @@ from docling.chunking import HybridChunker
 from app.core.config.config import *
 from langchain_huggingface import HuggingFaceEmbeddings
 from app.startup.startup import init_qdrant_service, get_qdrant_service
+from app.rag.sparse_index import get_sparse_index
+from app.rag.tokens import count_tokens
+from app.core.services.client_registry import get_client_registry
+from app.core.services.openai_scheduler import BATCH, get_openai_scheduler
 import uuid
 from app.core.schenma.reponse_schenma import DocumentEbedingRequest, RequestResult, ResponseStatus
 from agentscope.embedding import OpenAITextEmbedding
@@ -53,24 +57,37 @@ class SaveVectorDB():
             )
             await qdrant_service.insert_embeding(doc_request=doc)
 
+    async def embed_chunk_openai(self, content: str):
+        """Embed one chunk as batch work: it only uses OpenAI budget interactive requests leave free"""
+        # Truncate content to avoid token limit (approx 8192 tokens)
+        # 1 token ~= 4 chars, so 30000 chars is safe upper bound usually, but let's go with 25000
+        content_to_embed = content[:25000]
+
+        # Call OpenAI directly to avoid agentscope caching issues
+        async def send():
+            return await get_client_registry().openai.embeddings.create(
+                input=content_to_embed,
+                model=OPENAI_EMBEDDING_MODEL,
+                dimensions=EMBEDDING_DIMS
+            )
+        response = await get_openai_scheduler(OPENAI_EMBEDDING_MODEL).submit(
+            send, count_tokens(content_to_embed), priority=BATCH, usage=lambda r: r.usage.total_tokens
+        )
+        return response.data[0].embedding
+
     async def save_document_openai(self, texts) -> RequestResult:
-        import openai
-        client = openai.AsyncOpenAI(api_key=OPENAI_KEY_API)
+        sparse_index = get_sparse_index()
+
+        # Embed every chunk at once; the scheduler decides how many requests are in flight
+        embeddings = await asyncio.gather(
+            *(self.embed_chunk_openai(text.page_content) for text in texts), return_exceptions=True
+        )
 
         # Save vector DB
-        for i, text in enumerate(texts):
+        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
             try:
-                # Truncate content to avoid token limit (approx 8192 tokens)
-                # 1 token ~= 4 chars, so 30000 chars is safe upper bound usually, but let's go with 25000
-                content_to_embed = text.page_content[:25000]
-                
-                # Call OpenAI directly to avoid agentscope caching issues
-                response = await client.embeddings.create(
-                    input=content_to_embed,
-                    model="text-embedding-3-small",
-                    dimensions=EMBEDDING_DIMS
-                )
-                embedding = response.data[0].embedding
+                if isinstance(embedding, BaseException):
+                    raise embedding
                 print(f"DEBUG: Chunk {i} embedding length: {len(embedding)}")
 
                 doc = DocumentEbedingRequest(
@@ -78,16 +95,22 @@ class SaveVectorDB():
                     context=text.page_content, # Store full content
                     embeding=embedding,
                     chunk_id=str(i),
-                    total_chunks=len(texts)
+                    total_chunks=len(texts),
+                    source=Path(self.file_path).name
                 )
                 await qdrant_service.insert_embeding(doc_request=doc)
+                # Keyword index for hybrid retrieval
+                sparse_index.add(doc.doc_id, qdrant_service.build_payload(doc))
                 print(f"Saved chunk {i}/{len(texts)}")
             except Exception as e:
                 print(f"Error saving chunk {i}: {e}")
+        
+        sparse_index.save()
 
 async def main():
     # Re-create collection to clear old incompatible data
     await qdrant_service.delete_all_data()
+    get_sparse_index().clear()
     # Ensure collection exists
     await qdrant_service.create_collection()
     
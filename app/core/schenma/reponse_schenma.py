@@ -8,6 +8,7 @@ class DocumentEbedingRequest(BaseModel):
     embeding: List[float]
     chunk_id: Optional[str] = "0"
     total_chunks: Optional[int] = 1
+    source: Optional[str] = None  # file the chunk came from; consecutive chunk_ids are merged per source
 
 class RequestResult(BaseModel):
     request_id: str
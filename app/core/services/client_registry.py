@@ -0,0 +1,135 @@
+"""
+Process-wide registry of long-lived clients
+Started in the application startup event and closed at shutdown so every
+request reuses the same keep-alive connection pools
+"""
+import os
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+from app.core.config.config import (
+    EMBEDDING_DIMS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY
+)
+from app.core.mcp.mysql_mcp_server import get_mcp_server
+from app.core.services.serper_client import SerperClient
+from app.db.qdrant_service import QdrantService
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+class ClientRegistry:
+    """
+    Lazily creates each client on first use, so scripts that never run the
+    startup event still share one client per process; `start()` warms them
+    up and `aclose()` releases whatever was created.
+    """
+
+    def __init__(self):
+        self._openai: Optional[openai.AsyncOpenAI] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._qdrant: Optional[QdrantService] = None
+        self._serper: Optional[SerperClient] = None
+
+    @property
+    def openai(self) -> openai.AsyncOpenAI:
+        if self._openai is None:
+            self._openai = openai.AsyncOpenAI(
+                api_key=OPENAI_API_KEY,
+                http_client=openai.DefaultAsyncHttpxClient(limits=_http_limits()),
+                max_retries=0  # 429s and retries are handled by the OpenAI scheduler
+            )
+        return self._openai
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """General purpose client for third-party HTTP APIs"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=_http_limits(),
+                timeout=httpx.Timeout(15.0, connect=5.0),
+                follow_redirects=True
+            )
+        return self._http
+
+    @property
+    def qdrant(self) -> QdrantService:
+        """QdrantService for the knowledge base collection"""
+        if self._qdrant is None:
+            url = urlparse(QDRANT_URL)
+            self._qdrant = QdrantService(
+                embedding_dims=EMBEDDING_DIMS,
+                host=url.hostname or "localhost",
+                port=url.port or 6333,
+                collection_name="documents",
+                prefer_grpc=QDRANT_PREFER_GRPC,
+                grpc_port=QDRANT_GRPC_PORT,
+                # the async REST client disables keep-alive unless given limits
+                limits=_http_limits()
+            )
+        return self._qdrant
+
+    @property
+    def serper(self) -> SerperClient:
+        if self._serper is None:
+            self._serper = SerperClient(self.http)
+        return self._serper
+
+    async def start(self):
+        """Create every client and the MySQL tool pool up front"""
+        for name in ("openai", "http", "qdrant", "serper"):
+            getattr(self, name)
+        try:
+            await get_mcp_server().create_pool()
+        except Exception as e:
+            # Tools fall back to one connection per call
+            print(f"MCP MySQL pool unavailable: {e}")
+
+    async def aclose(self):
+        """Close every client that was created"""
+        if self._qdrant is not None:
+            await self._qdrant.close()
+        if self._openai is not None:
+            await self._openai.close()
+        if self._http is not None:
+            await self._http.aclose()
+        await get_mcp_server().close_pool()
+        self._openai = self._http = self._qdrant = self._serper = None
+
+
+# Global registry instance
+_client_registry: Optional[ClientRegistry] = None
+
+def get_client_registry() -> ClientRegistry:
+    """Get or create client registry instance"""
+    global _client_registry
+    if _client_registry is None:
+        _client_registry = ClientRegistry()
+    return _client_registry
+
+async def init_client_registry():
+    """Initialize shared clients"""
+    await get_client_registry().start()
+
+async def close_client_registry():
+    """Close shared clients"""
+    await get_client_registry().aclose()
@@ -3,6 +3,7 @@ from typing import Optional, List, Dict, Any
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from app.rag.tracing import traced_call
 
 load_dotenv()
 
@@ -37,6 +38,7 @@ class MySQLService:
             self.pool.close()
             await self.pool.wait_closed()
     
+    @traced_call("mysql", "query")
     async def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
         """Execute SELECT query và trả về kết quả"""
         await self.create_pool()
@@ -46,6 +48,7 @@ class MySQLService:
                 result = await cursor.fetchall()
                 return result
     
+    @traced_call("mysql", "update")
     async def execute_update(self, query: str, params: tuple = None) -> int:
         """Execute INSERT/UPDATE/DELETE query và trả về số rows affected"""
         await self.create_pool()
@@ -55,6 +58,7 @@ class MySQLService:
                 await conn.commit()
                 return cursor.rowcount
     
+    @traced_call("mysql", "insert")
     async def execute_insert(self, query: str, params: tuple = None) -> int:
         """Execute INSERT query và trả về last insert id"""
         await self.create_pool()
@@ -195,6 +199,38 @@ class MySQLService:
         """
         return await self.execute_query(query, (session_id, user_id))
     
+    async def get_recent_session_messages(
+        self,
+        session_id: str,
+        user_id: int,
+        limit: int,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Lấy tối đa `limit` messages mới nhất của session (cũ -> mới), phân trang
+        theo message_id (keyset) để chi phí không phụ thuộc độ dài session
+        """
+        conditions = ["cm.session_id = %s", "cs.user_id = %s", "cs.is_deleted = FALSE"]
+        params: list = [session_id, user_id]
+        if before_id is not None:
+            conditions.append("cm.message_id < %s")
+            params.append(before_id)
+        if after_id is not None:
+            conditions.append("cm.message_id > %s")
+            params.append(after_id)
+        query = f"""
+            SELECT cm.message_id, cm.role, cm.content
+            FROM chat_messages cm
+            JOIN chat_sessions cs ON cm.session_id = cs.session_id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY cm.message_id DESC
+            LIMIT %s
+        """
+        params.append(limit)
+        rows = await self.execute_query(query, tuple(params))
+        return list(reversed(rows))
+    
     async def save_chat_message(self, session_id: str, role: str, content: str) -> bool:
         """Lưu một message vào session"""
         query = """
@@ -0,0 +1,309 @@
+"""
+Shared scheduler for outbound OpenAI requests
+One scheduler per model keeps the process inside that model's
+requests-per-minute and tokens-per-minute limits. Interactive calls (chat,
+query embeddings) are served before batch work (document ingestion,
+/search/batch), and batch work only uses what is left above a reserve, so
+an arriving chat request never waits behind it. A 429 pauses the model,
+halves its budget and retries; successful calls win the budget back.
+Clients are built with max_retries=0 so that the retries, and the 429s,
+go through here.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import openai
+
+from app.core.config.config import (
+    OPENAI_BACKOFF_BASE_S,
+    OPENAI_BACKOFF_MAX_S,
+    OPENAI_BATCH_MAX_IN_FLIGHT,
+    OPENAI_BATCH_RESERVE,
+    OPENAI_MAX_ATTEMPTS,
+    OPENAI_RATE_LIMITS,
+    OPENAI_RECOVERY_STEP
+)
+from app.rag.metrics import LATENCY_BUCKETS, counter, gauge, histogram
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Priority of the OpenAI calls made in the current task; batch code paths set BATCH
+priority_var: ContextVar[int] = ContextVar("openai_priority", default=INTERACTIVE)
+
+# Pace OpenAI calls within OPENAI_RATE_LIMITS; off sends them straight out (benchmarks against stand-ins)
+OPENAI_SCHEDULER = os.getenv("OPENAI_SCHEDULER", "true").lower() == "true"
+
+# Lowest share of the configured budget a run of 429s can leave
+MIN_RATE_SCALE = 0.1
+
+T = TypeVar("T")
+
+
+def retry_after_seconds(error: openai.RateLimitError) -> Optional[float]:
+    """Back-off the API asked for, from retry-after-ms or retry-after"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class _Waiter:
+    __slots__ = ("tokens", "priority", "future", "enqueued")
+
+    def __init__(self, tokens: int, priority: int, future: asyncio.Future):
+        self.tokens = tokens
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class OpenAIScheduler:
+    """
+    Two continuously refilled budgets (requests and tokens, each holding at
+    most one minute's worth) and a priority queue of waiting calls. The
+    head of the queue is granted as soon as both budgets cover it; batch
+    calls additionally leave `batch_reserve` of each budget untouched and
+    have at most `batch_max_in_flight` requests outstanding. A disabled
+    scheduler sends every call at once and leaves retries to the caller.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        rpm: float,
+        tpm: float,
+        batch_reserve: float = OPENAI_BATCH_RESERVE,
+        batch_max_in_flight: int = OPENAI_BATCH_MAX_IN_FLIGHT,
+        max_attempts: int = OPENAI_MAX_ATTEMPTS,
+        clock: Callable[[], float] = time.monotonic,
+        enabled: bool = True
+    ):
+        self.model = model
+        self.enabled = enabled
+        self.rpm = rpm
+        self.tpm = tpm
+        self.batch_reserve = batch_reserve
+        self.batch_max_in_flight = batch_max_in_flight
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = clock()
+        self.rate_scale = 1.0
+        self.paused_until = 0.0
+        self.batch_in_flight = 0
+        self.queue: List[Tuple[int, int, _Waiter]] = []
+        self.sequence = itertools.count()
+        self.pump: Optional[asyncio.Task] = None
+        self.wake: Optional[asyncio.Event] = None
+        self.queue_gauges = {p: gauge("openai_queue_depth", model=model, priority=name)
+                             for p, name in PRIORITY_NAMES.items()}
+        self.wait_hists = {p: histogram("openai_queue_wait_seconds", LATENCY_BUCKETS, model=model, priority=name)
+                           for p, name in PRIORITY_NAMES.items()}
+        self.stats = {"granted": {"interactive": 0, "batch": 0}, "queued": {"interactive": 0, "batch": 0},
+                      "rate_limited": 0, "retries": 0, "tokens_reserved": 0, "tokens_used": 0}
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm * self.rate_scale / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm * self.rate_scale / 60)
+
+    def _cost(self, tokens: int) -> int:
+        # a call larger than the budget batch work may use still goes through, on a full budget
+        return min(tokens, int(self.tpm * (1 - self.batch_reserve)))
+
+    def _fits(self, waiter: _Waiter) -> bool:
+        if self.clock() < self.paused_until:
+            return False
+        if waiter.priority == INTERACTIVE:
+            return self.requests >= 1 and self.tokens >= self._cost(waiter.tokens)
+        if self.batch_in_flight >= self.batch_max_in_flight:
+            return False
+        return (self.requests - 1 >= self.batch_reserve * self.rpm
+                and self.tokens - self._cost(waiter.tokens) >= self.batch_reserve * self.tpm)
+
+    def _seconds_until_fits(self, waiter: _Waiter) -> Optional[float]:
+        """Time for the budgets to refill enough for `waiter`; None when only a release can help"""
+        if waiter.priority == BATCH and self.batch_in_flight >= self.batch_max_in_flight:
+            return None
+        reserve = self.batch_reserve if waiter.priority == BATCH else 0.0
+        needed_requests = 1 + reserve * self.rpm - self.requests
+        needed_tokens = self._cost(waiter.tokens) + reserve * self.tpm - self.tokens
+        wait = max(needed_requests * 60 / (self.rpm * self.rate_scale),
+                   needed_tokens * 60 / (self.tpm * self.rate_scale), 0.0)
+        return max(wait, self.paused_until - self.clock(), 0.001)
+
+    def _grant(self, waiter: _Waiter):
+        self.requests -= 1
+        self.tokens -= self._cost(waiter.tokens)
+        self.stats["tokens_reserved"] += waiter.tokens
+        if waiter.priority == BATCH:
+            self.batch_in_flight += 1
+        self.stats["granted"][PRIORITY_NAMES[waiter.priority]] += 1
+
+    def _set_queue_gauges(self):
+        depth = {p: 0 for p in PRIORITY_NAMES}
+        for _, _, waiter in self.queue:
+            depth[waiter.priority] += 1
+        for p, g in self.queue_gauges.items():
+            g.set(depth[p])
+
+    async def _run_pump(self):
+        """Grant queued calls in priority order as the budgets allow"""
+        while self.queue:
+            self._refill()
+            _, _, head = self.queue[0]
+            if head.future.done():  # cancelled while waiting
+                heapq.heappop(self.queue)
+                self._set_queue_gauges()
+                continue
+            if self._fits(head):
+                heapq.heappop(self.queue)
+                self._grant(head)
+                self.wait_hists[head.priority].observe(time.perf_counter() - head.enqueued)
+                head.future.set_result(None)
+                self._set_queue_gauges()
+                continue
+            # sleep until the budget refills, or until an arrival or a release changes the picture
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), self._seconds_until_fits(head))
+            except asyncio.TimeoutError:
+                pass
+        self.pump = None
+
+    def _notify(self):
+        if self.queue and (self.pump is None or self.pump.done()):
+            # created with the pump, so the event belongs to the running loop
+            self.wake = asyncio.Event()
+            self.pump = asyncio.ensure_future(self._run_pump())
+        elif self.wake is not None:
+            self.wake.set()
+
+    async def acquire(self, tokens: int, priority: int):
+        """Wait until the call may be sent"""
+        waiter = _Waiter(tokens, priority, asyncio.get_running_loop().create_future())
+        self._refill()
+        # nothing of equal or higher priority is waiting and the budget is there: go at once
+        if not any(w.priority <= priority for _, _, w in self.queue) and self._fits(waiter):
+            self._grant(waiter)
+            return
+        self.stats["queued"][PRIORITY_NAMES[priority]] += 1
+        heapq.heappush(self.queue, (priority, next(self.sequence), waiter))
+        self._set_queue_gauges()
+        self._notify()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(priority, tokens)  # granted just as the caller gave up
+            raise
+
+    def release(self, priority: int, reserved: int, used: Optional[int] = None):
+        """The call finished; correct the token budget by what it actually used"""
+        if priority == BATCH:
+            self.batch_in_flight -= 1
+        if used is not None:
+            self.stats["tokens_used"] += used
+            self.tokens = min(self.tpm, self.tokens + self._cost(reserved) - used)
+        self._notify()
+
+    def rate_limited(self, attempt: int, retry_after: Optional[float]):
+        """A 429: pause the model, halve its budget and drop what had been refilled"""
+        self.stats["rate_limited"] += 1
+        counter("openai_rate_limited_total", model=self.model).inc()
+        if retry_after is None:
+            retry_after = min(OPENAI_BACKOFF_BASE_S * 2 ** attempt, OPENAI_BACKOFF_MAX_S)
+            retry_after *= random.uniform(0.8, 1.2)
+        self.paused_until = max(self.paused_until, self.clock() + retry_after)
+        self.rate_scale = max(self.rate_scale / 2, MIN_RATE_SCALE)
+        self._refill()
+        self.requests = min(self.requests, 0.0)
+        self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        self.rate_scale = min(self.rate_scale + OPENAI_RECOVERY_STEP, 1.0)
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[T]],
+        tokens: int,
+        priority: Optional[int] = None,
+        usage: Optional[Callable[[T], Optional[int]]] = None
+    ) -> T:
+        """
+        Send `call()` within the budgets, retrying on 429 and on transient
+        connection or server errors. `tokens` is the estimate reserved up
+        front; `usage(result)` gives the real count.
+        """
+        if not self.enabled:
+            return await call()
+        priority = priority_var.get() if priority is None else priority
+        attempt = 0
+        while True:
+            await self.acquire(tokens, priority)
+            used = None
+            try:
+                result = await call()
+                used = usage(result) if usage is not None else None
+                self.succeeded()
+                return result
+            except openai.RateLimitError as e:
+                self.rate_limited(attempt, retry_after_seconds(e))
+                # an exhausted quota does not come back by waiting
+                if attempt + 1 >= self.max_attempts or getattr(e, "code", None) == "insufficient_quota":
+                    raise
+            except (openai.APIConnectionError, openai.InternalServerError):
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                backoff = min(OPENAI_BACKOFF_BASE_S * 2 ** attempt, OPENAI_BACKOFF_MAX_S) / 2
+                await asyncio.sleep(backoff * random.uniform(0.8, 1.2))
+            finally:
+                self.release(priority, tokens, used)
+            attempt += 1
+            self.stats["retries"] += 1
+
+    def snapshot(self) -> dict:
+        self._refill()
+        return {
+            "enabled": self.enabled,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "rate_scale": round(self.rate_scale, 3),
+            "requests_available": round(self.requests, 1),
+            "tokens_available": round(self.tokens),
+            "paused_for_s": round(max(self.paused_until - self.clock(), 0.0), 3),
+            "queue_depth": len(self.queue),
+            "batch_in_flight": self.batch_in_flight,
+            **self.stats
+        }
+
+
+_schedulers: Dict[str, OpenAIScheduler] = {}
+
+
+def get_openai_scheduler(model: str) -> OpenAIScheduler:
+    """Scheduler of one model, with the limits in OPENAI_RATE_LIMITS"""
+    if model not in _schedulers:
+        rpm, tpm = OPENAI_RATE_LIMITS[model]
+        _schedulers[model] = OpenAIScheduler(model, rpm, tpm, enabled=OPENAI_SCHEDULER)
+    return _schedulers[model]
+
+
+def schedulers_snapshot() -> Dict[str, dict]:
+    return {model: scheduler.snapshot() for model, scheduler in _schedulers.items()}
@@ -0,0 +1,83 @@
+"""
+Async Google Serper API client on a shared, pooled httpx client
+"""
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from app.rag.tracing import traced_call
+
+load_dotenv()
+
+SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev")
+
+
+class SerperClient:
+    """Calls the Serper search endpoint and formats results like GoogleSerperAPIWrapper.run"""
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        api_key: Optional[str] = SERPER_API_KEY,
+        base_url: str = SERPER_URL,
+        k: int = 10,
+        gl: str = "us",
+        hl: str = "en"
+    ):
+        self.http_client = http_client
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.k = k
+        self.gl = gl
+        self.hl = hl
+
+    @traced_call("serper", "search")
+    async def search(self, query: str) -> Dict[str, Any]:
+        """Raw Serper response"""
+        response = await self.http_client.post(
+            f"{self.base_url}/search",
+            headers={"X-API-KEY": self.api_key or "", "Content-Type": "application/json"},
+            json={"q": query, "gl": self.gl, "hl": self.hl, "num": self.k}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def format_results(results: Dict[str, Any], k: int = 10) -> str:
+        """Summarize a Serper response into one string"""
+        snippets = []
+
+        answer_box = results.get("answerBox") or {}
+        if answer_box.get("answer"):
+            return answer_box["answer"]
+        if answer_box.get("snippet"):
+            return answer_box["snippet"].replace("\n", " ")
+        if answer_box.get("snippetHighlighted"):
+            return answer_box["snippetHighlighted"]
+
+        knowledge_graph = results.get("knowledgeGraph") or {}
+        title = knowledge_graph.get("title")
+        if title:
+            if knowledge_graph.get("type"):
+                snippets.append(f"{title}: {knowledge_graph['type']}.")
+            if knowledge_graph.get("description"):
+                snippets.append(knowledge_graph["description"])
+            for attribute, value in (knowledge_graph.get("attributes") or {}).items():
+                snippets.append(f"{title} {attribute}: {value}.")
+
+        for result in (results.get("organic") or [])[:k]:
+            if "snippet" in result:
+                snippets.append(result["snippet"])
+            for attribute, value in (result.get("attributes") or {}).items():
+                snippets.append(f"{attribute}: {value}.")
+
+        if not snippets:
+            return "No good Google Search Result was found"
+        return " ".join(snippets)
+
+    async def run(self, query: str) -> str:
+        """Search and return the formatted summary"""
+        return self.format_results(await self.search(query), self.k)
@@ -0,0 +1,139 @@
+"""
+Async TTL cache with single-flight loading and stale-while-revalidate
+Used for third-party API results that many requests ask for at once
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until", "size")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float, size: int):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.size = size
+
+
+class AsyncTTLCache:
+    """
+    Bounded LRU whose entries are fresh for `ttl` seconds and then served
+    stale for up to `stale_ttl` more seconds while one background load
+    refreshes them. Concurrent misses on the same key share one load;
+    failed loads are not cached.
+
+    Memory is bounded by `max_entries` and, when `sizeof` is given, by the
+    summed `sizeof(value)` of all entries (`max_bytes`).
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.clock = clock
+        self.entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+        self.bytes = 0
+        self.stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+            "loads": 0, "load_failures": 0, "evictions": 0
+        }
+
+    def _put(self, key: Hashable, value: Any, ttl: float):
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else; just don't cache it
+        self._drop(key)
+        now = self.clock()
+        self.entries[key] = _Entry(value, now + ttl, now + ttl + self.stale_ttl, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            _, entry = self.entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.stats["evictions"] += 1
+
+    def _drop(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        self.stats["loads"] += 1
+        try:
+            value = await loader()
+        except Exception:
+            self.stats["load_failures"] += 1
+            raise
+        self._put(key, value, ttl)
+        return value
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float) -> asyncio.Task:
+        task = asyncio.ensure_future(self._load(key, loader, ttl))
+        self.inflight[key] = task
+
+        def _done(t: asyncio.Task):
+            if self.inflight.get(key) is t:
+                del self.inflight[key]
+            if not t.cancelled():
+                t.exception()  # waiters re-raise it; background refreshes just keep the stale value
+
+        task.add_done_callback(_done)
+        return task
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        """Cached value for key, calling `loader()` at most once at a time per key"""
+        ttl = self.ttl if ttl is None else ttl
+        now = self.clock()
+
+        entry = self.entries.get(key)
+        if entry is not None and now < entry.stale_until:
+            self.entries.move_to_end(key)
+            if now < entry.fresh_until:
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale_hits"] += 1
+                if key not in self.inflight:
+                    self._start_load(key, loader, ttl)
+            return entry.value
+
+        if entry is not None:
+            self._drop(key)
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = self._start_load(key, loader, ttl)
+        # shield so a cancelled caller does not cancel a load others wait on
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything"""
+        if key is None:
+            self.entries.clear()
+            self.bytes = 0
+        else:
+            self._drop(key)
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hit_rate": (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0
+        }
@@ -1,9 +1,10 @@
 from fastapi import HTTPException
 from qdrant_client import AsyncQdrantClient
-from qdrant_client.models import PointStruct, VectorParams, Distance
-from qdrant_client.http.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import PointStruct, VectorParams, Distance, PayloadSchemaType, QueryRequest, SearchParams
+from qdrant_client.http.models import Filter, FieldCondition, MatchAny, MatchValue
 from app.core.schenma.reponse_schenma import * 
 from app.core.vector_strore.base_vectorDB import VectorStore
+from app.rag.tracing import traced_call
 import uuid
 
 
@@ -14,10 +15,14 @@ class QdrantService(VectorStore):
         host: str = "localhost",
         port: int = 6333,
         collection_name: str = "documents",
-        distance: Distance = Distance.COSINE
+        distance: Distance = Distance.COSINE,
+        prefer_grpc: bool = False,
+        grpc_port: int = 6334,
+        **client_kwargs
         ):
         super().__init__(embedding_dims = embedding_dims)
-        self.client = AsyncQdrantClient(host=host, port=port)
+        # client_kwargs go to AsyncQdrantClient, e.g. `limits` for REST keep-alive
+        self.client = AsyncQdrantClient(host=host, port=port, grpc_port=grpc_port, prefer_grpc=prefer_grpc, **client_kwargs)
         self.collection_name = collection_name
         self.distance_metric = distance
     
@@ -30,6 +35,15 @@ class QdrantService(VectorStore):
                     distance=self.distance_metric
                 )
             )
+        await self.create_doc_id_index()
+    
+    async def create_doc_id_index(self):
+        """Keyword index on doc_id, so lookups by doc_id do not scan the collection (idempotent)"""
+        await self.client.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="doc_id",
+            field_schema=PayloadSchemaType.KEYWORD
+        )
     
     def validate_embeding(self, embeding: List[float]):
         if len(embeding) != self.embedding_dims:
@@ -38,6 +52,18 @@ class QdrantService(VectorStore):
                 detail=f"Embeding size must be{self.embedding_dims}, got {len(embeding)}"
             )
     
+    @staticmethod
+    def build_payload(doc_request: DocumentEbedingRequest) -> dict:
+        return {
+            "doc_id": doc_request.doc_id,
+            "content": doc_request.context,
+            "chunk_id": doc_request.chunk_id,
+            "total_chunks": doc_request.total_chunks,
+            "source": doc_request.source,
+            # "metadata": doc_request.metadata
+        }
+    
+    @traced_call("qdrant", "upsert")
     async def insert_embeding(self, doc_request: DocumentEbedingRequest) -> RequestResult:
         self.validate_embeding(doc_request.embeding)
         
@@ -47,13 +73,7 @@ class QdrantService(VectorStore):
                 detail=f"Document with id {doc_request.doc_id} already exists."
             )
             
-        payload = {
-            "doc_id": doc_request.doc_id,
-            "content": doc_request.context,
-            "chunk_id": doc_request.chunk_id,
-            "total_chunks": doc_request.total_chunks,
-            # "metadata": doc_request.metadata
-        }
+        payload = self.build_payload(doc_request)
         
         point = PointStruct(
             id = str(uuid.uuid4()),
@@ -155,29 +175,54 @@ class QdrantService(VectorStore):
             data=point.payload
         )
     
-    async def retrieve_points(self, embedding: List[float], similarity_top_k: int = 3) -> List[RetrivalResuult]:
+    @staticmethod
+    def search_params(hnsw_ef: Optional[int] = None, exact: bool = False) -> Optional[SearchParams]:
+        """HNSW beam width (the collection default when None), or exact search when `exact`"""
+        if hnsw_ef is None and not exact:
+            return None
+        return SearchParams(hnsw_ef=hnsw_ef, exact=exact)
+    
+    @traced_call("qdrant", "search")
+    async def retrieve_points(
+        self,
+        embedding: List[float],
+        similarity_top_k: int = 3,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False
+    ) -> List[RetrivalResuult]:
         self.validate_embeding(embedding)
 
-        results = await self.client.search(
+        response = await self.client.query_points(
             collection_name=self.collection_name,
-            query_vector=embedding,
-            limit=similarity_top_k
+            query=embedding,
+            limit=similarity_top_k,
+            search_params=self.search_params(hnsw_ef, exact),
+            with_payload=True
         )
         
         return [RetrivalResuult(scorce=result.score, payload=result.payload)
-                for result in results
+                for result in response.points
         ]
         
-    async def batch_retrieve(self, embeddings: List[List[float]], top_k: int = 3) -> List[List[RetrivalResuult]]:
+    @traced_call("qdrant", "batch_search")
+    async def batch_retrieve(
+        self,
+        embeddings: List[List[float]],
+        top_k: int = 3,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False
+    ) -> List[List[RetrivalResuult]]:
         for emb in embeddings:
             self.validate_embeding(emb)
         
-        requests = [{"vector": vector, "limit": top_k} for vector in embeddings]
+        params = self.search_params(hnsw_ef, exact)
+        requests = [QueryRequest(query=vector, limit=top_k, params=params, with_payload=True) for vector in embeddings]
         
-        results = await self.client.search_batch(
+        responses = await self.client.query_batch_points(
             collection_name=self.collection_name,
             requests=requests
         )
+        results = [response.points for response in responses]
         
         return [
             [
@@ -189,6 +234,44 @@ class QdrantService(VectorStore):
             for group in results 
         ]
     
+    @traced_call("qdrant", "get_payloads")
+    async def get_payloads(self, doc_ids: List[str]) -> Dict[str, dict]:
+        """Payloads of the given chunks keyed by doc_id; ids not in the collection are left out"""
+        if not doc_ids:
+            return {}
+        points, _ = await self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=Filter(must=[FieldCondition(key="doc_id", match=MatchAny(any=list(doc_ids)))]),
+            limit=len(doc_ids),
+            with_payload=True,
+            with_vectors=False
+        )
+        return {point.payload["doc_id"]: point.payload for point in points if point.payload}
+    
+    async def count_points(self) -> int:
+        if not await self.client.collection_exists(self.collection_name):
+            return 0
+        response = await self.client.count(collection_name=self.collection_name, exact=True)
+        return response.count
+    
+    async def iter_payloads(self, batch_size: int = 256):
+        """Payloads of every point in the collection, page by page"""
+        if not await self.client.collection_exists(self.collection_name):
+            return
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                offset=offset,
+                limit=batch_size,
+                with_payload=True,
+                with_vectors=False
+            )
+            for point in points:
+                yield point.payload or {}
+            if offset is None:
+                break
+    
     async def get_all_documents(self) -> List[Dict]:
         results = []
         collections_response = await self.client.get_collection()
@@ -217,4 +300,5 @@ class QdrantService(VectorStore):
         
         return results
     
-    
+    async def close(self):
+        await self.client.close()
@@ -12,9 +12,12 @@ if str(project_root) not in sys.path:
 
 import os
 import json
-import openai
-from typing import TypedDict, Annotated, Literal
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import TypedDict, Annotated, Literal, AsyncIterator, Optional, List
 from dotenv import load_dotenv
+import openai
 
 # LangGraph imports
 from langgraph.graph import StateGraph, END
@@ -24,17 +27,68 @@ from langgraph.prebuilt import ToolNode
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.tools import tool
-from langchain_community.utilities import GoogleSerperAPIWrapper
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
 
 # FastAPI
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 # Local imports
+from app.api.admission import get_admission_controller, get_rate_limiter, rate_limited
 from app.core.mcp.mysql_mcp_server import get_mcp_server
-from app.core.config.config import EMBEDDING_DIMS
+from app.core.services.client_registry import get_client_registry
+from app.core.services.ttl_cache import AsyncTTLCache
+from app.core.config.config import (
+    EMBEDDING_DIMS,
+    DB_TOOL_CONCURRENCY,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_STALE_TTL,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_MAX_BYTES,
+    HISTORY_SUMMARY_TOKENS,
+    RAG_RETRIEVAL_TOP_K,
+    RERANK_CANDIDATES,
+    RAG_HYBRID_ALPHA,
+    BATCH_MAX_QUESTIONS,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_CONCURRENCY,
+    BATCH_EMBED_SIZE,
+    RERANK_LATENCY_BUDGET_MS,
+    ROUTING_TIMEOUT_MS,
+    ANSWER_RESERVE_MS,
+    WEB_READER_MIN_REMAINING_MS,
+    HISTORY_LOAD_TIMEOUT_MS,
+    DEADLINE_GRACE_MS,
+    OPENAI_COMPLETION_TOKENS_ESTIMATE
+)
+from app.core.services.openai_scheduler import BATCH, get_openai_scheduler, priority_var, schedulers_snapshot
+from app.core.embeding.openai_embeddings import embed_query, embed_texts, get_embedding_cache, normalize_text
+from app.rag.semantic_router import get_semantic_router
+from app.rag.answer_cache import get_answer_cache, CachedAnswer
+from app.rag.db_templates import render_tool_results
+from app.rag.db_fast_path import MUTATION, plan_tool_calls
+from app.rag.coalescing import QuestionCoalescer, coalescing_key
+from app.rag.web_reader import build_web_context, reader_stats
+from app.rag.conversation_memory import init_conversation_memory
+from app.rag.tokens import count_tokens, truncate_to_tokens
+from app.rag.context_packer import pack_context, packing_stats
+from app.rag.metrics import counter, histogram, histograms_snapshot
+from app.rag.tracing import call_span, traced_node
+from app.rag.rerank import get_reranker
+from app.rag.multi_query import QueryExpander, rrf_fuse
+from app.rag.sparse_index import get_sparse_index, hybrid_fuse, combine, SEARCH_METHODS
+from app.rag.deadline import (
+    TIMEOUT_ANSWER,
+    deadline_stats,
+    new_deadline,
+    remaining,
+    time_slice,
+    record_exceeded,
+    record_degraded
+)
 
 # Schema imports
 from app.core.schenma.reponse_schenma import *
@@ -49,10 +103,34 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+# Start the RAG retrieval while routing is still in flight
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+# Reuse answers of semantically identical questions
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "true").lower() == "true"
+# Render structured database tool results from templates instead of a second LLM call
+DB_TEMPLATE_ANSWERS = os.getenv("DB_TEMPLATE_ANSWERS", "true").lower() == "true"
+# Call the MySQL tools directly for recognized room IDs / MSSVs, skipping routing and tool selection
+DB_FAST_PATH = os.getenv("DB_FAST_PATH", "true").lower() == "true"
+# Read the top result pages and keep the best passages instead of the Serper summary
+WEB_PAGE_READER = os.getenv("WEB_PAGE_READER", "true").lower() == "true"
+# Over-fetch candidates and rerank them with the CPU cross-encoder (MODEL_RERANK)
+RAG_RERANK = os.getenv("RAG_RERANK", "false").lower() == "true"
+# Search LLM paraphrases of the question too and fuse the results (RRF)
+RAG_MULTI_QUERY = os.getenv("RAG_MULTI_QUERY", "false").lower() == "true"
+# Fuse BM25 keyword scores into RAG retrieval (exact terms like "điều 12" or room codes)
+RAG_HYBRID = os.getenv("RAG_HYBRID", "true").lower() == "true"
+# Latency histograms and error counters per graph node (/metrics)
+TRACING = os.getenv("TRACING", "true").lower() == "true"
+# Let concurrent /search requests for the same question and context share one graph execution
+QUESTION_COALESCING = os.getenv("QUESTION_COALESCING", "true").lower() == "true"
 
 # Initialize router
 app = APIRouter()
 
+# Tag attached to the LLM calls that produce the user-facing answer, so the
+# streaming endpoint can forward their tokens and ignore routing/tool calls
+ANSWER_TAG = "final_answer"
+
 
 # ============================================================================
 # State Definition
@@ -66,6 +144,15 @@ class AgentState(TypedDict):
     context: str
     answer: str
     error: str
+    query_embedding: list  # shared by the semantic router and rag_agent
+    retrieved: Optional[list]  # speculative retrieval results for rag_agent
+    planned_tool_calls: Optional[list]  # database tool calls from the fast path
+    started_at: float  # perf_counter() when the request entered the graph
+    deadline: float  # perf_counter() by which the answer is due
+    history: list  # recent session turns within the token budget, oldest first
+    summary: str  # rolling summary of older session turns
+    mutated: bool  # a database write ran during this execution
+    cache_generation: Optional[int]  # answer cache generation when the lookup ran
 
 
 # ============================================================================
@@ -76,12 +163,12 @@ class AgentState(TypedDict):
 mcp_server = get_mcp_server()
 
 @tool
-def list_available_rooms() -> dict:
+async def list_available_rooms() -> dict:
     """List all available dormitory rooms with vacancy information"""
-    return mcp_server.list_available_rooms()
+    return await mcp_server.list_available_rooms()
 
 @tool
-def add_student(mssv: str, ten: str, nam_sinh: int, room_id: str) -> dict:
+async def add_student(mssv: str, ten: str, nam_sinh: int, room_id: str) -> dict:
     """
     Add a new student to a dormitory room
     
@@ -91,41 +178,72 @@ def add_student(mssv: str, ten: str, nam_sinh: int, room_id: str) -> dict:
         nam_sinh: Birth year
         room_id: Room ID (e.g., A100, B201)
     """
-    return mcp_server.add_student(mssv, ten, nam_sinh, room_id)
+    return await mcp_server.add_student(mssv, ten, nam_sinh, room_id)
 
 @tool
-def get_student_info(mssv: str) -> dict:
+async def get_student_info(mssv: str) -> dict:
     """
     Get detailed information about a student by their ID
     
     Args:
         mssv: Student ID
     """
-    return mcp_server.get_student_info(mssv)
+    return await mcp_server.get_student_info(mssv)
 
 @tool
-def get_room_info(room_id: str) -> dict:
+async def get_room_info(room_id: str) -> dict:
     """
     Get room information and list of students in the room
     
     Args:
         room_id: Room ID (e.g., A100, B201)
     """
-    return mcp_server.get_room_info(room_id)
+    return await mcp_server.get_room_info(room_id)
 
 @tool
-def remove_student(mssv: str) -> dict:
+async def remove_student(mssv: str) -> dict:
     """
     Remove a student from the dormitory
     
     Args:
         mssv: Student ID
     """
-    return mcp_server.remove_student(mssv)
+    return await mcp_server.remove_student(mssv)
 
 # Web Search Tool
+
+# Raw Serper responses; identical concurrent searches share one upstream call
+search_cache = AsyncTTLCache(
+    ttl=SEARCH_CACHE_TTL,
+    stale_ttl=SEARCH_CACHE_STALE_TTL,
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+    sizeof=lambda results: len(json.dumps(results, ensure_ascii=False))
+)
+
+
+async def search_web(query: str) -> dict:
+    """Serper results for a query, through the search cache"""
+    serper = get_client_registry().serper
+    return await search_cache.get_or_load(normalize_text(query), lambda: serper.search(query))
+
+
+async def read_web_results(question: str, queries: list) -> str:
+    """Search every query and return the best passages from results and their pages"""
+    if not SERPER_API_KEY:
+        return "Web search unavailable: SERPER_API_KEY not configured"
+    
+    results = await asyncio.gather(*(search_web(q) for q in queries), return_exceptions=True)
+    search_results = [r for r in results if isinstance(r, dict)]
+    if not search_results:
+        return f"Web search failed: {results[0] if results else 'no query'}"
+    
+    context = await build_web_context(question, search_results)
+    return context or "No good Google Search Result was found"
+
+
 @tool
-def web_search(query: str) -> str:
+async def web_search(query: str) -> str:
     """
     Search the web using Google Search via Serper API for current information
     
@@ -136,9 +254,8 @@ def web_search(query: str) -> str:
         if not SERPER_API_KEY:
             return "Web search unavailable: SERPER_API_KEY not configured"
         
-        search = GoogleSerperAPIWrapper(serper_api_key=SERPER_API_KEY)
-        results = search.run(query)
-        return results
+        serper = get_client_registry().serper
+        return serper.format_results(await search_web(query), serper.k)
     except Exception as e:
         return f"Web search failed: {str(e)}"
 
@@ -152,6 +269,15 @@ database_tools = [
     remove_student
 ]
 
+# Tool lookup by name
+database_tool_map = {t.name: t for t in database_tools}
+
+# Tools that write to MySQL: they never overlap with other tool calls
+MUTATING_DB_TOOLS = {"add_student", "remove_student"}
+
+# Serializes writes across concurrent requests
+_db_write_lock = asyncio.Lock()
+
 # Web search tools list
 web_search_tools = [web_search]
 
@@ -163,9 +289,14 @@ web_search_tools = [web_search]
 llm = ChatOpenAI(
     model="gpt-4o-mini",
     temperature=0,
-    api_key=OPENAI_API_KEY
+    api_key=OPENAI_API_KEY,
+    stream_usage=True,  # token usage also when the streaming endpoint drives the calls
+    max_retries=0  # 429s and retries are handled by the scheduler
 )
 
+# Requests/tokens per minute budget shared with ingestion and query embeddings
+chat_scheduler = get_openai_scheduler(llm.model_name)
+
 # LLM with database tools
 llm_with_db_tools = llm.bind_tools(database_tools)
 
@@ -173,6 +304,155 @@ llm_with_db_tools = llm.bind_tools(database_tools)
 llm_with_web_tools = llm.bind_tools(web_search_tools)
 
 
+def observe_prompt_tokens(call: str, messages: list, response):
+    """Record the prompt size of an LLM call, from the API usage when reported"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    tokens = usage.get("input_tokens") or sum(count_tokens(str(m.content)) for m in messages)
+    histogram("prompt_tokens", call=call).observe(tokens)
+    counter("llm_tokens_total", call=call, type="prompt").inc(tokens)
+    counter("llm_tokens_total", call=call, type="completion").inc(usage.get("output_tokens", 0))
+
+
+def estimate_chat_tokens(messages: list) -> int:
+    """Tokens reserved for a chat call: the prompt plus a typical completion"""
+    return sum(count_tokens(str(m.content)) for m in messages) + OPENAI_COMPLETION_TOKENS_ESTIMATE
+
+
+def total_tokens(response) -> Optional[int]:
+    return (getattr(response, "usage_metadata", None) or {}).get("total_tokens")
+
+
+async def invoke_llm(model, messages: list, call: str):
+    """Chat completion timed as an OpenAI call, with its token counts recorded"""
+    async def send():
+        with call_span("openai", "chat"):
+            return await model.ainvoke(messages)
+    
+    response = await chat_scheduler.submit(send, estimate_chat_tokens(messages), usage=total_tokens)
+    observe_prompt_tokens(call, messages, response)
+    return response
+
+
+class AnswerStreamInterrupted(Exception):
+    """The answer stream failed after tokens had been sent; not retried"""
+
+
+def deadline_exceeded(state: AgentState, node: str):
+    """Answer with the canned timeout message"""
+    record_exceeded(node)
+    deadline_stats["canned_answers"] += 1
+    state["error"] = f"Deadline exceeded in {node}"
+    state["answer"] = TIMEOUT_ANSWER
+
+
+async def generate_answer(state: AgentState, node: str, call: str, messages: list) -> str:
+    """
+    Stream the user-facing answer until the request deadline; a late answer
+    is cut off where it got to, or replaced by the canned message if
+    nothing arrived
+    """
+    chunks = []
+    
+    async def collect():
+        chunks.clear()  # a retried attempt starts over
+        with call_span("openai", "chat"):
+            try:
+                async for chunk in llm.astream(messages, config={"tags": [ANSWER_TAG]}):
+                    chunks.append(chunk)
+            except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+                if chunks:
+                    # the client has already seen these tokens; a retry would send them twice
+                    raise AnswerStreamInterrupted(f"Answer stream broke after {len(chunks)} chunks") from e
+                raise
+    
+    def streamed_tokens(_):
+        # usage arrives on the last chunk
+        return next((total_tokens(c) for c in reversed(chunks) if total_tokens(c)), None)
+    
+    try:
+        await asyncio.wait_for(
+            chat_scheduler.submit(collect, estimate_chat_tokens(messages), usage=streamed_tokens),
+            time_slice(state)
+        )
+    except asyncio.TimeoutError:
+        if not chunks:
+            deadline_exceeded(state, node)
+            return TIMEOUT_ANSWER
+        record_exceeded(node)
+        deadline_stats["partial_answers"] += 1
+        state["error"] = f"Deadline exceeded in {node}"
+        return "".join(chunk.content for chunk in chunks) + " …"
+    
+    if not chunks:
+        return ""
+    response = chunks[0]
+    for chunk in chunks[1:]:
+        response += chunk
+    observe_prompt_tokens(call, messages, response)
+    return response.content
+
+
+async def generate_query_variants(prompt: str) -> str:
+    """Paraphrases for multi-query retrieval"""
+    messages = [HumanMessage(content=prompt)]
+    response = await invoke_llm(llm, messages, "query_variants")
+    return response.content
+
+
+query_expander = QueryExpander(generate_fn=generate_query_variants)
+
+
+# ============================================================================
+# Conversation Memory
+# ============================================================================
+
+async def summarize_turns(previous: str, turns: list) -> str:
+    """Extend a session summary with the turns that left the history window"""
+    transcript = "\n".join(
+        f"{'Sinh viên' if turn['role'] == 'user' else 'Trợ lý'}: {truncate_to_tokens(turn['content'], 300)}"
+        for turn in turns
+    )
+    summary_prompt = f"""Update the running summary of a conversation between a student and the dormitory assistant.
+Keep names, MSSVs, room IDs, dates, decisions and open questions; drop greetings and small talk.
+Write at most {HISTORY_SUMMARY_TOKENS} tokens, in Vietnamese.
+
+Current summary:
+{previous or "(none)"}
+
+New turns:
+{transcript}
+
+Updated summary:"""
+    
+    messages = [SystemMessage(content=summary_prompt)]
+    response = await invoke_llm(llm, messages, "summary")
+    return response.content
+
+
+conversation_memory = init_conversation_memory(summarize_turns)
+
+
+def history_messages(state: AgentState) -> list:
+    """Session summary and recent turns as chat messages"""
+    messages = []
+    if state.get("summary"):
+        messages.append(SystemMessage(content=f"Tóm tắt cuộc trò chuyện trước đó:\n{state['summary']}"))
+    for turn in state.get("history") or []:
+        message_class = HumanMessage if turn["role"] == "user" else AIMessage
+        messages.append(message_class(content=turn["content"]))
+    return messages
+
+
+def history_text(state: AgentState) -> str:
+    """Session summary and recent turns as plain text for single-prompt calls"""
+    lines = []
+    if state.get("summary"):
+        lines.append(f"Summary: {state['summary']}")
+    for turn in state.get("history") or []:
+        lines.append(f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}")
+    return "\n".join(lines)
+
+
 # ============================================================================
 # Vector Store Setup (Using QdrantService)
 # ============================================================================
@@ -183,11 +463,139 @@ llm_with_web_tools = llm.bind_tools(web_search_tools)
 # Node Functions
 # ============================================================================
 
-def route_question(state: AgentState) -> AgentState:
-    """Route the question to appropriate agent"""
+async def run_db_tool_calls(tool_calls: list) -> list:
+    """
+    Execute database tool calls, results in call order.
+    Consecutive read-only calls run concurrently (bounded by
+    DB_TOOL_CONCURRENCY); a mutating call waits for the calls before it and
+    finishes before later ones start.
+    """
+    semaphore = asyncio.Semaphore(DB_TOOL_CONCURRENCY)
+    
+    async def run(tool_call: dict):
+        tool = database_tool_map[tool_call["name"]]
+        try:
+            if tool_call["name"] in MUTATING_DB_TOOLS:
+                async with _db_write_lock:
+                    return await tool.ainvoke(tool_call["args"])
+            async with semaphore:
+                return await tool.ainvoke(tool_call["args"])
+        except Exception as e:
+            return {"ok": False, "error": f"Tool execution failed: {str(e)}"}
+    
+    calls = [c for c in tool_calls if c["name"] in database_tool_map]
+    results, reads = [], []
+    for tool_call in calls:
+        if tool_call["name"] in MUTATING_DB_TOOLS:
+            results.extend(await asyncio.gather(*(run(c) for c in reads)))
+            reads = []
+            results.append(await run(tool_call))
+        else:
+            reads.append(tool_call)
+    results.extend(await asyncio.gather(*(run(c) for c in reads)))
+    return results
+
+
+# Outcome counters for speculative retrieval: a hit is a retrieval rag_agent
+# used, wasted/cancelled ones were started for questions routed elsewhere
+speculation_stats = {"started": 0, "hits": 0, "wasted": 0, "cancelled": 0, "failed": 0}
+
+# How database answers were phrased after tool calls
+db_answer_stats = {"template": 0, "llm": 0}
+
+# Database requests answered through the fast path vs. LLM tool selection,
+# with the summed request latency of each
+db_fast_path_stats = {"fast_path": 0, "llm": 0, "fast_path_ms": 0.0, "llm_ms": 0.0}
+
+
+def db_fast_path_snapshot() -> dict:
+    """Fast path counters with average latencies"""
+    fast, slow = db_fast_path_stats["fast_path"], db_fast_path_stats["llm"]
+    return {
+        "enabled": DB_FAST_PATH,
+        "fast_path": fast,
+        "llm": slow,
+        "fire_rate": round(fast / (fast + slow), 4) if fast + slow else 0.0,
+        "avg_fast_path_ms": round(db_fast_path_stats["fast_path_ms"] / fast, 2) if fast else None,
+        "avg_llm_ms": round(db_fast_path_stats["llm_ms"] / slow, 2) if slow else None
+    }
+
+
+def get_rag_qdrant_service() -> QdrantService:
+    """Shared QdrantService for the knowledge base collection"""
+    return get_client_registry().qdrant
+
+
+async def get_query_embedding(state: AgentState) -> list:
+    """Embed the question once per request and keep it in the state"""
+    if not state.get("query_embedding"):
+        state["query_embedding"] = await embed_query(state["question"])
+    return state["query_embedding"]
+
+
+def retrieval_top_k() -> int:
+    """Candidates fetched from Qdrant: more when the reranker picks the final ones"""
+    return RERANK_CANDIDATES if RAG_RERANK else RAG_RETRIEVAL_TOP_K
+
+
+async def multi_query_retrieve(state: AgentState) -> list:
+    """
+    Search the question and its paraphrases in one batched Qdrant call and
+    fuse the candidate lists; a speculative retrieval of the question is
+    reused as its list
+    """
     question = state["question"]
+    variants = await query_expander.expand(question)
+    original = state.get("retrieved")
+    queries = variants if original is not None else [question] + variants
+    if not queries:
+        return original
+    
+    # one embeddings request for whatever is not cached yet
+    embeddings = await embed_texts(queries)
+    if original is None:
+        state["query_embedding"] = embeddings[0]
+    result_lists = await get_rag_qdrant_service().batch_retrieve(embeddings, top_k=retrieval_top_k())
+    if original is not None:
+        result_lists = [original] + result_lists
     
-    # Use LLM to classify intent
+    return rrf_fuse(result_lists)[:retrieval_top_k()]
+
+
+async def speculative_retrieve(embedding_task: asyncio.Task) -> list:
+    """Run the RAG retrieval before the route is known"""
+    embedding = await embedding_task
+    return await get_rag_qdrant_service().retrieve_points(embedding=embedding, similarity_top_k=retrieval_top_k())
+
+
+async def settle_speculation(state: AgentState, route: str, embedding_task: asyncio.Task, retrieval_task: asyncio.Task):
+    """Hand the speculative retrieval to rag_agent, or drop it for other routes"""
+    if route == "rag":
+        try:
+            state["retrieved"] = await asyncio.wait_for(
+                retrieval_task, time_slice(state, reserve_ms=ANSWER_RESERVE_MS)
+            )
+            speculation_stats["hits"] += 1
+        except Exception as e:
+            # rag_agent retrieves again on its own
+            print(f"Speculative retrieval failed: {e}")
+            speculation_stats["failed"] += 1
+        return
+    
+    if retrieval_task.done():
+        speculation_stats["wasted"] += 1
+        if not retrieval_task.cancelled():
+            retrieval_task.exception()  # mark any error as retrieved
+    else:
+        speculation_stats["cancelled"] += 1
+        retrieval_task.cancel()
+        embedding_task.cancel()
+
+ROUTES = ('database', 'rag', 'web_search')
+
+
+async def llm_route(question: str) -> str:
+    """Classify the question with the LLM"""
     router_prompt = f"""Classify the following question into ONE category:
         - 'database': Questions about dormitory rooms, students, bookings, or any database operations
         - 'rag': Questions about general knowledge, documents, or information from knowledge base
@@ -198,22 +606,101 @@ def route_question(state: AgentState) -> AgentState:
         Respond with ONLY one word: database, rag, or web_search"""
     
     messages = [SystemMessage(content=router_prompt)]
-    response = llm.invoke(messages)
+    response = await invoke_llm(llm, messages, "routing")
     
     route = response.content.strip().lower()
     
-    print(f"Routing decision: {route}")
-    
     # Validate route
-    if route not in ['database', 'rag', 'web_search']:
+    if route not in ROUTES:
         route = 'rag'  # Default to RAG
     
+    return route
+
+
+async def decide_route(question: str, semantic_router, embedding_task: Optional[asyncio.Task]) -> tuple:
+    """Route and how it was decided: semantic router first, then the LLM"""
+    if semantic_router.ready:
+        try:
+            # shielded: a routing timeout must not cancel the embedding the retrieval waits on
+            route = semantic_router.route(await asyncio.shield(embedding_task)).route
+            if route is not None:
+                return route, "semantic"
+        except Exception as e:
+            print(f"Semantic routing failed: {e}")
+    
+    return await llm_route(question), "llm"
+
+
+async def route_question(state: AgentState) -> AgentState:
+    """Route the question to appropriate agent"""
+    question = state["question"]
+    
+    # Recognized database lookups need neither routing nor tool selection
+    if state.get("planned_tool_calls"):
+        print("Routing decision: database (fast path)")
+        state["route"] = "database"
+        state["messages"] = history_messages(state) + [HumanMessage(content=question)]
+        return state
+    
+    semantic_router = get_semantic_router()
+    
+    # The question embedding is needed by the semantic router and by the
+    # speculative retrieval; rag_agent reuses it afterwards
+    embedding_task = None
+    if semantic_router.ready or SPECULATIVE_RETRIEVAL:
+        embedding_task = asyncio.create_task(get_query_embedding(state))
+    
+    retrieval_task = None
+    if SPECULATIVE_RETRIEVAL and state.get("retrieved") is None:
+        speculation_stats["started"] += 1
+        retrieval_task = asyncio.create_task(speculative_retrieve(embedding_task))
+    
+    try:
+        route, source = await asyncio.wait_for(
+            decide_route(question, semantic_router, embedding_task),
+            time_slice(state, cap_ms=ROUTING_TIMEOUT_MS, reserve_ms=ANSWER_RESERVE_MS)
+        )
+    except asyncio.TimeoutError:
+        # RAG answers most questions acceptably
+        record_exceeded("route_question")
+        route, source = "rag", "deadline"
+    
+    print(f"Routing decision: {route} ({source})")
+    
+    if retrieval_task is not None:
+        await settle_speculation(state, route, embedding_task, retrieval_task)
+    
     state["route"] = route
-    state["messages"] = [HumanMessage(content=question)]
+    state["messages"] = history_messages(state) + [HumanMessage(content=question)]
     
     return state
 
 
+async def retrieve_candidates(state: AgentState) -> list:
+    """Dense (or multi-query) candidates, fused with keyword matches when enabled"""
+    question = state["question"]
+    results = state.get("retrieved")
+    if RAG_MULTI_QUERY:
+        results = await multi_query_retrieve(state)
+    elif results is None:
+        # Create embedding for the question unless routing already did
+        query_embedding = await get_query_embedding(state)
+        
+        print(f"Query embedding created (dim: {len(query_embedding)})")
+        
+        # Retrieve relevant documents using QdrantService
+        results = await get_rag_qdrant_service().retrieve_points(
+            embedding=query_embedding,
+            similarity_top_k=retrieval_top_k()
+        )
+    
+    sparse_index = get_sparse_index()
+    if RAG_HYBRID and len(sparse_index):
+        keyword_results = await sparse_index.search(question, retrieval_top_k())
+        results = hybrid_fuse(results, keyword_results, RAG_HYBRID_ALPHA)[:retrieval_top_k()]
+    return results
+
+
 async def rag_agent(state: AgentState) -> AgentState:
     """RAG agent - retrieves from knowledge base and generates answer"""
     question = state["question"]
@@ -221,62 +708,55 @@ async def rag_agent(state: AgentState) -> AgentState:
     try:
         print(f"RAG Agent processing: {question}")
         
-        # Initialize QdrantService
-        qdrant_service = QdrantService(
-            embedding_dims=EMBEDDING_DIMS,
-            host="localhost",
-            port=6333,
-            collection_name="documents"
-        )
-        
-        print("QdrantService initialized")
+        await adispatch_custom_event("retrieval", {"status": "started"})
         
-        # Create embedding for the question using OpenAI
-        client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-        
-        emb_response = await client.embeddings.create(
-            input=question,
-            model="text-embedding-3-small",
-            dimensions=EMBEDDING_DIMS
-        )
-        query_embedding = emb_response.data[0].embedding
+        try:
+            results = await asyncio.wait_for(
+                retrieve_candidates(state), time_slice(state, reserve_ms=ANSWER_RESERVE_MS)
+            )
+        except asyncio.TimeoutError:
+            deadline_exceeded(state, "rag_agent")
+            return state
         
-        print(f"Query embedding created (dim: {len(query_embedding)})")
+        print(f"Retrieved {len(results)} documents")
         
-        # Retrieve relevant documents using QdrantService
-        results = await qdrant_service.retrieve_points(
-            embedding=query_embedding
-        )
+        if RAG_RERANK:
+            # Skipped (None) when the model is not loaded or would blow the latency budget
+            budget_ms = min(RERANK_LATENCY_BUDGET_MS, time_slice(state, reserve_ms=ANSWER_RESERVE_MS) * 1000)
+            reranked = await get_reranker().rerank(question, results, top_k=RAG_RETRIEVAL_TOP_K, budget_ms=budget_ms)
+            results = reranked if reranked is not None else results[:RAG_RETRIEVAL_TOP_K]
         
-        print(f"Retrieved {len(results)} documents")
+        await adispatch_custom_event("retrieval", {"status": "completed", "documents": len(results)})
         
-        # Build context from results
-        context = "\n\n".join([
-            f"[Document {i+1}] (Score: {result.scorce:.3f}):\n{result.payload.get('content', result.payload.get('context', ''))}"
-            for i, result in enumerate(results)
-        ])
+        # Build context from results: dedup, merge adjacent chunks, fit the token budget
+        packed = pack_context(results)
+        context = packed.text
+        histogram("rag_context_tokens").observe(packed.tokens)
         
-        print("Context built successfully")
+        print(f"Context built successfully ({len(packed.blocks)} blocks, {packed.tokens} tokens)")
         
         state["context"] = context
         
+        # Earlier turns of the session, if any
+        conversation = history_text(state)
+        conversation_block = f"\nConversation so far:\n{conversation}\n" if conversation else ""
+        
         # Generate answer
         rag_prompt = f"""You are a helpful RAG assistant. Answer the question based on the provided context.
 
 Context:
 {context}
-
+{conversation_block}
 Question: {question}
 
 Provide a clear and concise answer in Vietnamese."""
         
         messages = [SystemMessage(content=rag_prompt)]
-        response = llm.invoke(messages)
+        state["answer"] = await generate_answer(state, "rag_agent", "rag", messages)
         
         print("Answer generated successfully")
         
-        state["answer"] = response.content
-        state["messages"].append(AIMessage(content=response.content))
+        state["messages"].append(AIMessage(content=state["answer"]))
         
     except Exception as e:
         import traceback
@@ -289,12 +769,20 @@ Provide a clear and concise answer in Vietnamese."""
     return state
 
 
-def database_agent(state: AgentState) -> AgentState:
+async def database_agent(state: AgentState) -> AgentState:
     """Database agent - handles MySQL operations via MCP"""
     question = state["question"]
     messages = state["messages"]
     
     try:
+        planned = state.get("planned_tool_calls")
+        if planned:
+            tool_results = await run_db_tool_calls(planned)
+            state["answer"] = await answer_from_tool_results(state, planned, tool_results)
+            state["messages"].append(AIMessage(content=state["answer"]))
+            record_db_latency(state, "fast_path")
+            return state
+        
         # System prompt for database agent
         db_system_prompt = """You are a dormitory management assistant. Use the available tools to:
         - List available rooms
@@ -308,41 +796,32 @@ def database_agent(state: AgentState) -> AgentState:
         messages_with_system = [SystemMessage(content=db_system_prompt)] + messages
         
         # Invoke LLM with tools
-        response = llm_with_db_tools.invoke(messages_with_system)
+        response = await asyncio.wait_for(
+            invoke_llm(llm_with_db_tools, messages_with_system, "database_tools"),
+            time_slice(state, reserve_ms=ANSWER_RESERVE_MS)
+        )
         
         # Check if tool calls are needed
         if response.tool_calls:
-            # Execute tool calls
-            tool_results = []
-            for tool_call in response.tool_calls:
-                tool_name = tool_call["name"]
-                tool_args = tool_call["args"]
-                
-                # Find and execute tool
-                tool_map = {t.name: t for t in database_tools}
-                if tool_name in tool_map:
-                    result = tool_map[tool_name].invoke(tool_args)
-                    tool_results.append(result)
-            
-            # Generate final response based on tool results
-            result_text = json.dumps(tool_results, ensure_ascii=False, indent=2)
-            
-            final_prompt = f"""Based on the tool execution results, provide a clear answer in Vietnamese.
-
-Tool Results:
-{result_text}
-
-User Question: {question}
-
-Provide a natural, conversational response."""
+            # Execute tool calls; not bounded by the deadline, a cancelled
+            # write would leave its outcome unknown
+            tool_calls = [c for c in response.tool_calls if c["name"] in database_tool_map]
+            state["mutated"] = any(c["name"] in MUTATING_DB_TOOLS for c in tool_calls)
+            writing = db_writes_var.get()
+            if state["mutated"] and writing is not None:
+                writing.set()  # run_graph now waits for the graph instead of cancelling it
+            # shielded: even a cancelled request lets the writes finish
+            tool_results = await asyncio.shield(run_db_tool_calls(tool_calls))
             
-            final_response = llm.invoke([SystemMessage(content=final_prompt)])
-            state["answer"] = final_response.content
+            state["answer"] = await answer_from_tool_results(state, tool_calls, tool_results)
         else:
             state["answer"] = response.content
         
         state["messages"].append(AIMessage(content=state["answer"]))
+        record_db_latency(state, "llm")
         
+    except asyncio.TimeoutError:
+        deadline_exceeded(state, "database_agent")
     except Exception as e:
         state["error"] = f"Database error: {str(e)}"
         state["answer"] = "Xin lỗi, có lỗi khi truy cập cơ sở dữ liệu. Vui lòng kiểm tra kết nối MySQL."
@@ -350,7 +829,41 @@ Provide a natural, conversational response."""
     return state
 
 
-def web_search_agent(state: AgentState) -> AgentState:
+def record_db_latency(state: AgentState, path: str):
+    """Count a database request and its latency since it entered the graph"""
+    db_fast_path_stats[path] += 1
+    if state.get("started_at"):
+        db_fast_path_stats[f"{path}_ms"] += (time.perf_counter() - state["started_at"]) * 1000
+
+
+async def answer_from_tool_results(state: AgentState, tool_calls: list, tool_results: list) -> str:
+    """Phrase database tool results, from templates when possible"""
+    if DB_TEMPLATE_ANSWERS:
+        rendered = render_tool_results(tool_calls, tool_results)
+        if rendered is not None:
+            db_answer_stats["template"] += 1
+            return rendered
+    
+    db_answer_stats["llm"] += 1
+    question = state["question"]
+    
+    # Generate final response based on tool results
+    result_text = json.dumps(tool_results, ensure_ascii=False, indent=2, default=str)
+    
+    final_prompt = f"""Based on the tool execution results, provide a clear answer in Vietnamese.
+
+Tool Results:
+{result_text}
+
+User Question: {question}
+
+Provide a natural, conversational response."""
+    
+    final_messages = [SystemMessage(content=final_prompt)]
+    return await generate_answer(state, "database_agent", "database", final_messages)
+
+
+async def web_search_agent(state: AgentState) -> AgentState:
     """Web search agent - searches the web for current information"""
     question = state["question"]
     messages = state["messages"]
@@ -363,20 +876,32 @@ def web_search_agent(state: AgentState) -> AgentState:
         messages_with_system = [SystemMessage(content=search_system_prompt)] + messages
         
         # Invoke LLM with web search tool
-        response = llm_with_web_tools.invoke(messages_with_system)
+        response = await asyncio.wait_for(
+            invoke_llm(llm_with_web_tools, messages_with_system, "web_search_tools"),
+            time_slice(state, reserve_ms=ANSWER_RESERVE_MS)
+        )
         
         # Check if tool calls are needed
         if response.tool_calls:
-            # Execute web search
-            search_results = []
-            for tool_call in response.tool_calls:
-                if tool_call["name"] == "web_search":
-                    query = tool_call["args"].get("query", question)
-                    result = web_search.invoke({"query": query})
-                    search_results.append(result)
+            queries = list(dict.fromkeys(
+                tool_call["args"].get("query", question)
+                for tool_call in response.tool_calls
+                if tool_call["name"] == "web_search"
+            ))
+            
+            read_pages = WEB_PAGE_READER and remaining(state) * 1000 >= WEB_READER_MIN_REMAINING_MS
+            if WEB_PAGE_READER and not read_pages:
+                # too little time left to fetch pages: Serper snippets only
+                record_degraded("web_page_reader")
             
-            # Generate answer from search results
-            results_text = "\n\n".join(search_results)
+            if read_pages:
+                # One ranked, token-budgeted context for all queries
+                search = read_web_results(question, queries)
+            else:
+                # Execute web search
+                search = asyncio.gather(*(web_search.ainvoke({"query": q}) for q in queries))
+            results = await asyncio.wait_for(search, time_slice(state, reserve_ms=ANSWER_RESERVE_MS))
+            results_text = results if read_pages else "\n\n".join(results)
             
             final_prompt = f"""Based on the web search results, answer the question in Vietnamese.
 
@@ -387,13 +912,15 @@ def web_search_agent(state: AgentState) -> AgentState:
 
                                 Provide a clear, informative answer."""
             
-            final_response = llm.invoke([SystemMessage(content=final_prompt)])
-            state["answer"] = final_response.content
+            final_messages = [SystemMessage(content=final_prompt)]
+            state["answer"] = await generate_answer(state, "web_search_agent", "web_search", final_messages)
         else:
             state["answer"] = response.content
         
         state["messages"].append(AIMessage(content=state["answer"]))
         
+    except asyncio.TimeoutError:
+        deadline_exceeded(state, "web_search_agent")
     except Exception as e:
         state["error"] = f"Web search error: {str(e)}"
         state["answer"] = "Xin lỗi, không thể tìm kiếm thông tin trên web."
@@ -422,10 +949,13 @@ def build_graph():
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    workflow.add_node("route_question", route_question)
-    workflow.add_node("rag_agent", rag_agent)
-    workflow.add_node("database_agent", database_agent)
-    workflow.add_node("web_search_agent", web_search_agent)
+    for name, node in (
+        ("route_question", route_question),
+        ("rag_agent", rag_agent),
+        ("database_agent", database_agent),
+        ("web_search_agent", web_search_agent)
+    ):
+        workflow.add_node(name, traced_node(name, node) if TRACING else node)
     
     # Set entry point
     workflow.set_entry_point("route_question")
@@ -460,41 +990,392 @@ def get_graph():
     return _graph
 
 
+def build_initial_state(question: str) -> AgentState:
+    """Create the initial graph state for a question"""
+    return {
+        "messages": [],
+        "question": question,
+        "route": "",
+        "context": "",
+        "answer": "",
+        "error": "",
+        "query_embedding": [],
+        "retrieved": None,
+        "planned_tool_calls": plan_tool_calls(question) if DB_FAST_PATH else None,
+        "started_at": time.perf_counter(),
+        "deadline": new_deadline(),
+        "history": [],
+        "summary": "",
+        "mutated": False,
+        "cache_generation": None
+    }
+
+
+async def build_request_state(payload: "QuestionRequest", user: dict) -> AgentState:
+    """Initial state with the session's conversation memory, if a session was given"""
+    state = build_initial_state(payload.question)
+    if not payload.session_id:
+        return state
+    
+    try:
+        # shielded: a summary still being folded is kept for the next request
+        context = await asyncio.wait_for(
+            asyncio.shield(conversation_memory.load(payload.session_id, user["user_id"], payload.question)),
+            HISTORY_LOAD_TIMEOUT_MS / 1000
+        )
+        state["history"] = context.messages
+        state["summary"] = context.summary
+    except asyncio.TimeoutError:
+        record_degraded("conversation_history")
+    except Exception as e:
+        # answer without history rather than fail the question
+        print(f"Conversation history unavailable: {e}")
+    return state
+
+
+# ============================================================================
+# Answer Cache
+# ============================================================================
+
+async def lookup_cached_answer(state: AgentState) -> Optional[CachedAnswer]:
+    """Embed the question (kept in the state for the graph) and look it up"""
+    if not ANSWER_CACHE_ENABLED or state.get("planned_tool_calls"):
+        # database answers are never cached, so skip the embedding call
+        return None
+    if state.get("history") or state.get("summary"):
+        # follow-up answers depend on the conversation
+        return None
+    # captured before retrieval starts, so an upload landing mid-execution keeps the answer out
+    state["cache_generation"] = get_answer_cache().generation
+    try:
+        embedding = await asyncio.wait_for(
+            asyncio.shield(get_query_embedding(state)), time_slice(state, cap_ms=ROUTING_TIMEOUT_MS)
+        )
+    except Exception as e:
+        print(f"Answer cache lookup skipped: {e!r}")
+        return None
+    return get_answer_cache().lookup(embedding)
+
+
+def remember_answer(result: AgentState, latency_ms: float):
+    """Store a successful graph result; the cache applies the per-route policy"""
+    if not ANSWER_CACHE_ENABLED or result.get("error") or not result.get("query_embedding"):
+        return
+    if result.get("history") or result.get("summary"):
+        return
+    get_answer_cache().store(
+        embedding=result["query_embedding"],
+        question=result["question"],
+        route=result.get("route", ""),
+        answer=result.get("answer", ""),
+        latency_ms=latency_ms,
+        generation=result.get("cache_generation")
+    )
+
+
+# ============================================================================
+# Streaming
+# ============================================================================
+
+AGENT_NODES = ("rag_agent", "database_agent", "web_search_agent")
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_search_events(graph, initial_state: AgentState) -> AsyncIterator[str]:
+    """
+    Run the graph and yield SSE frames as it progresses.
+    
+    Events:
+        route   - routing decision, as soon as route_question finishes
+        status  - retrieval progress dispatched by rag_agent
+        token   - answer tokens from LLM calls tagged with ANSWER_TAG
+        done    - final answer, route, error and timings (always last)
+    
+    The graph only needs to support ``astream_events``, so a graph compiled
+    around a fake streaming chat model can be driven the same way.
+    """
+    start = time.perf_counter()
+    first_token_ms = None
+    final_state = None
+    
+    try:
+        cached = await lookup_cached_answer(initial_state)
+        if cached is not None:
+            yield format_sse("route", {"route": cached.route})
+            yield format_sse("done", {
+                "ok": True,
+                "route": cached.route,
+                "answer": cached.answer,
+                "error": "",
+                "cached": True,
+                "first_token_ms": None,
+                "total_ms": (time.perf_counter() - start) * 1000
+            })
+            return
+        
+        async for event in graph.astream_events(initial_state, version="v2"):
+            kind = event["event"]
+            name = event.get("name")
+            
+            if kind == "on_chain_end" and name == "route_question":
+                output = event["data"].get("output") or {}
+                yield format_sse("route", {"route": output.get("route", "rag")})
+            
+            elif kind == "on_custom_event" and name == "retrieval":
+                yield format_sse("status", event["data"])
+            
+            elif kind == "on_chat_model_stream" and ANSWER_TAG in event.get("tags", []):
+                content = event["data"]["chunk"].content
+                if content:
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start) * 1000
+                    yield format_sse("token", {"content": content})
+            
+            elif kind == "on_chain_end" and name in AGENT_NODES:
+                final_state = event["data"].get("output")
+        
+        final_state = final_state or {}
+        error = final_state.get("error", "")
+        remember_answer(final_state, (time.perf_counter() - start) * 1000)
+        yield format_sse("done", {
+            "ok": not error,
+            "route": final_state.get("route", "unknown"),
+            "answer": final_state.get("answer", "No answer generated"),
+            "error": error,
+            "first_token_ms": first_token_ms,
+            "total_ms": (time.perf_counter() - start) * 1000
+        })
+        
+    except Exception as e:
+        yield format_sse("done", {
+            "ok": False,
+            "error": str(e),
+            "first_token_ms": first_token_ms,
+            "total_ms": (time.perf_counter() - start) * 1000
+        })
+
+
+# Set by database_agent once it starts mutating tool calls; one event per run_graph call
+db_writes_var: ContextVar[Optional[asyncio.Event]] = ContextVar("db_writes", default=None)
+
+
+async def run_graph(graph, state: AgentState) -> AgentState:
+    """
+    Invoke the graph; nodes keep to the state's deadline, this only stops
+    waiting for one that does not. A graph that has started database
+    writes is never cut off: the answer must say what the writes did.
+    """
+    writing = asyncio.Event()
+    token = db_writes_var.set(writing)
+    task = asyncio.ensure_future(graph.ainvoke(state))  # the task inherits the event
+    db_writes_var.reset(token)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=remaining(state) + DEADLINE_GRACE_MS / 1000)
+        if done or writing.is_set():
+            return await task
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    task.cancel()
+    deadline_exceeded(state, "graph")
+    return state
+
+
+# ============================================================================
+# Batch
+# ============================================================================
+
+batch_stats = {"batches": 0, "questions": 0, "cached": 0, "prefetched": 0, "failed": 0}
+
+
+async def prefetch_batch(states: List[AgentState]) -> List[Optional[CachedAnswer]]:
+    """
+    Embed a chunk of questions in one embeddings request, look them up in
+    the answer cache and retrieve RAG candidates for the rest with one
+    Qdrant batch, so each graph only routes and answers
+    """
+    to_embed = [s for s in states if not s.get("planned_tool_calls")]
+    try:
+        embeddings = await embed_texts([s["question"] for s in to_embed]) if to_embed else []
+    except Exception as e:
+        # every graph embeds its own question instead
+        print(f"Batch embedding failed: {e}")
+        return [None] * len(states)
+    for state, embedding in zip(to_embed, embeddings):
+        state["query_embedding"] = embedding
+    
+    cached = [await lookup_cached_answer(s) for s in states]
+    
+    to_retrieve = [s for s, hit in zip(states, cached) if hit is None and s["query_embedding"]]
+    if to_retrieve:
+        try:
+            result_lists = await get_rag_qdrant_service().batch_retrieve(
+                [s["query_embedding"] for s in to_retrieve], top_k=retrieval_top_k()
+            )
+            for state, results in zip(to_retrieve, result_lists):
+                state["retrieved"] = results
+            batch_stats["prefetched"] += len(to_retrieve)
+        except Exception as e:
+            # rag_agent retrieves again on its own
+            print(f"Batch retrieval failed: {e}")
+    return cached
+
+
+async def stream_batch_answers(graph, questions: List[str], concurrency: int) -> AsyncIterator[str]:
+    """
+    Answer many questions with at most `concurrency` graphs running at once,
+    each holding its own admission slot, and yield one NDJSON line per
+    question in completion order; each line carries the question's index
+    in the request
+    """
+    # the batch's OpenAI calls, and the answer tasks started below, yield to interactive traffic
+    priority_var.set(BATCH)
+    batch_stats["batches"] += 1
+    batch_stats["questions"] += len(questions)
+    lines: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+    
+    async def answer(index: int, state: AgentState, cached: Optional[CachedAnswer]):
+        start = time.perf_counter()
+        line = {"index": index, "question": state["question"]}
+        if not state["question"].strip():
+            line.update(ok=False, error="Empty question")
+        elif cached is not None:
+            batch_stats["cached"] += 1
+            line.update(ok=True, route=cached.route, answer=cached.answer, error="", cached=True)
+        else:
+            try:
+                # the batch's own cap first, so one batch cannot fill the admission queue
+                async with semaphore, get_admission_controller().slot():
+                    state["deadline"] = new_deadline()  # queued time does not count
+                    result = await run_graph(graph, state)
+                remember_answer(result, (time.perf_counter() - start) * 1000)
+                error = result.get("error", "")
+                line.update(
+                    ok=not error,
+                    route=result.get("route", "unknown"),
+                    answer=result.get("answer", "No answer generated"),
+                    error=error
+                )
+            except HTTPException as e:
+                line.update(ok=False, error=e.detail)  # shed by admission control
+            except Exception as e:
+                line.update(ok=False, error=str(e))
+        if not line["ok"]:
+            batch_stats["failed"] += 1
+        line["total_ms"] = (time.perf_counter() - start) * 1000
+        await lines.put(line)
+    
+    try:
+        # graphs of the first chunk start while later chunks are prefetched
+        for offset in range(0, len(questions), BATCH_EMBED_SIZE):
+            states = [build_initial_state(q) for q in questions[offset:offset + BATCH_EMBED_SIZE]]
+            answerable = [s for s in states if s["question"].strip()]
+            hits = iter(await prefetch_batch(answerable))
+            for i, state in enumerate(states):
+                cached = next(hits) if state["question"].strip() else None
+                tasks.append(asyncio.create_task(answer(offset + i, state, cached)))
+        
+        for _ in range(len(questions)):
+            yield json.dumps(await lines.get(), ensure_ascii=False) + "\n"
+    finally:
+        # the client went away: stop the remaining graphs
+        for task in tasks:
+            task.cancel()
+
+
+# ============================================================================
+# Request Coalescing
+# ============================================================================
+
+question_coalescer = QuestionCoalescer()
+
+
+async def execute_question(graph, state: AgentState, start: float) -> AgentState:
+    """One graph execution for /search, once an admission slot is free"""
+    async with get_admission_controller().slot():
+        state["deadline"] = new_deadline()  # queued time does not count
+        result = await run_graph(graph, state)
+    remember_answer(result, (time.perf_counter() - start) * 1000)
+    return result
+
+
+async def answer_question(graph, state: AgentState, start: float) -> tuple:
+    """
+    Graph result for the request, shared with concurrent requests asking
+    the same question in the same context; questions that look like writes
+    run on their own, so each request makes its own change.
+    Returns the result and whether another request's execution produced it.
+    """
+    if not QUESTION_COALESCING or MUTATION.search(normalize_text(state["question"])):
+        question_coalescer.stats["bypassed"] += 1
+        return await execute_question(graph, state, start), False
+    
+    key = coalescing_key(state["question"], state["history"], state["summary"])
+    result, shared = await question_coalescer.run(key, lambda: execute_question(graph, state, start))
+    if shared and result.get("mutated"):
+        # the model chose a write tool for a question that did not look like one; the
+        # write ran once for all of them, and running it again would repeat it
+        question_coalescer.stats["shared_writes"] += 1
+    return result, shared
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
 
 class QuestionRequest(BaseModel):
     question: str
+    session_id: Optional[str] = None  # chat session whose history the answer should use
+
+
+async def release_after(body: AsyncIterator[str], acquired_at: float) -> AsyncIterator[str]:
+    """Pass a streaming body through and give its admission slot back when it ends"""
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        get_admission_controller().release(acquired_at)
 
 
 @app.post("/search")
-async def search_endpoint(payload: QuestionRequest):
+async def search_endpoint(payload: QuestionRequest, user: dict = Depends(rate_limited("search"))):
     """
     Main endpoint for agentic RAG system
-    Routes questions to appropriate agent (RAG, Database, or Web Search)
+    Routes questions to appropriate agent (RAG, Database, or Web Search);
+    cache misses wait for an admission slot (503 when the server is saturated)
+    or join an identical question already being answered
     """
     question = payload.question
     
     if not question:
         return {"ok": False, "error": "Empty question"}
     
+    # Initialize state, with the session history when a session_id is given
+    initial_state = await build_request_state(payload, user)
+    
     try:
         # Get graph
         graph = get_graph()
         
-        # Initialize state
-        initial_state = {
-            "messages": [],
-            "question": question,
-            "route": "",
-            "context": "",
-            "answer": "",
-            "error": ""
-        }
+        # Serve semantically identical questions from the answer cache
+        start = time.perf_counter()
+        cached = await lookup_cached_answer(initial_state)
+        if cached is not None:
+            return {
+                "ok": True,
+                "route": cached.route,
+                "answer": cached.answer,
+                "cached": True
+            }
         
-        # Run graph with async support
-        result = await graph.ainvoke(initial_state)
+        # Run graph with async support, or share a concurrent identical run
+        result, shared = await answer_question(graph, initial_state, start)
         
         # Extract answer
         answer = result.get("answer", "No answer generated")
@@ -509,12 +1390,17 @@ async def search_endpoint(payload: QuestionRequest):
                 "answer": answer
             }
         
-        return {
+        response = {
             "ok": True,
             "route": route,
             "answer": answer
         }
+        if shared:
+            response["coalesced"] = True
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         return {
@@ -522,3 +1408,116 @@ async def search_endpoint(payload: QuestionRequest):
             "error": str(e),
             "traceback": traceback.format_exc()
         }
+
+
+@app.post("/search/stream")
+async def search_stream_endpoint(payload: QuestionRequest, user: dict = Depends(rate_limited("search_stream"))):
+    """
+    Streaming variant of /search using Server-Sent Events.
+    Emits the routing decision, retrieval status and answer tokens as they
+    are produced, followed by a final `done` event with the full answer.
+    """
+    question = payload.question
+    
+    if not question:
+        return {"ok": False, "error": "Empty question"}
+    
+    initial_state = await build_request_state(payload, user)
+    # the slot is taken before the response starts, so a saturated server can still answer 503
+    acquired_at = await get_admission_controller().acquire()
+    initial_state["deadline"] = new_deadline()
+    return StreamingResponse(
+        release_after(stream_search_events(get_graph(), initial_state), acquired_at),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[str]
+    concurrency: int = BATCH_CONCURRENCY  # graphs answered at once, capped at BATCH_MAX_CONCURRENCY
+
+
+@app.post("/search/batch")
+async def search_batch_endpoint(payload: BatchQuestionRequest, user: dict = Depends(rate_limited("search_batch"))):
+    """
+    Answer many questions in one call, e.g. for regression checks or FAQ
+    generation. Results stream back as NDJSON in completion order:
+    {"index", "question", "ok", "route", "answer", "error", "total_ms"}
+    Each graph takes an admission slot like a /search request, so batches
+    count against the global cap; `concurrency` bounds one batch's share.
+    A question shed by admission control comes back with ok=false.
+    """
+    if not payload.questions:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No questions")
+    if len(payload.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch, got {len(payload.questions)}"
+        )
+    concurrency = max(1, min(payload.concurrency, BATCH_MAX_CONCURRENCY))
+    
+    return StreamingResponse(
+        stream_batch_answers(get_graph(), payload.questions, concurrency),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/retrieve", response_model=List[List[RetrivalResuult]])
+async def retrieve_endpoint(payload: BatchQueryRequest, user: dict = Depends(rate_limited("retrieve"))):
+    """
+    Knowledge base search for several queries at once, by vector, keyword
+    (BM25) or hybrid scores weighted by alpha
+    """
+    method = payload.search_method.lower()
+    if method not in SEARCH_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"search_method must be one of Vector, Keyword, Hybrid, got {payload.search_method}"
+        )
+    if not 0.0 <= payload.alpha <= 1.0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="alpha must be between 0 and 1")
+    
+    dense_lists = [[] for _ in payload.queries]
+    if method != "keyword" and payload.queries:
+        # one embeddings request and one Qdrant batch for all queries
+        embeddings = await embed_texts(payload.queries)
+        dense_lists = await get_rag_qdrant_service().batch_retrieve(embeddings, top_k=payload.top_k)
+    
+    sparse_lists = [[] for _ in payload.queries]
+    if method != "vector":
+        sparse_index = get_sparse_index()
+        sparse_lists = await asyncio.gather(*(sparse_index.search(query, payload.top_k) for query in payload.queries))
+    
+    return [
+        combine(method, dense, sparse, payload.alpha, payload.top_k)
+        for dense, sparse in zip(dense_lists, sparse_lists)
+    ]
+
+
+@app.get("/stats")
+async def stats_endpoint():
+    """Counters for the routing and retrieval optimizations"""
+    return {
+        "semantic_router": get_semantic_router().stats,
+        "speculative_retrieval": {"enabled": SPECULATIVE_RETRIEVAL, **speculation_stats},
+        "answer_cache": {"enabled": ANSWER_CACHE_ENABLED, **get_answer_cache().snapshot()},
+        "embedding_cache": get_embedding_cache().snapshot(),
+        "database_answers": {"templates_enabled": DB_TEMPLATE_ANSWERS, **db_answer_stats},
+        "database_fast_path": db_fast_path_snapshot(),
+        "search_cache": search_cache.snapshot(),
+        "web_reader": {"enabled": WEB_PAGE_READER, **reader_stats},
+        "conversation_memory": conversation_memory.snapshot(),
+        "rag_context": packing_stats,
+        "rerank": {"enabled": RAG_RERANK, **get_reranker().snapshot()},
+        "multi_query": {"enabled": RAG_MULTI_QUERY, **query_expander.snapshot()},
+        "batch": batch_stats,
+        "deadlines": deadline_stats,
+        "rate_limits": get_rate_limiter().snapshot(),
+        "admission": get_admission_controller().snapshot(),
+        "coalescing": {"enabled": QUESTION_COALESCING, **question_coalescer.snapshot()},
+        "sparse_index": {"hybrid_enabled": RAG_HYBRID, **get_sparse_index().snapshot()},
+        "openai_scheduler": schedulers_snapshot(),
+        "prompt_tokens": histograms_snapshot()
+    }
@@ -0,0 +1,145 @@
+"""
+Semantic answer cache
+Serves a stored answer when a new question embeds close enough to one that
+was already answered, bounded by TTL, size (LRU) and a per-route policy
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config.config import (
+    EMBEDDING_DIMS,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_ROUTE_TTLS
+)
+
+
+class CachedAnswer(BaseModel):
+    """A cached graph result"""
+    question: str
+    route: str
+    answer: str
+    expires_at: float
+    latency_ms: float  # what the full pipeline took when the answer was produced
+
+
+class SemanticAnswerCache:
+    """
+    Fixed-size matrix of normalized question embeddings plus LRU bookkeeping.
+    Lookups are one matrix-vector product over the occupied slots.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        route_ttls: Dict[str, float] = ANSWER_CACHE_ROUTE_TTLS,
+        embedding_dims: int = EMBEDDING_DIMS
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.route_ttls = dict(route_ttls)
+        self.vectors = np.zeros((max_entries, embedding_dims), dtype=np.float32)
+        self.occupied = np.zeros(max_entries, dtype=bool)
+        self.entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()  # slot -> answer, LRU order
+        self.generation = 0  # bumped by invalidate(); answers produced before that are not stored
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "stale_skips": 0, "evictions": 0, "expirations": 0, "saved_latency_ms": 0.0}
+
+    def is_cacheable(self, route: str) -> bool:
+        return self.route_ttls.get(route, 0) > 0
+
+    def _normalize(self, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _remove(self, slot: int):
+        self.entries.pop(slot, None)
+        self.occupied[slot] = False
+
+    def lookup(self, embedding: List[float]) -> Optional[CachedAnswer]:
+        """Return the closest live answer above the similarity threshold"""
+        if self.entries:
+            query = self._normalize(embedding)
+            sims = self.vectors @ query
+            sims[~self.occupied] = -np.inf
+            now = time.time()
+            while True:
+                slot = int(np.argmax(sims))
+                if sims[slot] < self.threshold:
+                    break
+                entry = self.entries[slot]
+                if entry.expires_at <= now:
+                    self._remove(slot)
+                    self.stats["expirations"] += 1
+                    sims[slot] = -np.inf
+                    continue
+                self.entries.move_to_end(slot)
+                self.stats["hits"] += 1
+                self.stats["saved_latency_ms"] += entry.latency_ms
+                return entry
+
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, embedding: List[float], question: str, route: str, answer: str, latency_ms: float, generation: Optional[int] = None):
+        """
+        Cache an answer if the route policy allows it. `generation` is the
+        value seen at lookup time; an answer that was in flight across an
+        invalidate() is dropped rather than served for a full TTL.
+        """
+        if not self.is_cacheable(route):
+            return
+        if generation is not None and generation != self.generation:
+            self.stats["stale_skips"] += 1
+            return
+
+        if len(self.entries) >= self.max_entries:
+            slot, _ = self.entries.popitem(last=False)
+            self.occupied[slot] = False
+            self.stats["evictions"] += 1
+        else:
+            slot = int(np.argmin(self.occupied))
+
+        self.vectors[slot] = self._normalize(embedding)
+        self.occupied[slot] = True
+        self.entries[slot] = CachedAnswer(
+            question=question,
+            route=route,
+            answer=answer,
+            expires_at=time.time() + self.route_ttls[route],
+            latency_ms=latency_ms
+        )
+        self.stats["stores"] += 1
+
+    def invalidate(self, route: Optional[str] = None) -> int:
+        """Drop every entry, or only those produced by one route"""
+        # the route of an answer still in flight is unknown, so any invalidation fences them all
+        self.generation += 1
+        slots = [slot for slot, entry in self.entries.items() if route is None or entry.route == route]
+        for slot in slots:
+            self._remove(slot)
+        return len(slots)
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "generation": self.generation,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
+
+
+# Global cache instance
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Get or create answer cache instance"""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache()
+    return _answer_cache
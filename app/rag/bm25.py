@@ -0,0 +1,45 @@
+"""
+Okapi BM25 over small in-memory passage sets
+"""
+import math
+import re
+from collections import Counter
+from typing import List
+
+from app.core.embeding.openai_embeddings import normalize_text
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words (Vietnamese syllables) of the normalized text"""
+    return _WORD.findall(normalize_text(text))
+
+
+class BM25:
+    """Scores every document of a fixed, pre-tokenized collection against a query"""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.doc_lens = [len(doc) for doc in documents]
+        self.avg_len = sum(self.doc_lens) / len(documents) if documents else 0.0
+        self.doc_freq = Counter(term for tf in self.term_freqs for term in tf)
+
+    def idf(self, term: str) -> float:
+        n, df = len(self.term_freqs), self.doc_freq.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: List[str]) -> List[float]:
+        terms = {term: self.idf(term) for term in set(query) if term in self.doc_freq}
+        results = []
+        for tf, length in zip(self.term_freqs, self.doc_lens):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_len) if self.avg_len else self.k1
+            score = 0.0
+            for term, idf in terms.items():
+                freq = tf.get(term, 0)
+                if freq:
+                    score += idf * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
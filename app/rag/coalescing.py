@@ -0,0 +1,74 @@
+"""
+Single-flight coalescing of identical in-flight questions
+Concurrent /search requests asking the same normalized question with the
+same conversation context share one graph execution; the answer cache
+only helps once that first execution has finished, so this is what
+absorbs a cold-cache spike of the same question.
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+from app.core.embeding.openai_embeddings import normalize_text
+
+
+def coalescing_key(question: str, history: List[dict], summary: str) -> Tuple[str, str]:
+    """Normalized question and a digest of the session context the graph sees"""
+    context = ""
+    if history or summary:
+        raw = json.dumps([summary, history], ensure_ascii=False, sort_keys=True, default=str)
+        context = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+    return normalize_text(question), context
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class QuestionCoalescer:
+    """
+    The first request for a key runs `execute()` in a task; requests with
+    the same key arriving before it finishes await that task. Waiters are
+    shielded from each other: a client that goes away does not cancel the
+    execution unless it was the last one waiting. Failures reach every
+    waiter and are not remembered.
+    """
+
+    def __init__(self):
+        self.inflight: Dict[Hashable, _Flight] = {}
+        self.stats = {"executions": 0, "coalesced": 0, "bypassed": 0, "shared_writes": 0, "max_waiters": 0}
+
+    async def run(self, key: Hashable, execute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of the shared execution, and whether it was started by another request"""
+        flight = self.inflight.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(execute()))
+            self.inflight[key] = flight
+            self.stats["executions"] += 1
+
+            def done(t, flight=flight):
+                if self.inflight.get(key) is flight:
+                    del self.inflight[key]
+            flight.task.add_done_callback(done)
+        else:
+            self.stats["coalesced"] += 1
+
+        flight.waiters += 1
+        self.stats["max_waiters"] = max(self.stats["max_waiters"], flight.waiters)
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def snapshot(self) -> dict:
+        return {"in_flight": len(self.inflight), **self.stats}
@@ -0,0 +1,147 @@
+"""
+Context assembly for RAG prompts
+Retrieved chunks are deduplicated, consecutive chunks of the same document
+are merged back together, and the result fills a token budget in score
+order, so prompt size no longer depends on how large the ingested chunks
+happen to be.
+"""
+import re
+from typing import List, Optional, Set
+
+from pydantic import BaseModel
+
+from app.core.config.config import RAG_CONTEXT_TOKEN_BUDGET, RAG_DEDUP_THRESHOLD
+from app.core.embeding.openai_embeddings import normalize_text
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.rag.tokens import count_tokens, truncate_to_tokens
+
+_WORD = re.compile(r"\w+")
+SHINGLE_SIZE = 3
+
+# Packing outcomes since startup
+packing_stats = {"contexts": 0, "duplicates_dropped": 0, "chunks_merged": 0, "budget_dropped": 0, "truncated": 0}
+
+
+class ContextBlock(BaseModel):
+    text: str
+    score: float
+    source: Optional[str] = None
+    chunk_ids: List[int] = []
+    tokens: int = 0
+
+
+class PackedContext(BaseModel):
+    text: str
+    blocks: List[ContextBlock]
+    tokens: int
+
+
+def _content(result: RetrivalResuult) -> str:
+    return result.payload.get("content", result.payload.get("context", ""))
+
+
+def _chunk_index(result: RetrivalResuult) -> Optional[int]:
+    try:
+        return int(result.payload.get("chunk_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def shingles(text: str) -> Set[tuple]:
+    words = _WORD.findall(normalize_text(text))
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: Set[tuple], b: Set[tuple]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def deduplicate(results: List[RetrivalResuult], threshold: float = RAG_DEDUP_THRESHOLD) -> List[RetrivalResuult]:
+    """Drop chunks that are near-duplicates of a higher-scoring one"""
+    kept, kept_shingles = [], []
+    for result in sorted(results, key=lambda r: r.scorce, reverse=True):
+        sh = shingles(_content(result))
+        if any(jaccard(sh, other) >= threshold for other in kept_shingles):
+            packing_stats["duplicates_dropped"] += 1
+            continue
+        kept.append(result)
+        kept_shingles.append(sh)
+    return kept
+
+
+def merge_adjacent(results: List[RetrivalResuult]) -> List[ContextBlock]:
+    """
+    Merge chunks of the same source whose chunk_ids are consecutive into one
+    block scored by its best chunk; chunks without a source stay on their own
+    """
+    blocks: List[ContextBlock] = []
+    by_source = {}
+    for result in results:
+        source, index = result.payload.get("source"), _chunk_index(result)
+        if source is None or index is None:
+            blocks.append(ContextBlock(text=_content(result), score=result.scorce, source=source))
+        else:
+            by_source.setdefault(source, {})[index] = result
+
+    for source, chunks in by_source.items():
+        run: List[int] = []
+        for index in sorted(chunks):
+            if run and index != run[-1] + 1:
+                blocks.append(_run_block(source, run, chunks))
+                run = []
+            run.append(index)
+        blocks.append(_run_block(source, run, chunks))
+
+    return sorted(blocks, key=lambda b: b.score, reverse=True)
+
+
+def _run_block(source: str, run: List[int], chunks: dict) -> ContextBlock:
+    packing_stats["chunks_merged"] += len(run) - 1
+    return ContextBlock(
+        text="\n".join(_content(chunks[i]) for i in run),
+        score=max(chunks[i].scorce for i in run),
+        source=source,
+        chunk_ids=run
+    )
+
+
+def format_block(i: int, block: ContextBlock) -> str:
+    source = f" [{block.source}]" if block.source else ""
+    return f"[Document {i + 1}] (Score: {block.score:.3f}){source}:\n{block.text}"
+
+
+def pack_context(
+    results: List[RetrivalResuult],
+    token_budget: int = RAG_CONTEXT_TOKEN_BUDGET,
+    dedup_threshold: float = RAG_DEDUP_THRESHOLD
+) -> PackedContext:
+    """Deduplicate, merge and fill token_budget with the best-scoring blocks"""
+    packing_stats["contexts"] += 1
+    blocks = merge_adjacent(deduplicate(results, dedup_threshold))
+
+    selected: List[ContextBlock] = []
+    used = 0
+    for block in blocks:
+        # the header of each block counts against the budget too
+        tokens = count_tokens(format_block(len(selected), block))
+        if used + tokens <= token_budget:
+            selected.append(block.model_copy(update={"tokens": tokens}))
+            used += tokens
+        elif not selected:
+            # the best block alone is too long: keep its beginning
+            header = count_tokens(format_block(0, block.model_copy(update={"text": ""})))
+            text = truncate_to_tokens(block.text, token_budget - header)
+            truncated = block.model_copy(update={"text": text})
+            tokens = count_tokens(format_block(0, truncated))
+            selected.append(truncated.model_copy(update={"tokens": tokens}))
+            used += tokens
+            packing_stats["truncated"] += 1
+        else:
+            packing_stats["budget_dropped"] += 1
+
+    text = "\n\n".join(format_block(i, block) for i, block in enumerate(selected))
+    return PackedContext(text=text, blocks=selected, tokens=used)
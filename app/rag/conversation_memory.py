@@ -0,0 +1,191 @@
+"""
+Token-budgeted conversation memory for the search endpoints
+Recent turns of a chat session are loaded with a bounded keyset query and
+kept verbatim while they fit the token budget; older turns are folded into
+a rolling summary that is cached per session and only ever extended with
+the turns that newly fell out of the window. Summaries are cached per
+(user_id, session_id) and dropped when the session is deleted.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config.config import (
+    HISTORY_WINDOW_MESSAGES,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_TOKENS,
+    HISTORY_FOLD_MAX_MESSAGES,
+    HISTORY_MAX_SESSIONS
+)
+from app.core.embeding.openai_embeddings import normalize_text
+from app.core.services.mysql_service import MySQLService, get_mysql_service
+from app.rag.tokens import count_tokens, truncate_to_tokens
+
+# summarize(previous_summary, turns) -> new summary
+SummarizeFn = Callable[[str, List[dict]], Awaitable[str]]
+
+SessionKey = Tuple[int, str]  # (user_id, session_id)
+
+
+class SessionSummary(BaseModel):
+    text: str = ""
+    upto_message_id: int = 0  # last message folded into the summary
+
+
+class ConversationContext(BaseModel):
+    summary: str = ""
+    messages: List[dict] = []  # {"role", "content"}, oldest first
+
+    @property
+    def empty(self) -> bool:
+        return not self.summary and not self.messages
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + 4  # role and separators
+
+
+class ConversationMemory:
+    """
+    Prompt history per session: at most `token_budget` tokens of recent
+    turns plus a summary of at most `summary_tokens`, however long the
+    session gets.
+
+    When the unsummarized turns overflow the budget, the older ones are
+    folded into the summary until the rest fits in half of the budget, so
+    the summarizer runs once every few turns rather than on every turn.
+    """
+
+    def __init__(
+        self,
+        summarize_fn: SummarizeFn,
+        db: Optional[MySQLService] = None,
+        window: int = HISTORY_WINDOW_MESSAGES,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        summary_tokens: int = HISTORY_SUMMARY_TOKENS,
+        fold_max_messages: int = HISTORY_FOLD_MAX_MESSAGES,
+        max_sessions: int = HISTORY_MAX_SESSIONS
+    ):
+        self.summarize_fn = summarize_fn
+        self.db = db
+        self.window = window
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.fold_max_messages = fold_max_messages
+        self.max_sessions = max_sessions
+        self.summaries: "OrderedDict[SessionKey, SessionSummary]" = OrderedDict()
+        self.locks: Dict[SessionKey, asyncio.Lock] = {}
+        self.stats = {"loads": 0, "folds": 0, "folded_messages": 0, "fold_failures": 0}
+
+    def _summary(self, key: SessionKey) -> SessionSummary:
+        summary = self.summaries.get(key)
+        if summary is None:
+            summary = self.summaries[key] = SessionSummary()
+            while len(self.summaries) > self.max_sessions:
+                evicted, _ = self.summaries.popitem(last=False)
+                lock = self.locks.get(evicted)
+                if lock is not None and not lock.locked():
+                    del self.locks[evicted]
+        self.summaries.move_to_end(key)
+        return summary
+
+    def forget(self, user_id: int, session_id: Optional[str] = None):
+        """Drop the cached summary of a deleted session, or of all the user's sessions"""
+        for key in [k for k in self.summaries if k[0] == user_id and session_id in (None, k[1])]:
+            del self.summaries[key]
+            lock = self.locks.get(key)
+            if lock is not None and not lock.locked():
+                del self.locks[key]
+
+    def _fit(self, messages: List[dict], budget: int) -> List[dict]:
+        """Newest suffix of messages within budget (the newest one is truncated if it alone is too long)"""
+        kept, used = [], 0
+        for message in reversed(messages):
+            tokens = message_tokens(message)
+            if used + tokens > budget:
+                if not kept:
+                    kept.append({**message, "content": truncate_to_tokens(message["content"], budget - 4)})
+                break
+            kept.append(message)
+            used += tokens
+        return list(reversed(kept))
+
+    async def _fold(self, session_id: str, user_id: int, summary: SessionSummary, turns: List[dict], gap_before: Optional[int]):
+        """Extend the summary with turns (plus unsummarized ones older than the window)"""
+        db = self.db or get_mysql_service()
+        if gap_before is not None:
+            older = await db.get_recent_session_messages(
+                session_id, user_id, limit=self.fold_max_messages,
+                before_id=gap_before, after_id=summary.upto_message_id or None
+            )
+            turns = older + turns
+        if not turns:
+            return
+        try:
+            text = await self.summarize_fn(summary.text, turns)
+            summary.text = truncate_to_tokens(text.strip(), self.summary_tokens)
+            self.stats["folds"] += 1
+            self.stats["folded_messages"] += len(turns)
+        except Exception as e:
+            # keep the old summary; these turns are dropped from the prompt either way
+            print(f"Conversation summary failed: {e}")
+            self.stats["fold_failures"] += 1
+        summary.upto_message_id = turns[-1]["message_id"]
+
+    async def load(self, session_id: str, user_id: int, question: str = "") -> ConversationContext:
+        """Summary and recent turns of a session, excluding the question being asked"""
+        self.stats["loads"] += 1
+        db = self.db or get_mysql_service()
+        key = (user_id, session_id)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            # one message past the window tells whether older turns are missing from the summary
+            recent = await db.get_recent_session_messages(session_id, user_id, limit=self.window + 1)
+            if not recent:
+                # not this user's session, or deleted: nothing cached for it may reach the prompt
+                self.summaries.pop(key, None)
+                return ConversationContext()
+            summary = self._summary(key)
+            before_window = recent.pop(0) if len(recent) > self.window else None
+            # message ids are shared by all sessions, so only their order says anything
+            gap_before = None
+            if before_window is not None and before_window["message_id"] > summary.upto_message_id:
+                gap_before = recent[0]["message_id"]
+
+            # The client stores the user's message before asking
+            if recent and recent[-1]["role"] == "user" and normalize_text(recent[-1]["content"]) == normalize_text(question):
+                recent = recent[:-1]
+
+            pending = [m for m in recent if m["message_id"] > summary.upto_message_id]
+
+            if gap_before is None and sum(message_tokens(m) for m in pending) <= self.token_budget:
+                kept = pending
+            else:
+                kept = self._fit(pending, self.token_budget // 2)
+                folded = pending[:len(pending) - len(kept)]
+                await self._fold(session_id, user_id, summary, folded, gap_before)
+
+            return ConversationContext(
+                summary=summary.text,
+                messages=[{"role": m["role"], "content": m["content"]} for m in kept]
+            )
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "sessions": len(self.summaries)}
+
+
+# Global conversation memory instance, created by the agentic pipeline with its summarizer
+_conversation_memory: Optional[ConversationMemory] = None
+
+def init_conversation_memory(summarize_fn: SummarizeFn) -> ConversationMemory:
+    """Create the conversation memory shared by the search endpoints"""
+    global _conversation_memory
+    _conversation_memory = ConversationMemory(summarize_fn=summarize_fn)
+    return _conversation_memory
+
+def get_conversation_memory() -> Optional[ConversationMemory]:
+    """The shared conversation memory, None until the agentic pipeline is loaded"""
+    return _conversation_memory
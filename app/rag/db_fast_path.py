@@ -0,0 +1,72 @@
+"""
+Rule-based fast path for common database questions
+Recognizes room IDs, MSSVs and "which rooms are free" questions and plans
+the MCP tool calls directly, skipping both the routing and the
+tool-selection LLM calls. Only plain lookups qualify: the question must
+carry a lookup cue and be made of nothing but entities, cues and filler
+words. Anything else returns None and goes through the normal graph.
+"""
+import re
+import unicodedata
+from typing import List, Optional
+
+# Room IDs follow the seeded layout: building letter + floor + room number (A100 ... D403)
+ROOM_ID = re.compile(r"\b(?:phòng|room)\s+([A-Da-d]\d{3})\b", re.IGNORECASE)
+MSSV = re.compile(r"\b(SV\d{3,})\b", re.IGNORECASE)
+AVAILABLE_ROOMS = re.compile(
+    r"phòng\s+(?:nào\s+)?(?:còn\s+)?(?:trống|chỗ)|còn\s+phòng|phòng\s+còn\s+trống|"
+    r"available\s+rooms?|rooms?\s+(?:are\s+)?(?:still\s+)?available",
+    re.IGNORECASE
+)
+# Writes need names/birth years and confirmation semantics: leave them to the LLM
+MUTATION = re.compile(r"\b(?:thêm|xóa|xoá|đăng\s+ký|chuyển|rời|add|remove|delete|register|move)\b", re.IGNORECASE)
+# Filters the tools cannot express (building, floor, counts) also go to the LLM
+FILTERS = re.compile(r"\b(?:tòa|toà|tầng|building|floor)\b", re.IGNORECASE)
+# What the question asks about the entity: the fields get_student_info / get_room_info return
+LOOKUP_CUE = re.compile(
+    r"thông\s+tin|\btên\b|\bai\b|phòng\s+nào|còn\s+(?:chỗ|trống|slot)|\btrống\b|\bđầy\b|mấy\s+người|"
+    r"bao\s+nhiêu\s+người|sức\s+chứa|sinh\s+năm|\b(?:info|information|details|who|list|full|capacity|available)\b",
+    re.IGNORECASE
+)
+# Every other word of a lookup question; one outside this set ("gia hạn", "hợp đồng",
+# "tiền điện", "và") means there is more to answer than the tools return
+LOOKUP_WORDS = frozenset("""
+    sinh viên mssv mã số phòng tôi mình em bạn cho xem muốn biết hỏi tra cứu của là gì nào ai đang ở
+    có không còn chỗ trống slot thông tin tên năm bao nhiêu mấy người sức chứa đầy chưa hiện nay giờ bây
+    hãy vui lòng ạ với về danh sách những các trong nữa hết
+    room rooms student students info information details about of the what which who lives live living
+    in is are does do show me list full capacity available free still any there how many tell
+""".split())
+
+MAX_QUESTION_LENGTH = 200
+
+
+def is_plain_lookup(question: str, entities: List[str]) -> bool:
+    """A lookup cue, and no word that asks for something beyond the looked-up records"""
+    if not LOOKUP_CUE.search(question):
+        return False
+    ids = {e.lower() for e in entities}
+    return all(word in LOOKUP_WORDS or word in ids for word in re.findall(r"\w+", question.lower()))
+
+
+def plan_tool_calls(question: str) -> Optional[List[dict]]:
+    """Tool calls that fully answer the question, or None if it is ambiguous"""
+    question = unicodedata.normalize("NFC", question)
+    if len(question) > MAX_QUESTION_LENGTH or MUTATION.search(question):
+        return None
+
+    mssvs = list(dict.fromkeys(m.upper() for m in MSSV.findall(question)))
+    rooms = list(dict.fromkeys(r.upper() for r in ROOM_ID.findall(question)))
+    if not is_plain_lookup(question, mssvs + rooms):
+        return None
+
+    calls = [{"name": "get_student_info", "args": {"mssv": mssv}} for mssv in mssvs]
+    calls += [{"name": "get_room_info", "args": {"room_id": room}} for room in rooms]
+
+    if not calls and AVAILABLE_ROOMS.search(question) and not FILTERS.search(question):
+        calls = [{"name": "list_available_rooms", "args": {}}]
+
+    for i, call in enumerate(calls):
+        call["id"] = f"fast_path_{i}"
+        call["type"] = "tool_call"
+    return calls or None
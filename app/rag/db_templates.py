@@ -0,0 +1,136 @@
+"""
+Vietnamese answer templates for database tool results
+Structured MCP tool outputs are rendered directly, so the database agent
+can skip the LLM call that would only rephrase them
+"""
+import re
+from typing import Callable, Dict, List, Optional
+
+# Longer room lists are truncated in the rendered answer
+MAX_LISTED_ROOMS = 20
+
+# MCP error messages (English) and their Vietnamese rendering
+_ERROR_TEMPLATES = [
+    (re.compile(r"Student with ID (\S+) not found"), "Không tìm thấy sinh viên có MSSV {0}."),
+    (re.compile(r"Student with ID (\S+) already exists"), "Sinh viên có MSSV {0} đã tồn tại trong ký túc xá."),
+    (re.compile(r"Room (\S+) (?:not found|does not exist)"), "Phòng {0} không tồn tại."),
+    (re.compile(r"Room (\S+) is full \((\d+) students\)"), "Phòng {0} đã đủ người ({1} sinh viên)."),
+]
+
+
+def _location(data: dict) -> str:
+    parts = []
+    if data.get("building"):
+        parts.append(f"tòa {data['building']}")
+    if data.get("floor") is not None:
+        parts.append(f"tầng {data['floor']}")
+    return f" ({', '.join(parts)})" if parts else ""
+
+
+def render_error(result: dict) -> str:
+    error = str(result.get("error", ""))
+    for pattern, template in _ERROR_TEMPLATES:
+        match = pattern.search(error)
+        if match:
+            return template.format(*match.groups())
+    return f"Xin lỗi, không thể thực hiện yêu cầu: {error}"
+
+
+def render_student_info(result: dict) -> Optional[str]:
+    student = result.get("student")
+    if not student:
+        return None
+    text = f"Sinh viên {student['ten']} (MSSV: {student['mssv']}), sinh năm {student['nam_sinh']}"
+    if student.get("room_id"):
+        return f"{text}, đang ở phòng {student['room_id']}{_location(student)}."
+    return f"{text}, hiện chưa được xếp phòng."
+
+
+def render_room_info(result: dict) -> Optional[str]:
+    room = result.get("room")
+    if not room:
+        return None
+    students = result.get("students", [])
+    lines = [
+        f"Phòng {room['room_id']}{_location(room)} có sức chứa {room['capacity']} người, "
+        f"hiện có {result.get('current_students', len(students))} sinh viên "
+        f"và còn {result.get('available_slots', 0)} chỗ trống."
+    ]
+    if students:
+        lines.append("Danh sách sinh viên:")
+        lines.extend(f"- {s['ten']} (MSSV: {s['mssv']}, sinh năm {s['nam_sinh']})" for s in students)
+    else:
+        lines.append("Phòng hiện chưa có sinh viên nào.")
+    return "\n".join(lines)
+
+
+def render_available_rooms(result: dict) -> Optional[str]:
+    rooms = result.get("available_rooms")
+    if rooms is None:
+        return None
+    if not rooms:
+        return "Hiện không còn phòng nào trống."
+    lines = [f"Hiện có {result.get('total', len(rooms))} phòng còn chỗ trống:"]
+    lines.extend(
+        f"- Phòng {r['room_id']}{_location(r)}: còn {r['available_slots']}/{r['capacity']} chỗ"
+        for r in rooms[:MAX_LISTED_ROOMS]
+    )
+    if len(rooms) > MAX_LISTED_ROOMS:
+        lines.append(f"... và {len(rooms) - MAX_LISTED_ROOMS} phòng khác.")
+    return "\n".join(lines)
+
+
+def render_add_student(result: dict) -> Optional[str]:
+    student, status = result.get("student"), result.get("room_status")
+    if not student or not status:
+        return None
+    return (
+        f"Đã thêm sinh viên {student['ten']} (MSSV: {student['mssv']}) vào phòng {student['room_id']}. "
+        f"Phòng hiện có {status['current_students']}/{status['capacity']} sinh viên, "
+        f"còn {status['available_slots']} chỗ trống."
+    )
+
+
+def render_remove_student(result: dict) -> Optional[str]:
+    student = result.get("student")
+    if not student:
+        return None
+    return f"Đã xóa sinh viên {student['ten']} (MSSV: {student['mssv']}) khỏi phòng {student['room_id']}."
+
+
+RENDERERS: Dict[str, Callable[[dict], Optional[str]]] = {
+    "get_student_info": render_student_info,
+    "get_room_info": render_room_info,
+    "list_available_rooms": render_available_rooms,
+    "add_student": render_add_student,
+    "remove_student": render_remove_student,
+}
+
+
+def render_tool_result(tool_name: str, result) -> Optional[str]:
+    """Render one tool result, or None if it has no template"""
+    if not isinstance(result, dict):
+        return None
+    if result.get("ok") is False:
+        return render_error(result)
+    renderer = RENDERERS.get(tool_name)
+    if renderer is None:
+        return None
+    try:
+        return renderer(result)
+    except (KeyError, TypeError):
+        # unexpected shape; let the LLM phrase it
+        return None
+
+
+def render_tool_results(tool_calls: List[dict], results: list) -> Optional[str]:
+    """Render every result or none: one unrenderable result sends the turn to the LLM"""
+    if not results:
+        return None
+    rendered = []
+    for tool_call, result in zip(tool_calls, results):
+        text = render_tool_result(tool_call["name"], result)
+        if text is None:
+            return None
+        rendered.append(text)
+    return "\n\n".join(rendered)
@@ -0,0 +1,46 @@
+"""
+Per-request deadlines for the agent graph
+The deadline is an absolute perf_counter() time carried in the state; each
+node bounds its upstream calls by a slice of what is left and degrades
+(default route, skipped rerank or page reads, partial or canned answer)
+instead of waiting past it.
+"""
+import time
+from typing import Optional
+
+from app.core.config.config import REQUEST_DEADLINE_MS
+
+# Fast reply when nothing useful was produced in time
+TIMEOUT_ANSWER = "Xin lỗi, hệ thống đang phản hồi chậm. Vui lòng thử lại sau ít phút."
+
+# Deadline outcomes since startup: misses per node and degraded steps
+deadline_stats = {"exceeded": {}, "degraded": {}, "partial_answers": 0, "canned_answers": 0}
+
+
+def new_deadline(budget_ms: float = REQUEST_DEADLINE_MS) -> float:
+    return time.perf_counter() + budget_ms / 1000
+
+
+def remaining(state: dict) -> float:
+    """Seconds left before the request deadline"""
+    deadline = state.get("deadline") or new_deadline()
+    return max(deadline - time.perf_counter(), 0.0)
+
+
+def time_slice(state: dict, cap_ms: Optional[float] = None, reserve_ms: float = 0.0) -> float:
+    """
+    Seconds a step may take: what is left minus `reserve_ms` kept for the
+    steps after it, and at most `cap_ms`
+    """
+    seconds = remaining(state) - reserve_ms / 1000
+    if cap_ms is not None:
+        seconds = min(seconds, cap_ms / 1000)
+    return max(seconds, 0.0)
+
+
+def record_exceeded(node: str):
+    deadline_stats["exceeded"][node] = deadline_stats["exceeded"].get(node, 0) + 1
+
+
+def record_degraded(step: str):
+    deadline_stats["degraded"][step] = deadline_stats["degraded"].get(step, 0) + 1
@@ -0,0 +1,146 @@
+"""
+In-process histograms, counters and gauges for /stats and /metrics
+Buckets are cumulative upper bounds, the same shape Prometheus uses, and
+render_prometheus() writes everything in the Prometheus text format
+"""
+import bisect
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Prompt sizes in tokens
+TOKEN_BUCKETS = (128, 256, 512, 1024, 1536, 2048, 3072, 4096, 8192, 16384)
+# Latencies in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = TOKEN_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # beyond the last bound
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": buckets
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+_counters: Dict[Tuple[str, Labels], Counter] = {}
+_gauges: Dict[Tuple[str, Labels], Gauge] = {}
+
+
+def histogram(name: str, buckets: Sequence[float] = TOKEN_BUCKETS, **labels: str) -> Histogram:
+    """Get or create the histogram for a metric name and label values"""
+    key = (name, tuple(sorted(labels.items())))
+    if key not in _histograms:
+        _histograms[key] = Histogram(buckets)
+    return _histograms[key]
+
+
+def counter(name: str, **labels: str) -> Counter:
+    """Get or create the counter for a metric name and label values"""
+    key = (name, tuple(sorted(labels.items())))
+    if key not in _counters:
+        _counters[key] = Counter()
+    return _counters[key]
+
+
+def gauge(name: str, **labels: str) -> Gauge:
+    """Get or create the gauge for a metric name and label values"""
+    key = (name, tuple(sorted(labels.items())))
+    if key not in _gauges:
+        _gauges[key] = Gauge()
+    return _gauges[key]
+
+
+def histograms_snapshot() -> Dict[str, Dict[str, dict]]:
+    result: Dict[str, Dict[str, dict]] = {}
+    for (name, labels), hist in sorted(_histograms.items()):
+        result.setdefault(name, {})[",".join(value for _, value in labels) or "all"] = hist.snapshot()
+    return result
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    """Every histogram, counter and gauge in the Prometheus text exposition format"""
+    lines: List[str] = []
+    typed = set()
+    for (name, labels), hist in sorted(_histograms.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_label_text(labels, (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labels)} {hist.sum}")
+        lines.append(f"{name}_count{_label_text(labels)} {hist.count}")
+    for (name, labels), total in sorted(_counters.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_label_text(labels)} {total.value}")
+    for (name, labels), current in sorted(_gauges.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} gauge")
+            typed.add(name)
+        lines.append(f"{name}{_label_text(labels)} {current.value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,113 @@
+"""
+Multi-query retrieval for RAG
+The question is rephrased into a few variants by the LLM, all of them are
+searched in one batched Qdrant call, and the candidate lists are fused with
+reciprocal rank fusion. Paraphrases are cached per normalized question and
+bounded by a timeout; when they are late, the original question is searched
+alone.
+"""
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, List
+
+from app.core.config.config import (
+    MULTI_QUERY_VARIANTS,
+    MULTI_QUERY_TIMEOUT_MS,
+    MULTI_QUERY_CACHE_TTL,
+    MULTI_QUERY_CACHE_MAX_ENTRIES,
+    RRF_K
+)
+from app.core.embeding.openai_embeddings import normalize_text
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.core.services.ttl_cache import AsyncTTLCache
+
+# "1. ", "2) ", "- ", "* " prefixes the model sometimes adds anyway
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+VARIANT_PROMPT = """Viết lại câu hỏi sau thành {n} câu hỏi khác nhau có cùng ý nghĩa,
+dùng từ ngữ khác để tìm kiếm tài liệu tốt hơn.
+Mỗi câu hỏi trên một dòng, không đánh số, không giải thích.
+
+Câu hỏi: {question}"""
+
+
+def parse_variants(text: str, question: str, n: int) -> List[str]:
+    """One variant per line, without list markers, duplicates or the question itself"""
+    seen = {normalize_text(question)}
+    variants = []
+    for line in text.splitlines():
+        variant = _LIST_MARKER.sub("", line).strip().strip('"')
+        key = normalize_text(variant)
+        if variant and key not in seen:
+            seen.add(key)
+            variants.append(variant)
+    return variants[:n]
+
+
+class QueryExpander:
+    """Cached, time-bounded paraphrase generation"""
+
+    def __init__(
+        self,
+        generate_fn: Callable[[str], Awaitable[str]],
+        n_variants: int = MULTI_QUERY_VARIANTS,
+        timeout_ms: float = MULTI_QUERY_TIMEOUT_MS,
+        cache: AsyncTTLCache = None
+    ):
+        self.generate_fn = generate_fn
+        self.n_variants = n_variants
+        self.timeout_ms = timeout_ms
+        self.cache = cache or AsyncTTLCache(ttl=MULTI_QUERY_CACHE_TTL, max_entries=MULTI_QUERY_CACHE_MAX_ENTRIES)
+        self.stats = {"requests": 0, "expanded": 0, "timeouts": 0, "failures": 0}
+
+    async def _generate(self, question: str) -> List[str]:
+        text = await self.generate_fn(VARIANT_PROMPT.format(n=self.n_variants, question=question))
+        return parse_variants(text, question, self.n_variants)
+
+    async def expand(self, question: str) -> List[str]:
+        """Paraphrases of the question, or [] when they are not available in time"""
+        self.stats["requests"] += 1
+        try:
+            # a timed-out generation keeps running in the cache and serves the next asker
+            variants = await asyncio.wait_for(
+                self.cache.get_or_load(normalize_text(question), lambda: self._generate(question)),
+                self.timeout_ms / 1000
+            )
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return []
+        except Exception as e:
+            print(f"Query expansion failed: {e}")
+            self.stats["failures"] += 1
+            return []
+        self.stats["expanded"] += 1
+        return variants
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "cache": self.cache.snapshot()}
+
+
+def _result_key(result: RetrivalResuult) -> str:
+    return result.payload.get("doc_id") or result.payload.get("content", result.payload.get("context", ""))
+
+
+def rrf_fuse(result_lists: List[List[RetrivalResuult]], k: int = RRF_K) -> List[RetrivalResuult]:
+    """
+    Reciprocal rank fusion: each point scores sum(1 / (k + rank)) over the
+    lists it appears in. The fused score replaces `scorce`; the best vector
+    score is kept in the payload as `vector_score`.
+    """
+    fused: Dict[str, float] = {}
+    best: Dict[str, RetrivalResuult] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            key = _result_key(result)
+            fused[key] = fused.get(key, 0.0) + 1 / (k + rank)
+            if key not in best or result.scorce > best[key].scorce:
+                best[key] = result
+
+    ranked = sorted(fused, key=fused.get, reverse=True)
+    return [
+        RetrivalResuult(scorce=fused[key], payload={**best[key].payload, "vector_score": best[key].scorce})
+        for key in ranked
+    ]
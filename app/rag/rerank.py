@@ -0,0 +1,219 @@
+"""
+Cross-encoder rerank stage for RAG retrieval
+Over-fetched Qdrant candidates are rescored against the question by a
+CPU cross-encoder (MODEL_RERANK). Pairs from concurrent requests are
+micro-batched into one inference call, and a request skips reranking when
+the estimated wait would exceed its latency budget.
+"""
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Protocol, Tuple
+
+from app.core.config.config import (
+    MODEL_RERANK,
+    RERANK_MAX_LENGTH,
+    RERANK_MAX_BATCH_PAIRS,
+    RERANK_MAX_WAIT_MS,
+    RERANK_LATENCY_BUDGET_MS,
+    RERANK_INITIAL_MS_PER_PAIR
+)
+from app.core.schenma.reponse_schenma import RetrivalResuult
+
+Pair = Tuple[str, str]
+
+
+class Scorer(Protocol):
+    """Relevance model: higher is more relevant. Called from a worker thread."""
+
+    def load(self) -> None:
+        ...
+
+    def score(self, pairs: List[Pair]) -> List[float]:
+        ...
+
+
+class CrossEncoderScorer:
+    """sentence-transformers CrossEncoder on CPU, loaded on first use"""
+
+    def __init__(self, model_name: str = MODEL_RERANK, max_length: int = RERANK_MAX_LENGTH, device: str = "cpu"):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.device = device
+        self.model = None
+
+    def load(self):
+        if self.model is None:
+            from sentence_transformers import CrossEncoder
+            self.model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+
+    def score(self, pairs: List[Pair]) -> List[float]:
+        self.load()
+        logits = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        # bge rerankers output logits; squash so scores are comparable to cosine scores
+        return [1 / (1 + math.exp(-float(x))) for x in logits]
+
+
+class _Request:
+    __slots__ = ("pairs", "future")
+
+    def __init__(self, pairs: List[Pair], future: asyncio.Future):
+        self.pairs = pairs
+        self.future = future
+
+
+class MicroBatchReranker:
+    """
+    Queues rerank requests and scores them in batches of up to
+    `max_batch_pairs` pairs, waiting at most `max_wait_ms` for more
+    requests to join a batch. An EWMA of the per-pair cost estimates how
+    long a new request would take behind the queued ones.
+    """
+
+    def __init__(
+        self,
+        scorer: Scorer,
+        max_batch_pairs: int = RERANK_MAX_BATCH_PAIRS,
+        max_wait_ms: float = RERANK_MAX_WAIT_MS,
+        latency_budget_ms: float = RERANK_LATENCY_BUDGET_MS,
+        initial_ms_per_pair: float = RERANK_INITIAL_MS_PER_PAIR
+    ):
+        self.scorer = scorer
+        self.max_batch_pairs = max_batch_pairs
+        self.max_wait_ms = max_wait_ms
+        self.latency_budget_ms = latency_budget_ms
+        self.ms_per_pair = initial_ms_per_pair
+        self.measured = False
+        self.ready = False
+        self.queue: List[_Request] = []
+        self.queued_pairs = 0
+        self.worker: Optional[asyncio.Task] = None
+        # one inference at a time; the model parallelizes internally
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.stats = {
+            "requests": 0, "reranked": 0, "batches": 0, "pairs": 0,
+            "skipped_not_ready": 0, "skipped_budget": 0, "timeouts": 0, "failures": 0
+        }
+
+    async def load(self):
+        """Load the model off the event loop"""
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.scorer.load)
+        self.ready = True
+
+    def estimate_ms(self, pairs: int) -> float:
+        """Expected time until `pairs` new pairs are scored behind the current queue"""
+        return self.max_wait_ms + (self.queued_pairs + pairs) * self.ms_per_pair
+
+    async def rerank(
+        self,
+        query: str,
+        candidates: List[RetrivalResuult],
+        top_k: int,
+        budget_ms: Optional[float] = None
+    ) -> Optional[List[RetrivalResuult]]:
+        """Best top_k candidates by cross-encoder score, or None if reranking was skipped"""
+        self.stats["requests"] += 1
+        if not candidates:
+            return []
+        if not self.ready:
+            self.stats["skipped_not_ready"] += 1
+            return None
+        budget_ms = self.latency_budget_ms if budget_ms is None else budget_ms
+        if self.estimate_ms(len(candidates)) > budget_ms:
+            self.stats["skipped_budget"] += 1
+            return None
+
+        pairs = [(query, c.payload.get("content", c.payload.get("context", ""))) for c in candidates]
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append(_Request(pairs, future))
+        self.queued_pairs += len(pairs)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+
+        try:
+            scores = await asyncio.wait_for(asyncio.shield(future), budget_ms / 1000)
+        except asyncio.TimeoutError:
+            # the batch still completes; this request just stops waiting for it
+            self.stats["timeouts"] += 1
+            return None
+        except Exception as e:
+            print(f"Rerank failed: {e}")
+            self.stats["failures"] += 1
+            return None
+
+        self.stats["reranked"] += 1
+        ranked = sorted(zip(scores, candidates), key=lambda item: item[0], reverse=True)[:top_k]
+        return [
+            RetrivalResuult(scorce=score, payload={"vector_score": c.scorce, **c.payload})
+            for score, c in ranked
+        ]
+
+    def _take_batch(self) -> List[_Request]:
+        batch, pairs = [], 0
+        while self.queue and (not batch or pairs + len(self.queue[0].pairs) <= self.max_batch_pairs):
+            request = self.queue.pop(0)
+            batch.append(request)
+            pairs += len(request.pairs)
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self.queue:
+            if self.queued_pairs < self.max_batch_pairs:
+                # give concurrent requests a moment to join this batch
+                await asyncio.sleep(self.max_wait_ms / 1000)
+            batch = self._take_batch()
+            pairs = [pair for request in batch for pair in request.pairs]
+
+            start = time.perf_counter()
+            try:
+                scores = await loop.run_in_executor(self.executor, self.scorer.score, pairs)
+            except Exception as e:
+                scores, error = None, e
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.queued_pairs -= len(pairs)
+
+            self.stats["batches"] += 1
+            self.stats["pairs"] += len(pairs)
+            if scores is not None:
+                observed = elapsed_ms / len(pairs)
+                # the first measurement replaces the initial guess
+                self.ms_per_pair = 0.8 * self.ms_per_pair + 0.2 * observed if self.measured else observed
+                self.measured = True
+
+            offset = 0
+            for request in batch:
+                if not request.future.done():
+                    if scores is None:
+                        request.future.set_exception(error)
+                    else:
+                        request.future.set_result(scores[offset:offset + len(request.pairs)])
+                offset += len(request.pairs)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "ready": self.ready,
+            "ms_per_pair": round(self.ms_per_pair, 3),
+            "pairs_per_batch": round(self.stats["pairs"] / self.stats["batches"], 2) if self.stats["batches"] else 0.0
+        }
+
+
+# Global reranker instance
+_reranker: Optional[MicroBatchReranker] = None
+
+def get_reranker() -> MicroBatchReranker:
+    """Get or create reranker instance"""
+    global _reranker
+    if _reranker is None:
+        _reranker = MicroBatchReranker(CrossEncoderScorer())
+    return _reranker
+
+async def init_reranker():
+    """Load the rerank model; RAG keeps the vector order until it is ready"""
+    try:
+        await get_reranker().load()
+        print(f"Reranker ready: {MODEL_RERANK}")
+    except Exception as e:
+        print(f"Reranker unavailable: {e}")
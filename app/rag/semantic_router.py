@@ -0,0 +1,115 @@
+"""
+Embedding-based semantic router
+Routes a question by cosine similarity to per-route centroids of labelled
+example questions and defers to the LLM router when the decision is close
+"""
+import json
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config.config import SEMANTIC_ROUTER_MIN_MARGIN, SEMANTIC_ROUTER_MIN_SCORE
+from app.core.embeding.openai_embeddings import embed_texts
+
+ROUTE_EXAMPLES_PATH = Path(__file__).resolve().with_name("route_examples.json")
+
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class RouteDecision(BaseModel):
+    """Result of a semantic routing attempt"""
+    route: Optional[str] = None  # None when the LLM should decide
+    scores: Dict[str, float] = {}
+    margin: float = 0.0
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class SemanticRouter:
+    """
+    Nearest-centroid router over labelled example questions.
+    Centroids are computed once by `initialize()` with a single batched
+    embeddings call; `route()` is then pure vector math.
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn = embed_texts,
+        examples_path: Path = ROUTE_EXAMPLES_PATH,
+        min_score: float = SEMANTIC_ROUTER_MIN_SCORE,
+        min_margin: float = SEMANTIC_ROUTER_MIN_MARGIN
+    ):
+        self.embed_fn = embed_fn
+        self.examples_path = Path(examples_path)
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.routes: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self.stats = {"semantic": 0, "fallback": 0}
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None
+
+    def load_examples(self) -> Dict[str, List[str]]:
+        with open(self.examples_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    async def initialize(self):
+        """Embed the labelled examples and compute one centroid per route"""
+        examples = self.load_examples()
+        labels, texts = [], []
+        for route, questions in examples.items():
+            labels.extend([route] * len(questions))
+            texts.extend(questions)
+
+        vectors = _normalize(np.asarray(await self.embed_fn(texts), dtype=np.float32))
+
+        self.routes = list(examples.keys())
+        label_array = np.asarray(labels)
+        self.centroids = _normalize(np.stack([
+            vectors[label_array == route].mean(axis=0) for route in self.routes
+        ]))
+
+    def route(self, embedding: List[float]) -> RouteDecision:
+        """Pick a route for a question embedding, or none if the margin is too low"""
+        if not self.ready:
+            return RouteDecision()
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        sims = self.centroids @ query
+        order = np.argsort(sims)[::-1]
+        best = float(sims[order[0]])
+        margin = best - float(sims[order[1]]) if len(order) > 1 else best
+        scores = {route: float(sims[i]) for i, route in enumerate(self.routes)}
+
+        if best < self.min_score or margin < self.min_margin:
+            self.stats["fallback"] += 1
+            return RouteDecision(scores=scores, margin=margin)
+
+        self.stats["semantic"] += 1
+        return RouteDecision(route=self.routes[order[0]], scores=scores, margin=margin)
+
+
+# Global router instance
+_semantic_router: Optional[SemanticRouter] = None
+
+def get_semantic_router() -> SemanticRouter:
+    """Get or create semantic router instance"""
+    global _semantic_router
+    if _semantic_router is None:
+        _semantic_router = SemanticRouter()
+    return _semantic_router
+
+async def init_semantic_router():
+    """Precompute route centroids; the LLM router stays in charge if this fails"""
+    router = get_semantic_router()
+    try:
+        await router.initialize()
+    except Exception as e:
+        print(f"Semantic router disabled, falling back to LLM routing: {e}")
@@ -0,0 +1,239 @@
+"""
+Keyword (BM25) index over the knowledge base chunks
+Dense vectors blur exact terms such as "điều 12", room codes or MSSVs; this
+inverted index is kept next to the Qdrant collection, updated at ingest and
+persisted to disk, and its scores are fused with the dense ones by `alpha`.
+Only term statistics and doc_ids are held and written; the chunk texts
+live in Qdrant.
+"""
+import asyncio
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config.config import SPARSE_INDEX_PATH, BM25_K1, BM25_B
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.rag.bm25 import tokenize
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+SEARCH_METHODS = ("vector", "keyword", "hybrid")
+
+# doc_ids -> payloads of those still stored, keyed by doc_id
+FetchPayloads = Callable[[List[str]], Awaitable[Dict[str, dict]]]
+
+
+def index_terms(text: str) -> List[str]:
+    """
+    Syllables plus syllable bigrams: Vietnamese words span several
+    syllables ("ký túc xá"), and bigrams also keep "điều 12" together
+    """
+    syllables = tokenize(text)
+    return syllables + [f"{a}_{b}" for a, b in zip(syllables, syllables[1:])]
+
+
+def _content(payload: dict) -> str:
+    return payload.get("content", payload.get("context", ""))
+
+
+class SparseIndex:
+    """
+    In-memory inverted index of chunk texts keyed by doc_id, scored with
+    BM25. Only term statistics are kept and persisted; the payloads of the
+    top hits are fetched from Qdrant (`fetch_payloads`) at search time.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        fetch_payloads: Optional[FetchPayloads] = None
+    ):
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self.fetch_payloads = fetch_payloads
+        # one scoring thread: more would only contend with the event loop for the GIL
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bm25")
+        self.doc_lens: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}  # term -> doc_id -> frequency
+        self.total_len = 0
+        self.stats = {"searches": 0, "added": 0, "removed": 0, "rebuilds": 0}
+
+    def __len__(self) -> int:
+        return len(self.doc_lens)
+
+    def add(self, doc_id: str, payload: dict):
+        if doc_id in self.doc_lens:
+            self.remove(doc_id)
+        terms = Counter(index_terms(_content(payload)))
+        for term, freq in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = freq
+        self.doc_lens[doc_id] = sum(terms.values())
+        self.total_len += self.doc_lens[doc_id]
+        self.stats["added"] += 1
+
+    def remove(self, doc_id: str):
+        if doc_id not in self.doc_lens:
+            return
+        # the text is not kept, so walk the postings; removals only happen on re-ingest
+        for term in [t for t, docs in self.postings.items() if doc_id in docs]:
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+        self.total_len -= self.doc_lens.pop(doc_id)
+        self.stats["removed"] += 1
+
+    def clear(self):
+        self.doc_lens.clear()
+        self.postings.clear()
+        self.total_len = 0
+
+    def score(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """BM25 over the documents sharing at least one term with the query, best first"""
+        # runs in a worker thread while ingestion may add documents: read from copies
+        n, total_len = len(self.doc_lens), self.total_len
+        if not n:
+            return []
+        avg_len = total_len / n
+        scores: Dict[str, float] = {}
+        for term in set(index_terms(query)):
+            docs = list(self.postings.get(term, {}).items())
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, freq in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens.get(doc_id, avg_len) / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    async def search(self, query: str, top_k: int) -> List[RetrivalResuult]:
+        """Top BM25 hits with their payloads; scoring runs off the event loop"""
+        self.stats["searches"] += 1
+        if not self.doc_lens or self.fetch_payloads is None:
+            return []
+        ranked = await asyncio.get_running_loop().run_in_executor(self.executor, self.score, query, top_k)
+        payloads = await self.fetch_payloads([doc_id for doc_id, _ in ranked])
+        # a chunk deleted from Qdrant since it was indexed is skipped
+        return [RetrivalResuult(scorce=score, payload=payloads[doc_id]) for doc_id, score in ranked if doc_id in payloads]
+
+    def save(self):
+        """Write the term statistics, postings as flat [doc number, frequency, ...] lists; the chunk texts stay in Qdrant"""
+        if self.path is None:
+            return
+        numbers = {doc_id: i for i, doc_id in enumerate(self.doc_lens)}
+        data = {
+            "doc_ids": list(self.doc_lens),
+            "doc_lens": list(self.doc_lens.values()),
+            "postings": {term: [v for doc_id, freq in docs.items() for v in (numbers[doc_id], freq)]
+                         for term, docs in self.postings.items()}
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def load(self) -> bool:
+        if self.path is None or not self.path.exists():
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if "doc_ids" not in data:
+            return False  # older file with full payloads: rebuild
+        doc_ids = data["doc_ids"]
+        self.doc_lens = dict(zip(doc_ids, data["doc_lens"]))
+        self.postings = {term: {doc_ids[flat[i]]: flat[i + 1] for i in range(0, len(flat), 2)}
+                         for term, flat in data["postings"].items()}
+        self.total_len = sum(self.doc_lens.values())
+        return True
+
+    async def rebuild(self, qdrant_service) -> int:
+        """Re-index every chunk of the Qdrant collection"""
+        self.clear()
+        async for payload in qdrant_service.iter_payloads():
+            if payload.get("doc_id"):
+                self.add(payload["doc_id"], payload)
+        self.stats["rebuilds"] += 1
+        self.save()
+        return len(self)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "documents": len(self), "terms": len(self.postings)}
+
+
+def _min_max(results: List[RetrivalResuult]) -> Dict[str, float]:
+    if not results:
+        return {}
+    scores = [r.scorce for r in results]
+    low, high = min(scores), max(scores)
+    span = high - low
+    return {_key(r): (r.scorce - low) / span if span else 1.0 for r in results}
+
+
+def _key(result: RetrivalResuult) -> str:
+    return result.payload.get("doc_id") or _content(result.payload)
+
+
+def hybrid_fuse(dense: List[RetrivalResuult], sparse: List[RetrivalResuult], alpha: float) -> List[RetrivalResuult]:
+    """
+    Min-max normalize each list and score alpha * dense + (1 - alpha) * sparse;
+    alpha = 1 is pure vector search, 0 pure keyword search
+    """
+    dense_scores, sparse_scores = _min_max(dense), _min_max(sparse)
+    payloads = {_key(r): r.payload for r in sparse}
+    payloads.update({_key(r): r.payload for r in dense})
+    fused = {
+        key: alpha * dense_scores.get(key, 0.0) + (1 - alpha) * sparse_scores.get(key, 0.0)
+        for key in payloads
+    }
+    ranked = sorted(fused, key=fused.get, reverse=True)
+    return [RetrivalResuult(scorce=fused[key], payload=payloads[key]) for key in ranked]
+
+
+def combine(
+    search_method: str,
+    dense: List[RetrivalResuult],
+    sparse: List[RetrivalResuult],
+    alpha: float,
+    top_k: int
+) -> List[RetrivalResuult]:
+    """Results for a BatchQueryRequest.search_method ("Vector", "Keyword" or "Hybrid")"""
+    method = search_method.lower()
+    if method == "vector":
+        return dense[:top_k]
+    if method == "keyword":
+        return sparse[:top_k]
+    return hybrid_fuse(dense, sparse, alpha)[:top_k]
+
+
+# Global sparse index instance
+_sparse_index: Optional[SparseIndex] = None
+
+def get_sparse_index() -> SparseIndex:
+    """Get or create the sparse index of the knowledge base"""
+    global _sparse_index
+    if _sparse_index is None:
+        _sparse_index = SparseIndex(PROJECT_ROOT / SPARSE_INDEX_PATH)
+    return _sparse_index
+
+async def init_sparse_index(qdrant_service):
+    """Load the index from disk, rebuilding it when it is missing or out of date"""
+    index = get_sparse_index()
+    index.fetch_payloads = qdrant_service.get_payloads
+    try:
+        loaded = index.load()
+        points = await qdrant_service.count_points()
+        if not loaded or len(index) != points:
+            print(f"Rebuilding sparse index ({len(index)} indexed, {points} in Qdrant)")
+            await index.rebuild(qdrant_service)
+        print(f"Sparse index ready: {len(index)} chunks, {len(index.postings)} terms")
+    except Exception as e:
+        print(f"Sparse index unavailable: {e}")
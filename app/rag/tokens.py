@@ -0,0 +1,48 @@
+"""
+Token counting for prompt budgets
+Uses the tiktoken encoding of the chat model when it is available and a
+word/punctuation estimate otherwise (tiktoken downloads its encodings on
+first use, which fails on machines without internet access)
+"""
+import re
+from functools import lru_cache
+
+CHAT_MODEL = "gpt-4o-mini"
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(CHAT_MODEL)
+    except Exception as e:
+        print(f"tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def approximate_tokens(text: str) -> int:
+    """About one token per word or punctuation mark (Vietnamese syllables are mostly one token)"""
+    return len(_PIECES.findall(text))
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return approximate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text within max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is not None:
+        ids = encoding.encode(text, disallowed_special=())
+        return text if len(ids) <= max_tokens else encoding.decode(ids[:max_tokens])
+    pieces = list(_PIECES.finditer(text))
+    if len(pieces) <= max_tokens:
+        return text
+    return text[:pieces[max_tokens - 1].end()]
@@ -0,0 +1,113 @@
+"""
+Span-style latency instrumentation
+Graph nodes and external calls (OpenAI, Qdrant, MySQL, Serper, web pages)
+are timed into the metrics registry as latency histograms and error
+counters; every HTTP request carries a trace id in a context variable that
+the middleware returns as X-Trace-Id.
+"""
+import functools
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from app.rag.metrics import LATENCY_BUCKETS, Counter, Histogram, counter, histogram
+
+TRACE_HEADER = "X-Trace-Id"
+_VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="")
+
+
+def new_trace_id(incoming: Optional[str] = None) -> str:
+    """Reuse a well-formed incoming trace id, otherwise start a new one"""
+    if incoming and _VALID_TRACE_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def current_trace_id() -> str:
+    return trace_id_var.get()
+
+
+class Span:
+    """
+    Times a block into a latency histogram and counts it as an error if it
+    raises or calls fail(); a plain class rather than @contextmanager keeps
+    the per-span cost low
+    """
+    __slots__ = ("hist", "errors", "start", "failed")
+
+    def __init__(self, instruments: Tuple[Histogram, Counter]):
+        self.hist, self.errors = instruments
+        self.failed = False
+
+    def fail(self):
+        """Count the span as an error without raising"""
+        self.failed = True
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.hist.observe(time.perf_counter() - self.start)
+        if self.failed or (exc_type is not None and issubclass(exc_type, Exception)):
+            self.errors.inc()
+        return False
+
+
+_instruments: Dict[Tuple[str, ...], Tuple[Histogram, Counter]] = {}
+
+
+def _node_instruments(node: str) -> Tuple[Histogram, Counter]:
+    key = ("node", node)
+    if key not in _instruments:
+        _instruments[key] = (
+            histogram("agent_node_duration_seconds", LATENCY_BUCKETS, node=node),
+            counter("agent_node_errors_total", node=node)
+        )
+    return _instruments[key]
+
+
+def _call_instruments(service: str, operation: str) -> Tuple[Histogram, Counter]:
+    key = ("call", service, operation)
+    if key not in _instruments:
+        _instruments[key] = (
+            histogram("external_call_duration_seconds", LATENCY_BUCKETS, service=service, operation=operation),
+            counter("external_call_errors_total", service=service, operation=operation)
+        )
+    return _instruments[key]
+
+
+def node_span(node: str) -> Span:
+    return Span(_node_instruments(node))
+
+
+def call_span(service: str, operation: str) -> Span:
+    return Span(_call_instruments(service, operation))
+
+
+def traced_call(service: str, operation: str):
+    """Decorator timing an async external call"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with call_span(service, operation):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_node(node: str, fn):
+    """Wrap a graph node; a node that sets a new state error counts as failed"""
+    @functools.wraps(fn)
+    async def wrapper(state):
+        had_error = bool(state.get("error"))
+        with node_span(node) as span:
+            result = await fn(state)
+            if result.get("error") and not had_error:
+                span.fail()
+            return result
+    return wrapper
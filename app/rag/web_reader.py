@@ -0,0 +1,301 @@
+"""
+Reads the pages behind web search results
+Fetches the top organic links concurrently on the shared HTTP client,
+extracts their main text and keeps only the passages that best match the
+question, within a token budget, for the web search answer prompt.
+Result links come from a third party, so every URL, redirects included,
+must resolve to public addresses; parsing and ranking run off the event loop.
+"""
+import asyncio
+import ipaddress
+import os
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel
+
+from app.core.config.config import (
+    WEB_READER_TOP_N,
+    WEB_READER_PAGE_TIMEOUT,
+    WEB_READER_MAX_PAGE_BYTES,
+    WEB_READER_MAX_REDIRECTS,
+    WEB_READER_PASSAGE_WORDS,
+    WEB_CONTEXT_TOKEN_BUDGET
+)
+from app.core.services.client_registry import get_client_registry
+from app.rag.bm25 import BM25, tokenize
+from app.rag.tokens import count_tokens
+from app.rag.tracing import traced_call
+
+USER_AGENT = "Mozilla/5.0 (compatible; StudentAssistantBot/1.0)"
+
+# Let result pages resolve to loopback/private addresses; only for local stand-in servers
+WEB_READER_ALLOW_PRIVATE = os.getenv("WEB_READER_ALLOW_PRIVATE", "false").lower() == "true"
+
+# Elements whose text is never content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer", "aside", "form", "button"}
+# Elements that end a block of text
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dd", "dt", "br", "hr", "figcaption"
+}
+# Elements that hold the main content when a page marks it up
+MAIN_TAGS = {"article", "main"}
+# Blocks shorter than this are menus, breadcrumbs or buttons
+MIN_BLOCK_WORDS = 6
+# HTML handed to the parser at a time
+FEED_CHARS = 16 * 1024
+
+# Page fetch outcomes since startup
+reader_stats = {"pages_fetched": 0, "pages_failed": 0, "pages_timed_out": 0, "pages_blocked": 0}
+
+# one parsing thread: more would only contend with the event loop for the GIL
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="web_reader")
+
+
+class BlockedURLError(Exception):
+    """A page URL, or a redirect target, that is not a public http(s) address"""
+
+
+class Passage(BaseModel):
+    text: str
+    source: str
+    title: str = ""
+    score: float = 0.0
+
+
+class _TextExtractor(HTMLParser):
+    """Collects text blocks, remembering which ones sat inside <article>/<main>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[tuple] = []  # (text, in_main)
+        self.title = ""
+        self._parts: List[str] = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+
+    def _flush(self):
+        text = " ".join("".join(self._parts).split())
+        if text:
+            self.blocks.append((text, self._main_depth > 0))
+        self._parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS:
+            self._main_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS and self._main_depth:
+            self._main_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data.strip()
+        elif not self._skip_depth:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_text(html: str) -> tuple:
+    """(title, main text blocks) of an HTML page"""
+    parser = _TextExtractor()
+    try:
+        # in slices: one feed of a whole page holds the GIL, and so the event loop, for its full parse
+        for start in range(0, len(html), FEED_CHARS):
+            parser.feed(html[start:start + FEED_CHARS])
+        parser.close()
+    except Exception:
+        pass  # keep whatever was parsed before the markup broke
+    blocks = [(text, in_main) for text, in_main in parser.blocks if len(text.split()) >= MIN_BLOCK_WORDS]
+    main = [text for text, in_main in blocks if in_main]
+    return parser.title, main or [text for text, _ in blocks]
+
+
+def split_passages(blocks: List[str], max_words: int = WEB_READER_PASSAGE_WORDS) -> List[str]:
+    """
+    One passage per block, long blocks cut into max_words windows; short
+    neighbouring blocks are merged while the passage is under half of max_words
+    """
+    passages: List[List[str]] = []
+    for block in blocks:
+        words = block.split()
+        for start in range(0, len(words), max_words):
+            piece = words[start:start + max_words]
+            last = passages[-1] if passages else None
+            if last is not None and len(last) < max_words // 2 and len(last) + len(piece) <= max_words:
+                last.extend(piece)
+            else:
+                passages.append(list(piece))
+    return [" ".join(words) for words in passages]
+
+
+async def check_public_url(url: httpx.URL):
+    """Raise BlockedURLError unless url is http(s) and its host resolves only to global addresses"""
+    if url.scheme not in ("http", "https") or not url.host:
+        raise BlockedURLError(f"Not an http(s) URL: {url}")
+    if WEB_READER_ALLOW_PRIVATE:
+        return
+    try:
+        addresses = [ipaddress.ip_address(url.host)]
+    except ValueError:
+        infos = await asyncio.get_running_loop().getaddrinfo(url.host, url.port or (443 if url.scheme == "https" else 80))
+        addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    for address in addresses:
+        if not address.is_global or address.is_multicast:
+            raise BlockedURLError(f"{url.host} resolves to non-public address {address}")
+
+
+@traced_call("web", "fetch_page")
+async def _download(client: httpx.AsyncClient, url: str, max_bytes: int) -> Optional[str]:
+    target = httpx.URL(url)
+    # redirects are followed by hand so that every hop is checked before it is requested
+    for _ in range(WEB_READER_MAX_REDIRECTS + 1):
+        await check_public_url(target)
+        async with client.stream(
+            "GET", target, headers={"User-Agent": USER_AGENT, "Accept": "text/html"}, follow_redirects=False
+        ) as response:
+            if response.is_redirect:
+                target = response.url.join(response.headers["location"])
+                continue
+            if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+                return None
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    break
+            return b"".join(chunks)[:max_bytes].decode(response.encoding or "utf-8", errors="replace")
+    return None  # too many redirects
+
+
+async def fetch_page(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    timeout: float = WEB_READER_PAGE_TIMEOUT,
+    max_bytes: int = WEB_READER_MAX_PAGE_BYTES
+) -> Optional[str]:
+    """HTML of a page, or None if it failed, was not HTML or took longer than timeout"""
+    client = client or get_client_registry().http
+    try:
+        html = await asyncio.wait_for(_download(client, url, max_bytes), timeout)
+    except asyncio.TimeoutError:
+        reader_stats["pages_timed_out"] += 1
+        return None
+    except BlockedURLError as e:
+        print(f"Page fetch refused: {e}")
+        reader_stats["pages_blocked"] += 1
+        return None
+    except (httpx.HTTPError, UnicodeDecodeError, LookupError) as e:
+        print(f"Page fetch failed for {url}: {e}")
+        html = None
+    reader_stats["pages_fetched" if html is not None else "pages_failed"] += 1
+    return html
+
+
+def search_passages(results: dict) -> List[Passage]:
+    """Answer box, knowledge graph and organic snippets of a Serper response"""
+    passages = []
+    answer_box = results.get("answerBox") or {}
+    text = answer_box.get("answer") or answer_box.get("snippet")
+    if text:
+        passages.append(Passage(text=text, source=answer_box.get("link", ""), title=answer_box.get("title", "")))
+    knowledge_graph = results.get("knowledgeGraph") or {}
+    if knowledge_graph.get("description"):
+        passages.append(Passage(
+            text=knowledge_graph["description"],
+            source=knowledge_graph.get("descriptionLink", ""),
+            title=knowledge_graph.get("title", "")
+        ))
+    for result in results.get("organic") or []:
+        if result.get("snippet"):
+            passages.append(Passage(text=result["snippet"], source=result.get("link", ""), title=result.get("title", "")))
+    return passages
+
+
+def rank_passages(question: str, passages: List[Passage], token_budget: int = WEB_CONTEXT_TOKEN_BUDGET) -> List[Passage]:
+    """Best BM25 passages for the question whose total size fits the token budget"""
+    if not passages:
+        return []
+    scores = BM25([tokenize(p.text) for p in passages]).scores(tokenize(question))
+    ranked = sorted(zip(scores, range(len(passages))), key=lambda item: (-item[0], item[1]))
+
+    selected, used, seen = [], 0, set()
+    for score, index in ranked:
+        passage = passages[index]
+        if score <= 0 and selected:
+            break
+        if passage.text in seen:
+            continue
+        tokens = count_tokens(format_passages([passage]))
+        if used + tokens > token_budget:
+            continue  # a shorter passage further down may still fit
+        seen.add(passage.text)
+        selected.append(passage.model_copy(update={"score": score}))
+        used += tokens
+    return selected
+
+
+def format_passages(passages: List[Passage]) -> str:
+    return "\n\n".join(
+        f"[{i + 1}] {p.title} ({p.source})\n{p.text}" if p.source else f"[{i + 1}] {p.text}"
+        for i, p in enumerate(passages)
+    )
+
+
+async def build_web_context(
+    question: str,
+    search_results: List[dict],
+    top_n: int = WEB_READER_TOP_N,
+    token_budget: int = WEB_CONTEXT_TOKEN_BUDGET,
+    page_timeout: float = WEB_READER_PAGE_TIMEOUT,
+    client: Optional[httpx.AsyncClient] = None
+) -> str:
+    """
+    Rank search snippets together with passages from the top_n result pages,
+    fetched concurrently, and format the best ones within token_budget
+    """
+    passages: List[Passage] = []
+    links: Dict[str, str] = {}  # url -> title, in result order
+    for results in search_results:
+        passages.extend(search_passages(results))
+        for result in results.get("organic") or []:
+            if result.get("link") and len(links) < top_n:
+                links.setdefault(result["link"], result.get("title", ""))
+
+    pages = await asyncio.gather(*(fetch_page(url, client, page_timeout) for url in links))
+    fetched = [(url, title, html) for (url, title), html in zip(links.items(), pages) if html is not None]
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor, read_pages, question, passages, fetched, token_budget
+    )
+
+
+def read_pages(question: str, passages: List[Passage], pages: List[Tuple[str, str, str]], token_budget: int) -> str:
+    """Parse, split and rank the fetched (url, title, html) pages with the snippets; CPU-bound"""
+    passages = list(passages)
+    for url, title, html in pages:
+        page_title, blocks = extract_text(html)
+        passages.extend(
+            Passage(text=text, source=url, title=title or page_title)
+            for text in split_passages(blocks)
+        )
+    return format_passages(rank_passages(question, passages, token_budget))
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the agentic RAG pipeline.
+Run from the project root, e.g. `python -m benchmarks.bench_concurrency`.
+"""
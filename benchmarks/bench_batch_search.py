@@ -0,0 +1,99 @@
+"""
+Batch question answering: throughput against the concurrency limit.
+
+Runs stream_batch_answers over --questions RAG questions with fake
+upstreams: every LLM call takes --llm-latency, every embeddings request
+--embed-latency and every Qdrant request --qdrant-latency, whatever their
+size. The baseline answers the questions one at a time, as a client
+calling /search in a loop does. Each graph makes two sequential LLM calls
+(routing and answer), so batch throughput should track
+concurrency / (2 * llm_latency) while the embeddings and Qdrant requests
+stay at one per BATCH_EMBED_SIZE questions.
+
+    python -m benchmarks.bench_batch_search --questions 128 --concurrency 1 4 16 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+import app.rag.agentic as agentic
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from benchmarks.fakes import FixedLatencyChatModel
+
+calls = {"embeddings": 0, "qdrant": 0}
+
+
+def install_fakes(args):
+    fake = FixedLatencyChatModel(reply="rag", latency=args.llm_latency)
+    agentic.llm = fake
+    agentic._graph = None
+    agentic.ANSWER_CACHE_ENABLED = False  # the fake vectors would make every question a hit
+
+    async def embed_texts(texts):
+        calls["embeddings"] += 1
+        await asyncio.sleep(args.embed_latency)
+        return [[float(i + 1)] * 8 for i, _ in enumerate(texts)]
+
+    class FakeQdrant:
+        async def retrieve_points(self, embedding, similarity_top_k=3):
+            return (await self.batch_retrieve([embedding], similarity_top_k))[0]
+
+        async def batch_retrieve(self, embeddings, top_k=3):
+            calls["qdrant"] += 1
+            await asyncio.sleep(args.qdrant_latency)
+            return [[RetrivalResuult(scorce=0.9, payload={"content": "Ký túc xá đóng cửa lúc 23 giờ."})]
+                    for _ in embeddings]
+
+    async def embed_query(text):
+        return (await embed_texts([text]))[0]
+
+    agentic.embed_texts = embed_texts
+    agentic.embed_query = embed_query
+    qdrant = FakeQdrant()
+    agentic.get_rag_qdrant_service = lambda: qdrant
+
+
+async def sequential(questions):
+    graph = agentic.get_graph()
+    for question in questions:
+        await graph.ainvoke(agentic.build_initial_state(question))
+
+
+async def batch(questions, concurrency):
+    async for line in agentic.stream_batch_answers(agentic.get_graph(), questions, concurrency):
+        assert json.loads(line)["ok"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--qdrant-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    install_fakes(args)
+    questions = [f"Quy định số {i} của ký túc xá là gì?" for i in range(args.questions)]
+
+    print(f"{'mode':>14} {'q/s':>8} {'ideal':>8} {'embed reqs':>11} {'qdrant reqs':>12}")
+    runs = [("sequential", None)] + [(f"batch c={c}", c) for c in args.concurrency]
+    for label, concurrency in runs:
+        calls.update(embeddings=0, qdrant=0)
+        start = time.perf_counter()
+        if concurrency is None:
+            await sequential(questions)
+        else:
+            await batch(questions, concurrency)
+        qps = len(questions) / (time.perf_counter() - start)
+        ideal = (concurrency or 1) / (2 * args.llm_latency)
+        print(f"{label:>14} {qps:8.1f} {ideal:8.1f} {calls['embeddings']:>11} {calls['qdrant']:>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
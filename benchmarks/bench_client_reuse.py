@@ -0,0 +1,105 @@
+"""
+Per-request latency with fresh clients vs. the shared client registry.
+
+Starts local stand-ins for the OpenAI embeddings API and the Qdrant REST
+API, then runs the rag_agent retrieval path (embed question + vector
+search) two ways:
+
+    before  a new AsyncOpenAI and QdrantService per request, as rag_agent used to
+    after   the long-lived clients from ClientRegistry
+
+and reports latency percentiles and how many TCP connections each mode
+opened on the stand-ins.
+
+    python -m benchmarks.bench_client_reuse --requests 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+import openai
+
+from app.core.config.config import EMBEDDING_DIMS, OPENAI_EMBEDDING_MODEL
+from benchmarks.standins import (
+    StandInServer,
+    embeddings_handler,
+    qdrant_query_handler,
+    qdrant_root_handler
+)
+
+
+async def fresh_clients_request(openai_url: str, qdrant_port: int, question: str):
+    from app.db.qdrant_service import QdrantService
+
+    client = openai.AsyncOpenAI(api_key="benchmark", base_url=openai_url)
+    qdrant = QdrantService(embedding_dims=EMBEDDING_DIMS, host="127.0.0.1", port=qdrant_port)
+    try:
+        response = await client.embeddings.create(input=question, model=OPENAI_EMBEDDING_MODEL, dimensions=EMBEDDING_DIMS)
+        await qdrant.retrieve_points(embedding=response.data[0].embedding)
+    finally:
+        await client.close()
+        await qdrant.close()
+
+
+async def shared_clients_request(registry, question: str):
+    response = await registry.openai.embeddings.create(input=question, model=OPENAI_EMBEDDING_MODEL, dimensions=EMBEDDING_DIMS)
+    await registry.qdrant.retrieve_points(embedding=response.data[0].embedding)
+
+
+async def measure(make_request, requests: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await make_request(f"question {i}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies
+
+
+def report(label: str, latencies: List[float], servers):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    connections = sum(server.connections for server in servers)
+    print(f"{label:>7} mean={statistics.mean(latencies):7.2f} ms p50={statistics.median(latencies):7.2f} ms "
+          f"p95={p95:7.2f} ms connections={connections}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    openai_routes = {("POST", "/v1/embeddings"): embeddings_handler(EMBEDDING_DIMS)}
+    qdrant_routes = {("POST", "/collections/"): qdrant_query_handler, ("GET", "/"): qdrant_root_handler}
+
+    # before: fresh clients per request
+    async with StandInServer(openai_routes) as oa, StandInServer(qdrant_routes) as qd:
+        latencies = await measure(
+            lambda q: fresh_clients_request(f"{oa.url}/v1", qd.port, q), args.requests, args.concurrency
+        )
+        report("before", latencies, [oa, qd])
+
+    # after: the registry, pointed at the stand-ins through its environment
+    async with StandInServer(openai_routes) as oa, StandInServer(qdrant_routes) as qd:
+        os.environ["OPENAI_BASE_URL"] = f"{oa.url}/v1"
+        from app.core.services import client_registry
+        client_registry.OPENAI_API_KEY = "benchmark"
+        client_registry.QDRANT_URL = f"http://127.0.0.1:{qd.port}"
+        registry = client_registry.ClientRegistry()
+        try:
+            latencies = await measure(lambda q: shared_clients_request(registry, q), args.requests, args.concurrency)
+            report("after", latencies, [oa, qd])
+        finally:
+            await registry.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+A spike of near-identical questions on /search, with and without coalescing.
+
+--requests requests arrive within --spread seconds, each asking one of
+--distinct questions (the first one asked by --hot-share of them, like a
+notice everybody reads at once) with varying case and spacing. Every LLM
+call takes --latency seconds. The answer cache is off: a spike arriving
+within one graph execution finds it cold anyway. Reports LLM calls,
+p50/p95 latency and requests shed by admission control.
+
+    python -m benchmarks.bench_coalescing --requests 200 --spread 1.0
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from typing import Any, List, Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+from fastapi import HTTPException
+
+import app.rag.agentic as agentic
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from benchmarks.fakes import FixedLatencyChatModel
+
+
+class CountingChatModel(FixedLatencyChatModel):
+    calls: int = 0
+
+    async def _agenerate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        self.calls += 1
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def install_fakes(args) -> CountingChatModel:
+    model = CountingChatModel(reply="rag", latency=args.latency)
+    agentic.llm = model
+    agentic._graph = None
+    agentic.ANSWER_CACHE_ENABLED = False
+
+    class FakeQdrant:
+        async def retrieve_points(self, embedding, similarity_top_k=3):
+            return [RetrivalResuult(scorce=0.9, payload={"content": "Hạn đóng tiền điện tháng này là ngày 15."})]
+
+    async def embed_query(text):
+        return [0.0] * 8
+
+    agentic.embed_query = embed_query
+    agentic.get_rag_qdrant_service = lambda: FakeQdrant()
+    return model
+
+
+def spelled(rng: random.Random, question: str) -> str:
+    """The same question as different students type it"""
+    if rng.random() < 0.3:
+        question = question.lower()
+    if rng.random() < 0.3:
+        question = "  " + question.replace(" ", "  ", 1)
+    return question
+
+
+async def run(label: str, coalescing: bool, model: CountingChatModel, args):
+    agentic.QUESTION_COALESCING = coalescing
+    model.calls = 0
+    rng = random.Random(args.seed)
+    questions = [f"Hạn đóng tiền điện tháng {m} là ngày nào?" for m in range(1, args.distinct + 1)]
+    latencies, shed = [], 0
+
+    async def one(delay: float, question: str):
+        nonlocal shed
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        try:
+            await agentic.search_endpoint(agentic.QuestionRequest(question=question), user={"user_id": 0})
+            latencies.append(time.perf_counter() - start)
+        except HTTPException:
+            shed += 1
+
+    requests = []
+    for _ in range(args.requests):
+        question = questions[0] if rng.random() < args.hot_share else rng.choice(questions)
+        requests.append(one(rng.uniform(0, args.spread), spelled(rng, question)))
+    await asyncio.gather(*requests)
+
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else float("nan")
+    print(f"{label:>12} llm_calls={model.calls:4d} p50={statistics.median(latencies) if latencies else float('nan'):6.2f}s "
+          f"p95={p95:6.2f}s shed={shed:3d} coalesced={agentic.question_coalescer.stats['coalesced']}")
+    agentic.question_coalescer.stats.update(executions=0, coalesced=0, bypassed=0, shared_writes=0, max_waiters=0)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=1.0, help="Seconds over which the spike arrives")
+    parser.add_argument("--distinct", type=int, default=5, help="Different questions asked")
+    parser.add_argument("--hot-share", type=float, default=0.8, help="Share asking the most common question")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per LLM call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = install_fakes(args)
+    agentic.count_tokens("warm up")  # load (or give up on) the tokenizer outside the timed runs
+    await run("independent", False, model, args)
+    await run("coalesced", True, model, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
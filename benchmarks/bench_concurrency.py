@@ -0,0 +1,66 @@
+"""
+Concurrency benchmark for the LangGraph pipeline.
+
+Every LLM call is replaced with a fake that takes a fixed latency and always
+answers "database", so each request runs route_question + database_agent
+(two LLM calls, no tool calls) without touching OpenAI or MySQL. With fully
+async nodes, requests/sec should grow with concurrency; with --blocking the
+fake sleeps inside the event loop, which is what the old sync nodes did.
+
+    python -m benchmarks.bench_concurrency --latency 0.2 --concurrency 1 10 50
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+import app.rag.agentic as agentic
+from benchmarks.fakes import FixedLatencyChatModel
+
+
+def install_fake_llm(latency: float, blocking: bool):
+    fake = FixedLatencyChatModel(reply="database", latency=latency, blocking=blocking)
+    agentic.llm = fake
+    agentic.llm_with_db_tools = fake
+    agentic.llm_with_web_tools = fake
+    agentic._graph = None
+
+
+async def run_level(concurrency: int, requests: int) -> float:
+    graph = agentic.get_graph()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await graph.ainvoke(agentic.build_initial_state(f"Question {i}"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--blocking", action="store_true", help="Block the event loop inside the fake LLM")
+    args = parser.parse_args()
+
+    install_fake_llm(args.latency, args.blocking)
+
+    mode = "blocking" if args.blocking else "async"
+    print(f"mode={mode} llm_latency={args.latency}s requests={args.requests}")
+    print(f"{'concurrency':>12} {'req/s':>10} {'ideal':>10}")
+    for level in args.concurrency:
+        rps = await run_level(level, args.requests)
+        # Two sequential LLM calls per request bound throughput to level / (2 * latency)
+        ideal = level / (2 * args.latency)
+        print(f"{level:>12} {rps:>10.2f} {ideal:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+RAG prompt context: whole-chunk concatenation vs. the context packer.
+
+Builds synthetic retrieval results that look like the Docling ingest
+output: chunks of varying (sometimes very large) size, near-duplicate
+chunks from re-uploaded documents, and neighbouring chunks of the same
+file. For --queries random retrievals it reports the context tokens the
+old concatenation sent and what pack_context sends within its budget.
+
+    python -m benchmarks.bench_context_packing --queries 200 --budget 2000
+"""
+import argparse
+import random
+
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.rag.context_packer import pack_context, packing_stats
+from app.rag.metrics import Histogram
+from app.rag.tokens import count_tokens
+
+SENTENCES = [
+    "Sinh viên phải đăng ký tạm trú trong vòng 30 ngày kể từ ngày nhận phòng.",
+    "Ký túc xá đóng cửa lúc 23 giờ, sinh viên về muộn phải báo ban quản lý.",
+    "Lệ phí ký túc xá được đóng theo học kỳ tại phòng tài vụ hoặc chuyển khoản.",
+    "Nghiêm cấm nấu ăn trong phòng ở và sử dụng thiết bị điện công suất lớn.",
+    "Sinh viên vi phạm nội quy lần thứ hai sẽ bị chấm dứt hợp đồng lưu trú.",
+    "Học bổng khuyến khích học tập được xét theo điểm trung bình học kỳ.",
+]
+
+
+def make_chunk(rng: random.Random, sentences: int) -> str:
+    return " ".join(rng.choice(SENTENCES) + f" (mục {rng.randint(1, 500)})" for _ in range(sentences))
+
+
+def make_results(rng: random.Random, corpus: dict, top_k: int):
+    results = []
+    for _ in range(top_k):
+        source = rng.choice(list(corpus))
+        index = rng.randrange(len(corpus[source]))
+        for offset in (0, 1) if rng.random() < 0.3 else (0,):  # neighbours are often retrieved together
+            i = min(index + offset, len(corpus[source]) - 1)
+            results.append(RetrivalResuult(scorce=rng.uniform(0.3, 0.9), payload={
+                "content": corpus[source][i], "chunk_id": str(i), "source": source
+            }))
+        if rng.random() < 0.2:  # the same chunk ingested twice under another upload
+            results.append(RetrivalResuult(scorce=rng.uniform(0.3, 0.9), payload={
+                "content": corpus[source][index], "chunk_id": "0"
+            }))
+    return results[:top_k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--budget", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    corpus = {
+        f"document_{d}.pdf": [make_chunk(rng, rng.choice([3, 5, 8, 40])) for _ in range(30)]
+        for d in range(4)
+    }
+
+    before, after = Histogram(), Histogram()
+    for _ in range(args.queries):
+        results = make_results(rng, corpus, args.top_k)
+        old = "\n\n".join(
+            f"[Document {i+1}] (Score: {r.scorce:.3f}):\n{r.payload['content']}" for i, r in enumerate(results)
+        )
+        before.observe(count_tokens(old))
+        after.observe(pack_context(results, token_budget=args.budget).tokens)
+
+    for label, hist in (("concatenated", before), ("packed", after)):
+        snap = hist.snapshot()
+        print(f"{label:>12} mean={snap['mean']:7.0f} p50={snap['p50']:7.0f} p95={snap['p95']:7.0f} tokens")
+    print(packing_stats)
+
+
+if __name__ == "__main__":
+    main()
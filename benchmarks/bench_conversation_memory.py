@@ -0,0 +1,94 @@
+"""
+Prompt history size over a long chat session.
+
+Simulates a session of --turns question/answer pairs stored in an
+in-memory chat_messages table and loads the conversation memory before
+every question, as /search does with a session_id. Reports, every few
+turns, the tokens of verbatim history + summary that would go into the
+prompt, how many summarizer calls were made and how many rows each load
+read. The summarizer is a stand-in that keeps the newest sentences, so
+no LLM is needed.
+
+    python -m benchmarks.bench_conversation_memory --turns 300
+"""
+import argparse
+import asyncio
+import os
+import random
+from typing import List, Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+from app.rag.conversation_memory import ConversationMemory, message_tokens
+from app.rag.tokens import count_tokens, truncate_to_tokens
+
+SENTENCES = [
+    "Phòng A100 còn hai chỗ trống cho học kỳ này.",
+    "Sinh viên SV012 muốn chuyển sang tòa B vì gần giảng đường hơn.",
+    "Quy định ký túc xá yêu cầu về phòng trước 23 giờ mỗi ngày.",
+    "Lệ phí ký túc xá được đóng theo từng học kỳ tại phòng tài vụ.",
+    "Lịch thi học kỳ 2 bắt đầu từ đầu tháng sáu.",
+]
+
+
+class InMemoryChatStore:
+    """get_recent_session_messages over a list, counting rows read"""
+
+    def __init__(self):
+        self.messages: List[dict] = []
+        self.rows_read = 0
+        self.next_id = 1
+
+    def add(self, role: str, content: str):
+        self.messages.append({"message_id": self.next_id, "role": role, "content": content})
+        self.next_id += random.randint(1, 3)  # ids are shared with other sessions
+
+    async def get_recent_session_messages(self, session_id: str, user_id: int, limit: int,
+                                          before_id: Optional[int] = None, after_id: Optional[int] = None):
+        rows = [m for m in self.messages
+                if (before_id is None or m["message_id"] < before_id) and (after_id is None or m["message_id"] > after_id)]
+        rows = rows[-limit:]
+        self.rows_read += len(rows)
+        return rows
+
+
+async def keep_newest(previous: str, turns: List[dict]) -> str:
+    text = " ".join([previous] + [t["content"] for t in turns])
+    return text[-1500:]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--every", type=int, default=25)
+    args = parser.parse_args()
+
+    random.seed(0)
+    store = InMemoryChatStore()
+    memory = ConversationMemory(summarize_fn=keep_newest, db=store)
+    peak = 0
+
+    print(f"budget: {memory.token_budget} history + {memory.summary_tokens} summary tokens, window {memory.window} messages")
+    for turn in range(1, args.turns + 1):
+        question = f"Câu hỏi {turn}: " + " ".join(random.sample(SENTENCES, 2))
+        store.add("user", question)
+        store.rows_read = 0
+        context = await memory.load("session", 1, question)
+
+        history = sum(message_tokens(m) for m in context.messages)
+        summary = count_tokens(context.summary)
+        peak = max(peak, history + summary)
+        if turn % args.every == 0 or turn == 1:
+            print(f"turn {turn:4d}  messages={len(context.messages):3d}  history={history:5d}  "
+                  f"summary={summary:4d}  total={history + summary:5d}  rows_read={store.rows_read:3d}  "
+                  f"folds={memory.stats['folds']}")
+
+        answer = "Trả lời: " + " ".join(random.sample(SENTENCES, random.randint(1, 4)))
+        store.add("assistant", truncate_to_tokens(answer, 400))
+
+    print(f"peak prompt history: {peak} tokens over {args.turns} turns; {memory.snapshot()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Request deadlines under a slow upstream.
+
+Every LLM call takes --latency seconds, except a --slow-share of them
+that hang for --slow-latency seconds (an overloaded OpenAI region, a stuck
+connection). Runs --requests RAG questions with the default request
+deadline and with an effectively unlimited one, and reports p50/p99/max
+latency and how the answers degraded.
+
+    python -m benchmarks.bench_deadlines --requests 100 --deadline-ms 3000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from typing import Any, List, Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+import app.rag.agentic as agentic
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.rag.deadline import deadline_stats
+from benchmarks.fakes import FixedLatencyChatModel
+
+
+class HeavyTailChatModel(FixedLatencyChatModel):
+    slow_share: float = 0.1
+    slow_latency: float = 30.0
+    seed: int = 0
+
+    async def _agenerate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        rng = random.Random(hash((self.seed, str(messages[-1].content), time.perf_counter())))
+        await asyncio.sleep(self.slow_latency if rng.random() < self.slow_share else self.latency)
+        return self._result()
+
+
+def install_fakes(args):
+    agentic.llm = HeavyTailChatModel(reply="rag", latency=args.latency,
+                                     slow_share=args.slow_share, slow_latency=args.slow_latency)
+    agentic._graph = None
+    agentic.ANSWER_CACHE_ENABLED = False
+
+    class FakeQdrant:
+        async def retrieve_points(self, embedding, similarity_top_k=3):
+            return [RetrivalResuult(scorce=0.9, payload={"content": "Ký túc xá đóng cửa lúc 23 giờ."})]
+
+    async def embed_query(text):
+        return [0.0] * 8
+
+    agentic.embed_query = embed_query
+    agentic.get_rag_qdrant_service = lambda: FakeQdrant()
+
+
+async def run(label: str, requests: int, deadline_ms: float):
+    graph = agentic.get_graph()
+    deadline_stats.update(exceeded={}, degraded={}, partial_answers=0, canned_answers=0)
+    latencies = []
+
+    async def one(i: int):
+        state = agentic.build_initial_state(f"Câu hỏi số {i} về ký túc xá")
+        state["deadline"] = agentic.new_deadline(deadline_ms)
+        start = time.perf_counter()
+        await agentic.run_graph(graph, state)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(f"{label:>10} p50={statistics.median(latencies):6.2f}s p99={p99:6.2f}s max={latencies[-1]:6.2f}s "
+          f"exceeded={deadline_stats['exceeded']} canned={deadline_stats['canned_answers']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slow-share", type=float, default=0.1)
+    parser.add_argument("--slow-latency", type=float, default=10.0)
+    parser.add_argument("--deadline-ms", type=float, default=3000.0)
+    args = parser.parse_args()
+
+    install_fakes(args)
+    agentic.count_tokens("warm up")  # load (or give up on) the tokenizer outside the timed runs
+    # routing gets a proportionate slice of the shortened deadline
+    agentic.ROUTING_TIMEOUT_MS = args.deadline_ms / 4
+    agentic.ANSWER_RESERVE_MS = args.deadline_ms / 4
+    await run("deadline", args.requests, args.deadline_ms)
+    await run("unbounded", args.requests, 3_600_000)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
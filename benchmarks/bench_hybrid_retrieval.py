@@ -0,0 +1,128 @@
+"""
+Hybrid dense + BM25 retrieval: recall and keyword search latency.
+
+Builds a synthetic regulation collection: --chunks chunks, each an article
+("Điều N") or a room notice ("phòng A101") with topic sentences shared by
+many other chunks. Questions name one article or room, the way students
+ask. The dense stand-in embeds topic words only (hashed bag of words
+without digits), which is how real sentence embeddings blur "điều 12"
+and "điều 21"; pass --openai to embed with the real model instead.
+
+Reports recall@k of vector, keyword and hybrid search at several alphas,
+and the p50/p95 latency of BM25 scoring (SparseIndex.score, the part of
+SparseIndex.search that runs in a worker thread) at this collection size.
+
+    python -m benchmarks.bench_hybrid_retrieval --chunks 3000 --questions 300
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import zlib
+
+import numpy as np
+
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.rag.bm25 import tokenize
+from app.rag.sparse_index import SparseIndex, hybrid_fuse
+
+TOPICS = [
+    "sinh viên phải đăng ký tạm trú với ban quản lý ký túc xá",
+    "lệ phí ký túc xá được đóng theo học kỳ tại phòng tài vụ",
+    "nghiêm cấm nấu ăn và sử dụng thiết bị điện công suất lớn trong phòng",
+    "ký túc xá đóng cửa lúc 23 giờ và mở cửa lúc 5 giờ sáng",
+    "sinh viên vi phạm nội quy bị cảnh cáo hoặc chấm dứt hợp đồng",
+    "phòng được trang bị giường tầng tủ cá nhân và quạt trần",
+]
+DIMS = 256
+
+
+def make_corpus(rng: random.Random, chunks: int):
+    corpus = []
+    for i in range(chunks):
+        topic = rng.choice(TOPICS)
+        if i % 2:
+            label = f"Phòng {rng.choice('ABCD')}{rng.randint(1, 9)}{rng.randint(0, 99):02d}"
+        else:
+            label = f"Điều {i // 2 + 1}"
+        corpus.append((label, f"{label}. {topic}. {rng.choice(TOPICS)}."))
+    return corpus
+
+
+def hashed_embedding(text: str) -> np.ndarray:
+    vector = np.zeros(DIMS, dtype=np.float32)
+    for word in tokenize(text):
+        if not any(ch.isdigit() for ch in word):
+            vector[zlib.crc32(word.encode()) % DIMS] += 1.0
+    return vector / max(np.linalg.norm(vector), 1e-12)
+
+
+def dense_search(matrix: np.ndarray, query: np.ndarray, payloads: list, top_k: int):
+    scores = matrix @ query
+    best = np.argsort(-scores)[:top_k]
+    return [RetrivalResuult(scorce=float(scores[i]), payload=payloads[i]) for i in best]
+
+
+async def openai_embeddings(texts):
+    from app.core.embeding.openai_embeddings import embed_texts
+    vectors = []
+    for i in range(0, len(texts), 512):
+        vectors.extend(await embed_texts(texts[i:i + 512]))
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=3000)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--openai", action="store_true", help="embed with the OpenAI model (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    corpus = make_corpus(rng, args.chunks)
+    payloads = [{"doc_id": str(i), "content": text} for i, (_, text) in enumerate(corpus)]
+
+    index = SparseIndex()
+    start = time.perf_counter()
+    for payload in payloads:
+        index.add(payload["doc_id"], payload)
+    print(f"indexed {len(index)} chunks, {len(index.postings)} terms in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    targets = rng.sample(range(len(corpus)), args.questions)
+    questions = [f"{corpus[i][0].lower()} quy định như thế nào về {corpus[i][1].split('. ')[1][:40]}" for i in targets]
+
+    if args.openai:
+        matrix = asyncio.run(openai_embeddings([p["content"] for p in payloads]))
+        queries = asyncio.run(openai_embeddings(questions))
+    else:
+        matrix = np.stack([hashed_embedding(p["content"]) for p in payloads])
+        queries = np.stack([hashed_embedding(q) for q in questions])
+
+    alphas = (0.3, 0.5, 0.7)
+    hits = {"vector": 0, "keyword": 0, **{f"hybrid a={a}": 0 for a in alphas}}
+    latencies = []
+    for target, question, query in zip(targets, questions, queries):
+        dense = dense_search(matrix, query, payloads, args.top_k)
+        start = time.perf_counter()
+        ranked = index.score(question, args.top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sparse = [RetrivalResuult(scorce=score, payload=payloads[int(doc_id)]) for doc_id, score in ranked]
+
+        found = lambda results: str(target) in {r.payload["doc_id"] for r in results[:args.top_k]}
+        hits["vector"] += found(dense)
+        hits["keyword"] += found(sparse)
+        for a in alphas:
+            hits[f"hybrid a={a}"] += found(hybrid_fuse(dense, sparse, a))
+
+    for label, count in hits.items():
+        print(f"{label:>14} recall@{args.top_k}={count / args.questions:.3f}")
+    latencies.sort()
+    print(f"keyword search p50={statistics.median(latencies):.2f} ms "
+          f"p95={latencies[int(0.95 * (len(latencies) - 1))]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
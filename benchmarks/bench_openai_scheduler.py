@@ -0,0 +1,152 @@
+"""
+Interactive latency during document ingestion against a rate-limited model.
+
+A stand-in embeddings model enforces requests- and tokens-per-minute
+limits the way the API does (continuously refilled budgets, 429 with
+retry-after-ms once exceeded) and answers in --latency seconds. Ingestion
+embeds --chunks chunks while query embeddings arrive at --qps, either
+- direct: the previous path; ingestion embeds one chunk after another,
+  every call goes straight out and the SDK retries a 429 twice, honouring
+  retry-after, or
+- scheduled: OpenAIScheduler with the same limits; ingestion is batch
+  work submitted all at once, queries are interactive.
+Reports query latency p50/p95/max and failures, 429s seen, and ingestion
+time and lost chunks.
+
+    python -m benchmarks.bench_openai_scheduler --chunks 400 --qps 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import httpx
+import openai
+
+from app.core.services.openai_scheduler import BATCH, INTERACTIVE, OpenAIScheduler
+
+SDK_RETRIES = 2
+QUERY_TOKENS = 20
+
+
+class RateLimitedModel:
+    """Upstream stand-in: per-minute budgets refilled continuously, 429 when either runs out"""
+
+    def __init__(self, rpm: float, tpm: float, latency: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.latency = latency
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.rejected = 0
+
+    async def embed(self, tokens: int):
+        now = time.monotonic()
+        self.requests = min(self.rpm, self.requests + (now - self.updated) * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + (now - self.updated) * self.tpm / 60)
+        self.updated = now
+        if self.requests < 1 or self.tokens < tokens:
+            self.rejected += 1
+            wait = max((1 - self.requests) * 60 / self.rpm, (tokens - self.tokens) * 60 / self.tpm)
+            request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+            response = httpx.Response(429, headers={"retry-after-ms": str(int(wait * 1000) + 1)}, request=request)
+            raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+        self.requests -= 1
+        self.tokens -= tokens
+        await asyncio.sleep(self.latency)
+        return tokens
+
+
+async def direct_call(model: RateLimitedModel, tokens: int):
+    """The SDK's behaviour with its default max_retries"""
+    for attempt in range(SDK_RETRIES + 1):
+        try:
+            return await model.embed(tokens)
+        except openai.RateLimitError as e:
+            if attempt == SDK_RETRIES:
+                raise
+            await asyncio.sleep(float(e.response.headers["retry-after-ms"]) / 1000)
+
+
+async def run(mode: str, args):
+    model = RateLimitedModel(args.rpm, args.tpm, args.latency)
+    scheduler = OpenAIScheduler("bench", args.rpm, args.tpm)
+    rng = random.Random(args.seed)
+    chunk_tokens = [rng.randint(args.chunk_tokens // 2, args.chunk_tokens * 3 // 2) for _ in range(args.chunks)]
+
+    async def call(tokens: int, priority: int):
+        if mode == "direct":
+            return await direct_call(model, tokens)
+        return await scheduler.submit(lambda: model.embed(tokens), tokens, priority=priority)
+
+    async def ingest():
+        start = time.perf_counter()
+        if mode == "direct":
+            results = []
+            for tokens in chunk_tokens:
+                try:
+                    results.append(await call(tokens, BATCH))
+                except openai.RateLimitError as e:
+                    results.append(e)
+        else:
+            results = await asyncio.gather(*(call(t, BATCH) for t in chunk_tokens), return_exceptions=True)
+        return time.perf_counter() - start, sum(isinstance(r, Exception) for r in results)
+
+    latencies, failures = [], 0
+
+    async def query():
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            await call(QUERY_TOKENS, INTERACTIVE)
+            latencies.append((time.perf_counter() - start) * 1000)
+        except openai.RateLimitError:
+            failures += 1
+
+    ingestion = asyncio.create_task(ingest())
+    queries = []
+    while not ingestion.done():
+        queries.append(asyncio.create_task(query()))
+        await asyncio.sleep(rng.expovariate(args.qps))
+    ingest_seconds, lost = await ingestion
+    await asyncio.gather(*queries)
+
+    latencies.sort()
+    return {
+        "queries": len(queries),
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+        "max": latencies[-1] if latencies else float("nan"),
+        "failed": failures,
+        "429s": model.rejected,
+        "ingest_s": ingest_seconds,
+        "lost": lost,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=400, help="Chunks in the ingested document")
+    parser.add_argument("--chunk-tokens", type=int, default=100, help="Mean tokens per chunk")
+    parser.add_argument("--qps", type=float, default=2.0, help="Query embeddings per second")
+    parser.add_argument("--rpm", type=float, default=300)
+    parser.add_argument("--tpm", type=float, default=20000)
+    parser.add_argument("--latency", type=float, default=0.15, help="Seconds per upstream call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'failed':>6} "
+          f"{'429s':>5} {'ingest s':>9} {'lost':>5}")
+    for mode in ("direct", "scheduled"):
+        r = await run(mode, args)
+        print(f"{mode:<10} {r['queries']:>7} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['max']:>8.1f} {r['failed']:>6} "
+              f"{r['429s']:>5} {r['ingest_s']:>9.1f} {r['lost']:>5}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
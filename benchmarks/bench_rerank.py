@@ -0,0 +1,86 @@
+"""
+Micro-batched reranking under concurrency.
+
+Drives MicroBatchReranker with a deterministic scorer that costs a fixed
+overhead per inference call plus a per-pair cost (roughly how a CPU
+cross-encoder behaves), for --requests concurrent requests of
+--candidates candidates each:
+
+    unbatched  max_batch_pairs = candidates: one inference call per request
+    batched    pairs from concurrent requests share inference calls
+
+and a third run with a tight latency budget to show requests skipping the
+rerank instead of queueing. Pass --model to score with the real
+MODEL_RERANK cross-encoder instead (needs sentence-transformers).
+
+    python -m benchmarks.bench_rerank --requests 32 --candidates 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.rag.rerank import CrossEncoderScorer, MicroBatchReranker
+from benchmarks.fakes import LexicalOverlapScorer
+
+WORDS = "ký túc xá sinh viên phòng lệ phí học kỳ nội quy đăng ký giờ đóng cửa học bổng".split()
+
+
+def candidates(i: int, n: int):
+    return [
+        RetrivalResuult(scorce=1 - j / n, payload={"content": " ".join(WORDS[(i + j + k) % len(WORDS)] for k in range(12))})
+        for j in range(n)
+    ]
+
+
+async def run(label: str, reranker: MicroBatchReranker, requests: int, n: int, budget_ms: float):
+    latencies, skipped = [], 0
+
+    async def one(i: int):
+        nonlocal skipped
+        start = time.perf_counter()
+        result = await reranker.rerank(f"{WORDS[i % len(WORDS)]} {WORDS[(i + 3) % len(WORDS)]}", candidates(i, n),
+                                       top_k=8, budget_ms=budget_ms)
+        latencies.append((time.perf_counter() - start) * 1000)
+        skipped += result is None
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = (time.perf_counter() - start) * 1000
+    snap = reranker.snapshot()
+    print(f"{label:>10} wall={wall:7.0f} ms mean={statistics.mean(latencies):7.1f} ms max={max(latencies):7.1f} ms "
+          f"batches={snap['batches']:3d} pairs/batch={snap['pairs_per_batch']:6.1f} skipped={skipped}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--candidates", type=int, default=30)
+    parser.add_argument("--overhead-ms", type=float, default=40.0, help="fake scorer cost per inference call")
+    parser.add_argument("--per-pair-ms", type=float, default=1.0, help="fake scorer cost per pair")
+    parser.add_argument("--budget-ms", type=float, default=60000.0)
+    parser.add_argument("--model", action="store_true", help="use the real cross-encoder")
+    args = parser.parse_args()
+
+    def scorer():
+        if args.model:
+            return CrossEncoderScorer()
+        return LexicalOverlapScorer(args.overhead_ms, args.per_pair_ms)
+
+    configs = [
+        ("unbatched", dict(max_batch_pairs=args.candidates, max_wait_ms=0), args.budget_ms),
+        ("batched", dict(max_batch_pairs=256, max_wait_ms=5), args.budget_ms),
+        ("budget", dict(max_batch_pairs=256, max_wait_ms=5), 150.0),
+    ]
+    for label, kwargs, budget_ms in configs:
+        reranker = MicroBatchReranker(scorer(), **kwargs)
+        await reranker.load()
+        # one warm-up request so the per-pair estimate is measured
+        await reranker.rerank("ký túc xá", candidates(0, args.candidates), top_k=8, budget_ms=60000)
+        reranker.stats.update(batches=0, pairs=0)
+        await run(label, reranker, args.requests, args.candidates, budget_ms)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,360 @@
+"""
+Retrieval quality vs latency over a labelled question -> chunk set.
+
+Indexes benchmarks/data/retrieval_eval.json (regulation chunks, each
+question labelled with the chunks that answer it, plus synthetic
+distractor chunks) into Qdrant through QdrantService and sweeps, one at a
+time around the production defaults:
+- similarity_top_k
+- HNSW ef (and exact search)
+- embedding dimensions: text-embedding-3 vectors truncated and
+  renormalized, which is what the API's `dimensions` parameter returns
+- rerank on/off (RERANK_CANDIDATES over-fetched, then the reranker)
+- hybrid alpha (1.0 = vector only)
+reporting recall@k, MRR@k and the p50/p95 latency of the retrieval path
+(Qdrant, BM25 and fusion, rerank; the question embeddings are precomputed).
+
+Embeddings are computed once with the OpenAI model and cached as float16
+in benchmarks/data/retrieval_embeddings.npy, so later runs are fully
+offline; --hashed uses a hashed bag-of-words stand-in instead (no key
+needed, lexical only). Qdrant runs in qdrant-client's in-memory mode, which
+always searches exactly, so the ef sweep needs --qdrant-url pointing at a
+server (which is also where keyword hits get their payloads from; the
+in-memory run looks them up locally). Rerank uses a lexical-overlap stand-in unless --model loads the
+real cross-encoder.
+
+Results go to benchmarks/results/retrieval_benchmark.json and the chart
+to retrieval_benchmark.svg next to it; --chart-only redraws the chart from
+an existing results file.
+
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --hashed --qdrant-url http://localhost:6333
+    python -m benchmarks.bench_retrieval --chart-only
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+import warnings
+from html import escape
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config.config import (
+    EMBEDDING_DIMS,
+    RAG_HYBRID_ALPHA,
+    RAG_RETRIEVAL_TOP_K,
+    RERANK_CANDIDATES
+)
+from app.core.schenma.reponse_schenma import DocumentEbedingRequest
+from app.db.qdrant_service import QdrantService
+from app.rag.rerank import CrossEncoderScorer, MicroBatchReranker
+from app.rag.sparse_index import SparseIndex, hybrid_fuse
+from benchmarks.bench_hybrid_retrieval import make_corpus
+from benchmarks.fakes import LexicalOverlapScorer
+from benchmarks.standins import hashed_embedding
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+UPSERT_BATCH = 256
+
+
+def load_dataset(path: Path):
+    """Payloads of every chunk (labelled ones first) and the labelled questions"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    payloads = [{"doc_id": c["doc_id"], "content": c["content"], "source": c["source"]} for c in data["chunks"]]
+    for i, (_, text) in enumerate(make_corpus(random.Random(0), data["distractors"])):
+        payloads.append({"doc_id": f"distractor_{i}", "content": text, "source": "distractors"})
+    return payloads, data["questions"]
+
+
+async def openai_embeddings(texts: List[str]) -> np.ndarray:
+    from app.core.embeding.openai_embeddings import embed_texts
+    vectors = []
+    for i in range(0, len(texts), 512):
+        vectors.extend(await embed_texts(texts[i:i + 512]))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+async def load_embeddings(path: Path, texts: List[str], hashed: bool) -> np.ndarray:
+    """Cached vectors of `texts` (rows in order), embedding them when the cache does not match"""
+    if path.exists():
+        matrix = np.load(path)
+        if matrix.shape[0] == len(texts):
+            return matrix.astype(np.float32)
+        print(f"{path.name} has {matrix.shape[0]} rows for {len(texts)} texts, re-embedding")
+    if hashed:
+        matrix = np.asarray([hashed_embedding(t, EMBEDDING_DIMS) for t in texts], dtype=np.float32)
+    else:
+        matrix = await openai_embeddings(texts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, matrix.astype(np.float16))
+    print(f"saved {matrix.shape[0]} x {matrix.shape[1]} embeddings to {path}")
+    return matrix
+
+
+def truncate(matrix: np.ndarray, dims: int) -> np.ndarray:
+    """First `dims` components, renormalized (text-embedding-3 shortening)"""
+    head = matrix[:, :dims]
+    return head / np.maximum(np.linalg.norm(head, axis=1, keepdims=True), 1e-12)
+
+
+async def build_collection(qdrant_url: Optional[str], dims: int, payloads: List[dict], vectors: np.ndarray) -> QdrantService:
+    from urllib.parse import urlparse
+
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import OptimizersConfigDiff, PointStruct, VectorParams
+
+    if qdrant_url:
+        url = urlparse(qdrant_url)
+        service = QdrantService(embedding_dims=dims, host=url.hostname, port=url.port or 6333,
+                                collection_name=f"retrieval_bench_{dims}")
+    else:
+        # the remote client is only built to be replaced; the in-memory one ignores ef (reported as such)
+        warnings.filterwarnings("ignore", message="Failed to obtain server version")
+        warnings.filterwarnings("ignore", message="Local mode performs exact")
+        service = QdrantService(embedding_dims=dims, collection_name=f"retrieval_bench_{dims}")
+        await service.client.close()
+        service.client = AsyncQdrantClient(location=":memory:")
+
+    if await service.client.collection_exists(service.collection_name):
+        await service.client.delete_collection(service.collection_name)
+    # index from the first point, so even a small collection is searched through HNSW
+    await service.client.create_collection(
+        collection_name=service.collection_name,
+        vectors_config=VectorParams(size=dims, distance=service.distance_metric),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+    )
+    points = []
+    for i, (payload, vector) in enumerate(zip(payloads, vectors)):
+        request = DocumentEbedingRequest(doc_id=payload["doc_id"], context=payload["content"],
+                                         embeding=vector.tolist(), source=payload["source"])
+        points.append(PointStruct(id=i, vector=request.embeding, payload=service.build_payload(request)))
+    for i in range(0, len(points), UPSERT_BATCH):
+        await service.client.upsert(collection_name=service.collection_name, points=points[i:i + UPSERT_BATCH])
+
+    if qdrant_url:
+        await service.create_doc_id_index()
+        while (await service.client.get_collection(service.collection_name)).status != "green":
+            await asyncio.sleep(0.2)
+    return service
+
+
+class Bench:
+    def __init__(self, args, payloads: List[dict], questions: List[dict], matrix: np.ndarray, reranker):
+        self.args = args
+        self.payloads = payloads
+        self.questions = questions
+        self.chunk_vectors = matrix[:len(payloads)]
+        self.question_vectors = matrix[len(payloads):]
+        self.reranker = reranker
+        self.services: Dict[int, QdrantService] = {}
+        self.sparse = SparseIndex()
+        for payload in payloads:
+            self.sparse.add(payload["doc_id"], payload)
+        self.payloads_by_id = {payload["doc_id"]: payload for payload in payloads}
+
+    async def local_payloads(self, doc_ids: List[str]) -> Dict[str, dict]:
+        return {doc_id: self.payloads_by_id[doc_id] for doc_id in doc_ids}
+
+    async def service(self, dims: int) -> QdrantService:
+        if dims not in self.services:
+            self.services[dims] = await build_collection(
+                self.args.qdrant_url, dims, self.payloads, truncate(self.chunk_vectors, dims)
+            )
+        return self.services[dims]
+
+    async def retrieve(self, service, question: str, vector: List[float], config: dict):
+        """The RAG agent's retrieval path for one configuration"""
+        top_k = config["top_k"]
+        fetch_k = RERANK_CANDIDATES if config["rerank"] else top_k
+        ef = config["ef"]
+        results = await service.retrieve_points(
+            vector, similarity_top_k=fetch_k,
+            hnsw_ef=None if ef in (None, "exact") else ef, exact=ef == "exact"
+        )
+        if config["alpha"] < 1.0:
+            results = hybrid_fuse(results, await self.sparse.search(question, fetch_k), config["alpha"])[:fetch_k]
+        if config["rerank"]:
+            results = await self.reranker.rerank(question, results, top_k=top_k, budget_ms=60000)
+        return results[:top_k]
+
+    async def evaluate(self, config: dict) -> dict:
+        service = await self.service(config["dims"])
+        # keyword hits are looked up in Qdrant as in the app; the in-memory client would scan every point
+        self.sparse.fetch_payloads = service.get_payloads if self.args.qdrant_url else self.local_payloads
+        vectors = truncate(self.question_vectors, config["dims"])
+        recalls, reciprocal_ranks, latencies = [], [], []
+        for round_ in range(2):  # the first round warms caches and is not timed
+            for item, vector in zip(self.questions, vectors):
+                start = time.perf_counter()
+                results = await self.retrieve(service, item["question"], vector.tolist(), config)
+                elapsed = (time.perf_counter() - start) * 1000
+                if round_ == 0:
+                    continue
+                latencies.append(elapsed)
+                relevant = set(item["relevant"])
+                ranked = [r.payload.get("doc_id") for r in results]
+                recalls.append(len(relevant & set(ranked)) / len(relevant))
+                reciprocal_ranks.append(next((1 / (i + 1) for i, d in enumerate(ranked) if d in relevant), 0.0))
+        latencies.sort()
+        return {
+            "recall": round(float(np.mean(recalls)), 4),
+            "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+            "p50_ms": round(latencies[len(latencies) // 2], 3),
+            "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+        }
+
+    async def close(self):
+        for service in self.services.values():
+            if self.args.qdrant_url:
+                await service.client.delete_collection(service.collection_name)
+            await service.close()
+
+
+def parse_ef(value: str):
+    return value if value == "exact" else int(value)
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DATA_DIR.parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def label(param: str, value) -> str:
+    if param == "rerank":
+        return "rerank on" if value else "rerank off"
+    if param == "ef" and value is None:
+        return "ef=default"
+    return f"{param}={value}"
+
+
+def render_chart(report: dict) -> str:
+    """SVG in the style of evaluation_chart.svg: recall bar, MRR and p50 latency per swept value"""
+    width, row_height, bar_x, bar_width = 720, 24, 200, 300
+    rows = sum(len(points) + 2 for points in report["sweeps"].values())
+    height = 112 + rows * row_height + 24
+    baseline = report["baseline"]
+    parts = [
+        f'<svg viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg" '
+        'font-family="ui-monospace,SFMono-Regular,Menlo,monospace">',
+        f'  <rect width="{width}" height="{height}" fill="#0d1117" rx="12"/>',
+        '  <text x="36" y="38" font-size="15" font-weight="600" fill="#e6edf3">Retrieval quality vs latency</text>',
+        f'  <text x="36" y="56" font-size="11" fill="#7d8590">{escape(report["dataset"])} · '
+        f'commit {escape(report["commit"])}</text>',
+        f'  <text x="36" y="72" font-size="11" fill="#7d8590">embeddings: {escape(report["embeddings"])} · '
+        f'qdrant: {escape(report["qdrant"])} · rerank: {escape(report["scorer"])}</text>',
+        f'  <line x1="36" y1="84" x2="{width - 36}" y2="84" stroke="#30363d" stroke-width="1"/>',
+    ]
+    y = 108
+    for param, points in report["sweeps"].items():
+        parts.append(f'  <text x="36" y="{y}" font-size="11" font-weight="600" fill="#58a6ff">'
+                     f'{escape(param.upper())}</text>')
+        parts.append(f'  <text x="{bar_x}" y="{y}" font-size="10" fill="#7d8590">recall@k</text>')
+        parts.append(f'  <text x="560" y="{y}" font-size="10" fill="#7d8590">MRR</text>')
+        parts.append(f'  <text x="620" y="{y}" font-size="10" fill="#7d8590">p50 ms</text>')
+        y += row_height
+        for point in points:
+            is_baseline = point["value"] == baseline[param]
+            name = label(param, point["value"]) + (" ●" if is_baseline else "")
+            parts.append(f'  <text x="36" y="{y}" font-size="12" fill="#c9d1d9">{escape(name)}</text>')
+            parts.append(f'  <rect x="{bar_x}" y="{y - 11}" width="{bar_width}" height="14" rx="3" fill="#21262d"/>')
+            parts.append(f'  <rect x="{bar_x}" y="{y - 11}" width="{point["recall"] * bar_width:.1f}" height="14" '
+                         f'rx="3" fill="{"#238636" if is_baseline else "#1f6feb"}"/>')
+            parts.append(f'  <text x="{bar_x + bar_width + 8}" y="{y}" font-size="12" font-weight="600" '
+                         f'fill="#3fb950">{point["recall"]:.2f}</text>')
+            parts.append(f'  <text x="560" y="{y}" font-size="12" fill="#58a6ff">{point["mrr"]:.2f}</text>')
+            parts.append(f'  <text x="620" y="{y}" font-size="12" fill="#d29922">{point["p50_ms"]:.2f}</text>')
+            y += row_height
+        y += row_height
+    parts.append(f'  <text x="36" y="{height - 20}" font-size="10" fill="#7d8590">● production default; '
+                 'each sweep varies one parameter around the defaults</text>')
+    parts.append("</svg>")
+    return "\n".join(parts) + "\n"
+
+
+async def run(args) -> dict:
+    payloads, questions = load_dataset(args.dataset)
+    texts = [p["content"] for p in payloads] + [q["question"] for q in questions]
+    cache = args.embeddings or DATA_DIR / ("retrieval_embeddings_hashed.npy" if args.hashed else "retrieval_embeddings.npy")
+    matrix = await load_embeddings(cache, texts, args.hashed)
+
+    scorer, scorer_name = LexicalOverlapScorer(), "lexical stand-in"
+    if args.model:
+        scorer, scorer_name = CrossEncoderScorer(), "cross-encoder"
+    reranker = MicroBatchReranker(scorer, max_batch_pairs=RERANK_CANDIDATES)
+    await reranker.load()
+
+    baseline = {"top_k": RAG_RETRIEVAL_TOP_K, "ef": None, "dims": min(EMBEDDING_DIMS, matrix.shape[1]),
+                "rerank": False, "alpha": RAG_HYBRID_ALPHA}
+    sweeps = {
+        "top_k": args.top_k,
+        "ef": [None] + args.ef,
+        "dims": [d for d in args.dims if d <= matrix.shape[1]],
+        "rerank": [False, True],
+        "alpha": args.alpha,
+    }
+
+    bench = Bench(args, payloads, questions, matrix, reranker)
+    results = {}
+    try:
+        for param, values in sweeps.items():
+            results[param] = []
+            for value in values:
+                metrics = await bench.evaluate({**baseline, param: value})
+                results[param].append({"value": value, **metrics})
+                print(f"{label(param, value):>16}  recall@k={metrics['recall']:.3f}  mrr={metrics['mrr']:.3f}  "
+                      f"p50={metrics['p50_ms']:.2f} ms  p95={metrics['p95_ms']:.2f} ms")
+    finally:
+        await bench.close()
+
+    return {
+        "commit": current_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dataset": f"{len(questions)} questions · {len(payloads)} chunks",
+        "embeddings": f"{'hashed stand-in' if args.hashed else 'openai'} ({cache.name})",
+        "qdrant": args.qdrant_url or "in-memory, exact",
+        "scorer": scorer_name,
+        "baseline": baseline,
+        "sweeps": results,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", type=Path, default=DATA_DIR / "retrieval_eval.json")
+    parser.add_argument("--embeddings", type=Path, default=None, help="Embedding cache (.npy)")
+    parser.add_argument("--hashed", action="store_true", help="Hashed bag-of-words embeddings instead of OpenAI")
+    parser.add_argument("--qdrant-url", default=None, help="Qdrant server; in-memory when omitted")
+    parser.add_argument("--model", action="store_true", help="Rerank with the real cross-encoder")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, 5, 8, 10, 20])
+    parser.add_argument("--ef", type=parse_ef, nargs="+", default=[8, 16, 32, 64, 128, "exact"])
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 768, 1024])
+    parser.add_argument("--alpha", type=float, nargs="+", default=[0.0, 0.25, 0.5, 0.75, 1.0])
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "retrieval_benchmark.json")
+    parser.add_argument("--chart-only", action="store_true", help="Redraw the chart from --output")
+    args = parser.parse_args()
+
+    if args.chart_only:
+        report = json.loads(args.output.read_text(encoding="utf-8"))
+    else:
+        report = await run(args)
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"results saved to {args.output}")
+
+    chart = args.output.with_suffix(".svg")
+    chart.write_text(render_chart(report), encoding="utf-8")
+    print(f"chart saved to {chart}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Upstream Serper calls with and without the web search cache.
+
+Starts a local Serper stand-in that counts requests, then fires bursts of
+concurrent identical searches (as when many students ask the same news
+question at once) through the web_search tool:
+
+    uncached  every search calls the stand-in
+    cached    agentic.search_cache: concurrent identical searches share one
+              call, repeated ones are served from memory
+
+A last phase uses a short TTL to show stale-while-revalidate: once an
+entry expires the next burst is answered immediately from the stale value
+while a single background call refreshes it.
+
+    python -m benchmarks.bench_search_cache --queries 5 --burst 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+import app.rag.agentic as agentic
+from app.core.services.client_registry import get_client_registry
+from app.core.services.serper_client import SerperClient
+from app.core.services.ttl_cache import AsyncTTLCache
+from benchmarks.standins import StandInServer, serper_search_handler
+
+
+async def burst(queries: List[str], size: int) -> List[float]:
+    """`size` concurrent web_search calls per query; per-call latencies in ms"""
+    latencies = []
+
+    async def one(query: str):
+        start = time.perf_counter()
+        result = await agentic.web_search.ainvoke({"query": query})
+        assert "Stand-in snippet" in result, result
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(q) for q in queries for _ in range(size)))
+    return latencies
+
+
+def report(label: str, latencies: List[float], upstream: int):
+    print(f"{label:>22} calls={len(latencies):4d} upstream={upstream:4d} "
+          f"mean={statistics.mean(latencies):7.2f} ms max={max(latencies):7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=5, help="distinct queries per burst")
+    parser.add_argument("--burst", type=int, default=50, help="concurrent callers per query")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="stand-in response delay (s)")
+    args = parser.parse_args()
+
+    queries = [f"Thời tiết Hà Nội hôm nay {i}" for i in range(args.queries)]
+    agentic.SERPER_API_KEY = "benchmark"
+    registry = get_client_registry()
+
+    async with StandInServer({("POST", "/search"): serper_search_handler}, latency=args.latency) as server:
+        registry._serper = SerperClient(registry.http, api_key="benchmark", base_url=server.url)
+
+        def upstream() -> int:
+            return server.requests["/search"]
+
+        # uncached: a cache that never keeps anything and never coalesces
+        async def direct(key, loader, ttl=None):
+            return await loader()
+
+        cached_get = agentic.search_cache.get_or_load
+        agentic.search_cache.get_or_load = direct
+        for round_ in range(args.rounds):
+            before = upstream()
+            report(f"uncached round {round_ + 1}", await burst(queries, args.burst), upstream() - before)
+
+        agentic.search_cache.get_or_load = cached_get
+        for round_ in range(args.rounds):
+            before = upstream()
+            report(f"cached round {round_ + 1}", await burst(queries, args.burst), upstream() - before)
+
+        # stale-while-revalidate with a TTL short enough to expire between bursts
+        agentic.search_cache = AsyncTTLCache(ttl=0.5, stale_ttl=30.0)
+        before = upstream()
+        report("swr: cold", await burst(queries, args.burst), upstream() - before)
+        await asyncio.sleep(0.6)
+        before = upstream()
+        report("swr: expired", await burst(queries, args.burst), upstream() - before)
+        await asyncio.sleep(args.latency * 2)  # let the background refreshes land
+        print(f"{'swr: refreshes':>22} upstream={upstream() - before}")
+        print(agentic.search_cache.snapshot())
+
+        await registry.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Time to first token on /search/stream against a fake streaming model.
+
+Every LLM call waits --latency seconds and then streams its reply word by
+word, --chunk-delay seconds apart. Drives --requests RAG questions (up to
+--concurrency at a time) through stream_search_events, checks that each
+one yields route -> retrieval status -> tokens -> done with the tokens
+adding up to the final answer, and reports p50/p95 time to the first
+token frame against time to the done frame.
+
+    python -m benchmarks.bench_stream --requests 50 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+import app.rag.agentic as agentic
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from benchmarks.fakes import StreamingChatModel
+
+ANSWER = "Hạn đóng tiền điện tháng này là ngày 15 , chuyển khoản hoặc nộp tại văn phòng ký túc xá ."
+
+
+def install_fakes(args):
+    agentic.llm = StreamingChatModel(reply=ANSWER, latency=args.latency, chunk_delay=args.chunk_delay)
+    agentic._graph = None
+    agentic.ANSWER_CACHE_ENABLED = False
+    agentic.QUESTION_COALESCING = False
+
+    class FakeQdrant:
+        async def retrieve_points(self, embedding, similarity_top_k=3):
+            return [RetrivalResuult(scorce=0.9, payload={"content": "Hạn đóng tiền điện tháng này là ngày 15."})]
+
+    async def embed_query(text):
+        return [0.0] * 8
+
+    agentic.embed_query = embed_query
+    agentic.get_rag_qdrant_service = lambda: FakeQdrant()
+
+
+def parse_frame(frame: str):
+    event, data = frame.strip().split("\n", 1)
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def check_sequence(events: list):
+    """route -> status started -> status completed -> token(s) -> done, nothing after done"""
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "route" and events[0][1]["route"] == "rag", events[0]
+    statuses = [data["status"] for kind, data in events if kind == "status"]
+    assert statuses == ["started", "completed"], statuses
+    first_token = kinds.index("token")
+    assert kinds.index("status") < first_token and kinds[first_token:-1] == ["token"] * (len(kinds) - first_token - 1), kinds
+    kind, done = events[-1]
+    assert kind == "done" and done["ok"], events[-1]
+    assert "".join(data["content"] for kind, data in events if kind == "token") == done["answer"], done
+
+
+async def one(question: str):
+    state = agentic.build_initial_state(question)
+    start = time.perf_counter()
+    first_token = None
+    events = []
+    async for frame in agentic.stream_search_events(agentic.get_graph(), state):
+        kind, data = parse_frame(frame)
+        if kind == "token" and first_token is None:
+            first_token = time.perf_counter() - start
+        events.append((kind, data))
+    check_sequence(events)
+    return first_token, time.perf_counter() - start
+
+
+def percentile(values: list, share: float) -> float:
+    return sorted(values)[int(share * (len(values) - 1))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before each LLM call's first word")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed words")
+    args = parser.parse_args()
+
+    install_fakes(args)
+    agentic.count_tokens("warm up")  # load (or give up on) the tokenizer outside the timed runs
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i: int):
+        async with semaphore:
+            return await one(f"Hạn đóng tiền điện tháng {i % 12 + 1} là ngày nào?")
+
+    results = await asyncio.gather(*(limited(i) for i in range(args.requests)))
+    first_tokens = [first for first, _ in results]
+    totals = [total for _, total in results]
+    print(f"{args.requests} streams, event order ok")
+    print(f"first token p50={statistics.median(first_tokens):6.3f}s p95={percentile(first_tokens, 0.95):6.3f}s")
+    print(f"done        p50={statistics.median(totals):6.3f}s p95={percentile(totals, 0.95):6.3f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Cost of the tracing instrumentation.
+
+1. Micro: nanoseconds per call_span() enter/exit, against an empty loop.
+2. Graph: --requests RAG questions through the compiled graph with a
+   zero-latency fake LLM, fake embeddings and a fake Qdrant, so the graph's
+   own overhead dominates; once with TRACING on (node spans) and once with it
+   off. The OpenAI/Qdrant call spans are always on and run in both.
+
+Real requests spend hundreds of milliseconds in OpenAI, so the graph
+difference is an upper bound on the relative overhead.
+
+    python -m benchmarks.bench_tracing_overhead --requests 500
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+import app.rag.agentic as agentic
+from app.core.schenma.reponse_schenma import RetrivalResuult
+from app.rag.tracing import call_span
+from benchmarks.fakes import FixedLatencyChatModel
+
+
+def micro(iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    empty = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with call_span("qdrant", "search"):
+            pass
+    spans = time.perf_counter() - start
+
+    print(f"call_span      {(spans - empty) / iterations * 1e9:8.0f} ns")
+
+
+def install_fakes():
+    async def embed_query(text):
+        return [0.0] * 8
+
+    class FakeQdrant:
+        async def retrieve_points(self, embedding, similarity_top_k=3):
+            return [RetrivalResuult(scorce=0.9, payload={"content": "Ký túc xá đóng cửa lúc 23 giờ."})]
+
+    agentic.embed_query = embed_query
+    agentic.get_rag_qdrant_service = lambda: FakeQdrant()
+    agentic.ANSWER_CACHE_ENABLED = False
+    agentic.count_tokens("warm up")
+
+
+async def graph_run(tracing: bool, requests: int) -> float:
+    agentic.TRACING = tracing
+    agentic.llm = FixedLatencyChatModel(reply="rag", latency=0.0)
+    agentic._graph = None
+    graph = agentic.get_graph()
+    await graph.ainvoke(agentic.build_initial_state("warm up"))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # the nodes' progress prints would dominate
+        for i in range(requests):
+            await graph.ainvoke(agentic.build_initial_state(f"Câu hỏi {i}"))
+    return (time.perf_counter() - start) / requests * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    micro(args.iterations)
+
+    install_fakes()
+    # alternate and keep the best round of each, the runs are short enough to be noisy
+    off = on = float("inf")
+    for _ in range(args.rounds):
+        off = min(off, await graph_run(False, args.requests))
+        on = min(on, await graph_run(True, args.requests))
+    print(f"graph  off={off:.3f} ms  on={on:.3f} ms  overhead={on - off:.3f} ms ({(on - off) / off * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Web page reader against a local fixture web server.
+
+Serves a handful of fixture pages (one slow, one not HTML, the rest with
+navigation/footer noise around an article) plus a Serper stand-in whose
+organic results link to them, then compares for one question:
+
+    summary  the Serper summary string web_search_agent used to send
+    reader   snippets + fetched page passages ranked by BM25 within the
+             token budget (app.rag.web_reader.build_web_context)
+
+and reports prompt tokens, wall time (bounded by the per-page timeout even
+with a page that never answers) and the top passages.
+
+    python -m benchmarks.bench_web_reader --page-timeout 1.0 --budget 600
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+os.environ.setdefault("WEB_READER_ALLOW_PRIVATE", "true")  # the fixture pages are served on 127.0.0.1
+
+import httpx
+
+from app.core.services.serper_client import SerperClient
+from app.rag import web_reader
+from app.rag.tokens import count_tokens
+from benchmarks.standins import StandInServer
+
+QUESTION = "Lịch thi học kỳ 2 năm 2025 của trường bắt đầu khi nào?"
+
+NAV = "<nav><a href='/'>Trang chủ</a> | <a href='/tin-tuc'>Tin tức</a> | <a href='/lien-he'>Liên hệ</a></nav>"
+FOOTER = "<footer>Bản quyền thuộc về nhà trường. Mọi hình thức sao chép cần ghi rõ nguồn trích dẫn đầy đủ.</footer>"
+FILLER = (
+    "<p>Nhà trường luôn khuyến khích sinh viên tham gia các hoạt động ngoại khóa, câu lạc bộ học thuật "
+    "và các chương trình tình nguyện nhằm phát triển kỹ năng mềm trong suốt quá trình học tập.</p>"
+)
+
+
+def page(title: str, body: str) -> str:
+    return (f"<html><head><title>{title}</title><script>var tracking = 1;</script></head>"
+            f"<body>{NAV}<article><h1>{title}</h1>{body}</article>{FOOTER}</body></html>")
+
+
+PAGES = {
+    "/exam": page("Thông báo lịch thi học kỳ 2 năm 2025", FILLER * 3 + (
+        "<p>Lịch thi học kỳ 2 năm học 2024-2025 bắt đầu từ ngày 02/06/2025 và kết thúc ngày 21/06/2025. "
+        "Sinh viên xem phòng thi và số báo danh trên cổng thông tin đào tạo trước ngày thi ba ngày.</p>"
+    ) + FILLER * 3),
+    "/dorm": page("Ký túc xá mở đăng ký", FILLER * 2 + (
+        "<p>Ký túc xá mở đăng ký chỗ ở cho học kỳ 2 từ ngày 15/01/2025, sinh viên nộp hồ sơ trực tuyến.</p>"
+    ) + FILLER * 2),
+    "/news": page("Tin tức tổng hợp", FILLER * 8),
+    "/pdf": "not html",
+}
+
+
+# Set at the end of the run so the slow page's handler can finish
+release = None
+
+
+async def slow_page(body: dict):
+    await release.wait()
+    return page("Trang phản hồi chậm", FILLER)
+
+
+def serper_handler(base_url: str):
+    links = ["/slow", "/exam", "/pdf", "/dorm", "/news"]
+
+    def handle(body: dict):
+        return {"organic": [
+            {"title": f"Kết quả {i}", "link": f"{base_url}{path}",
+             "snippet": f"Thông tin mới nhất về {path.strip('/')} dành cho sinh viên năm học 2024-2025."}
+            for i, path in enumerate(links)
+        ]}
+    return handle
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-timeout", type=float, default=1.0)
+    parser.add_argument("--budget", type=int, default=600, help="token budget for ranked passages")
+    parser.add_argument("--top-n", type=int, default=5)
+    args = parser.parse_args()
+
+    global release
+    release = asyncio.Event()
+    routes = {("GET", path): (lambda html: lambda body: html)(html) for path, html in PAGES.items()}
+    routes[("GET", "/pdf")] = lambda body: (200, {"not": "html"})
+    routes[("GET", "/slow")] = slow_page
+
+    async with StandInServer(routes) as site, httpx.AsyncClient() as client:
+        async with StandInServer({("POST", "/search"): serper_handler(site.url)}) as serper_site:
+            serper = SerperClient(client, api_key="benchmark", base_url=serper_site.url)
+            results = await serper.search(QUESTION)
+
+            summary = serper.format_results(results, serper.k)
+            print(f"summary: {count_tokens(summary):5d} tokens")
+
+            start = time.perf_counter()
+            pages = await asyncio.gather(*(
+                web_reader.fetch_page(r["link"], client, timeout=args.page_timeout) for r in results["organic"]
+            ))
+            print(f"pages:   {sum(p is not None for p in pages)}/{len(pages)} fetched "
+                  f"in {(time.perf_counter() - start) * 1000:.0f} ms  {web_reader.reader_stats}")
+
+            start = time.perf_counter()
+            context = await web_reader.build_web_context(QUESTION, [results], top_n=args.top_n,
+                                                          token_budget=args.budget, page_timeout=args.page_timeout,
+                                                          client=client)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"reader:  {count_tokens(context):5d} tokens in {elapsed:.0f} ms "
+                  f"(budget {args.budget}, page timeout {args.page_timeout:.1f} s)\n")
+            print(context)
+            release.set()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+How often the database fast path fires, and what it saves.
+
+1. Runs the rule-based planner over the labelled routing set and reports
+   how many database questions it answers directly, and any non-database
+   questions it wrongly claims; then over questions that mention a room or
+   MSSV but ask something the lookup tools cannot answer, all of which
+   should go to the LLM.
+2. Runs the fast-path database questions through the graph twice, with
+   fixed-latency fake LLM calls and an in-memory MCP server:
+
+       llm        routing LLM call + tool-selection LLM call (which picks
+                  the same tools the planner would)
+       fast_path  tools called directly from the recognized entities
+
+   and reports the average latency and LLM calls per request.
+
+    python -m benchmarks.db_fast_path_report --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_SCHEDULER", "false")  # the fake model has no rate limits to respect
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import app.rag.agentic as agentic
+from app.rag.db_fast_path import plan_tool_calls
+from benchmarks.fakes import FixedLatencyChatModel
+
+EVAL_PATH = Path(__file__).resolve().parent / "data" / "route_eval.jsonl"
+
+# An entity is mentioned, but the question is about something else (or more)
+NOT_LOOKUPS = [
+    "SV001 cần làm gì để gia hạn hợp đồng?",
+    "Sinh viên SV004 ở phòng nào và khi nào phải đóng tiền điện?",
+    "Phòng A102 có được nấu ăn không?",
+    "Phòng B201 mấy giờ đóng cửa?",
+    "SV007 bị mất thẻ sinh viên thì làm lại ở đâu?",
+    "Tiền phòng C100 mỗi tháng là bao nhiêu?",
+    "Phòng D303 bị hỏng điều hòa thì báo ai?",
+    "What is the curfew for room A201?",
+]
+
+
+class ToolPickingChatModel(FixedLatencyChatModel):
+    """Routes everything to 'database' and picks the tools the planner would"""
+    calls: int = 0
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        human = [m for m in messages if isinstance(m, HumanMessage)]
+        tool_calls = plan_tool_calls(human[-1].content) if human else None
+        message = AIMessage(content=self.reply, tool_calls=tool_calls or [])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class InMemoryMCPServer:
+    """Read-only MCP tools answering from a fixed seed, with a small query delay"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def get_student_info(self, mssv: str) -> dict:
+        await asyncio.sleep(self.latency)
+        return {"ok": True, "student": {"mssv": mssv, "ten": "Nguyễn Văn A", "nam_sinh": 2004,
+                                        "room_id": "A100", "building": "A", "floor": 1}}
+
+    async def get_room_info(self, room_id: str) -> dict:
+        await asyncio.sleep(self.latency)
+        return {"ok": True, "room": {"room_id": room_id, "building": room_id[0], "floor": int(room_id[1]), "capacity": 4},
+                "students": [], "current_students": 0, "available_slots": 4}
+
+    async def list_available_rooms(self) -> dict:
+        await asyncio.sleep(self.latency)
+        rooms = [{"room_id": f"A10{i}", "building": "A", "floor": 1, "capacity": 4, "available_slots": 2} for i in range(4)]
+        return {"ok": True, "available_rooms": rooms, "total": len(rooms)}
+
+
+def coverage_report(examples: List[dict]) -> List[str]:
+    database = [e for e in examples if e["route"] == "database"]
+    fired = [e for e in database if plan_tool_calls(e["question"])]
+    false_hits = [e for e in examples if e["route"] != "database" and plan_tool_calls(e["question"])]
+
+    print(f"database questions:   {len(database)}")
+    print(f"fast path fired:      {len(fired)} ({len(fired) / len(database):.0%})")
+    print(f"non-database claimed: {len(false_hits)}")
+    for e in false_hits:
+        print(f"  ! {e['question']}")
+    not_lookups = [q for q in NOT_LOOKUPS if plan_tool_calls(q)]
+    print(f"entity, not a lookup: {len(not_lookups)} of {len(NOT_LOOKUPS)} claimed")
+    for question in not_lookups:
+        print(f"  ! {question}")
+    for e in database:
+        plan = plan_tool_calls(e["question"])
+        label = ", ".join(f"{c['name']}({', '.join(c['args'].values())})" for c in plan) if plan else "-> LLM"
+        print(f"  {e['question'][:60]:<60} {label}")
+    return [e["question"] for e in fired]
+
+
+async def run_mode(questions: List[str], fast_path: bool, model: ToolPickingChatModel):
+    agentic.DB_FAST_PATH = fast_path
+    graph = agentic.get_graph()
+    latencies = []
+    model.calls = 0
+    for question in questions:
+        start = time.perf_counter()
+        result = await graph.ainvoke(agentic.build_initial_state(question))
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result["route"] == "database" and not result["error"], result
+    label = "fast_path" if fast_path else "llm"
+    print(f"{label:>9} mean={statistics.mean(latencies):8.2f} ms  "
+          f"llm_calls/request={model.calls / len(questions):.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake LLM call")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="seconds per fake MySQL query")
+    args = parser.parse_args()
+
+    with open(EVAL_PATH, encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    questions = coverage_report(examples)
+    print()
+
+    model = ToolPickingChatModel(reply="database", latency=args.latency)
+    agentic.llm = agentic.llm_with_db_tools = agentic.llm_with_web_tools = model
+    agentic.mcp_server = InMemoryMCPServer(args.db_latency)
+    agentic.ANSWER_CACHE_ENABLED = False
+    agentic._graph = None
+
+    await run_mode(questions, fast_path=False, model=model)
+    await run_mode(questions, fast_path=True, model=model)
+    print(json.dumps(agentic.db_fast_path_snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Stand-ins used by the benchmarks so they run without network access
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FixedLatencyChatModel(BaseChatModel):
+    """
+    Chat model that answers every prompt with the same text after a fixed delay.
+
+    With blocking=True the delay is a time.sleep() inside the async path,
+    reproducing a synchronous client call made from the event loop.
+    """
+    reply: str = "database"
+    latency: float = 0.2
+    blocking: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fixed-latency-fake"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return self._result()
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class StreamingChatModel(FixedLatencyChatModel):
+    """
+    Fixed-latency model that also streams: the first word arrives after
+    `latency` seconds and each further word `chunk_delay` seconds later.
+
+    Inside astream_events LangChain streams ainvoke() calls as well, so
+    routing and tool-selection calls get the same reply word by word.
+    """
+    chunk_delay: float = 0.02
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.chunk_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+
+class LexicalOverlapScorer:
+    """
+    Deterministic stand-in for the rerank cross-encoder: the share of query
+    words found in the passage. Each call sleeps `overhead_ms` plus
+    `per_pair_ms` per pair to mimic CPU inference cost.
+    """
+
+    def __init__(self, overhead_ms: float = 0.0, per_pair_ms: float = 0.0):
+        self.overhead_ms = overhead_ms
+        self.per_pair_ms = per_pair_ms
+        self.calls = 0
+
+    def load(self):
+        pass
+
+    def score(self, pairs):
+        self.calls += 1
+        time.sleep((self.overhead_ms + self.per_pair_ms * len(pairs)) / 1000)
+        scores = []
+        for query, passage in pairs:
+            words = set(query.lower().split())
+            scores.append(len(words & set(passage.lower().split())) / len(words) if words else 0.0)
+        return scores
@@ -0,0 +1,411 @@
+"""
+Offline load test of the whole server: capacity before a semester rush.
+
+Boots server.app under uvicorn, on its own thread and event loop in this
+process, with local stand-ins for every upstream:
+- OpenAI chat/embeddings and Serper search + result pages: one
+  StandInServer on localhost, each call sleeping its configured latency
+  (+-50% jitter). Embeddings are hashed bags of words, so the semantic
+  router and vector search behave lexically; chat replies route, select
+  tools (the database fast-path planner, or web_search) and answer.
+- Qdrant: qdrant-client's in-memory local mode, seeded with --kb-chunks
+  regulation chunks.
+- MySQL: benchmarks.sqlite_mysql, the tables of init_database.sql in
+  SQLite behind the aiomysql API.
+
+--users virtual students then replay the web client's requests for
+--duration seconds: log in (/api/auth/login), list their chats, open a new
+chat and ask questions, each one saving the user message, refreshing the
+session list, naming a new chat after its first question, calling
+/api/generate/search and saving the answer (/api/chat/*), with think time
+in between. Questions come from benchmarks/data/route_eval.jsonl in
+--mix proportions per graph route; database mutations are left out so
+runs stay repeatable.
+
+The report gives throughput and p50/p95/p99 latency per endpoint and per
+graph route (cached answers counted apart) and is saved as JSON, by
+default under benchmarks/results/ named after the commit; --baseline
+prints the change against an earlier report.
+
+    python -m benchmarks.load_test --users 50 --duration 60
+    python -m benchmarks.load_test --users 50 --duration 60 --baseline benchmarks/results/load_test_13b5304.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks import sqlite_mysql
+from benchmarks.standins import (
+    StandInServer,
+    chat_completion_response,
+    hashed_embedding,
+    hashed_embeddings_handler,
+    serper_search_handler
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+QUESTIONS_PATH = PROJECT_ROOT / "benchmarks" / "data" / "route_eval.jsonl"
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+PASSWORD = "loadtest-password"
+ANSWER = "Theo quy định hiện hành của ký túc xá, sinh viên cần liên hệ ban quản lý để được hướng dẫn chi tiết."
+PAGE = """<html><head><title>Tin tức</title></head><body><article>
+<p>Bản tin cập nhật hôm nay với các thông tin mới nhất về thời tiết, giá cả thị trường và sự kiện thể thao trong nước.</p>
+<p>Các chuyên gia dự báo tình hình sẽ tiếp tục thay đổi trong những ngày tới, người dân nên theo dõi thông báo chính thức.</p>
+</article></body></html>"""
+ROUTING_QUESTION = re.compile(r"Question:\s*(.+)")
+
+# app modules read the upstream URLs from the environment when first
+# imported, so they are imported inside functions, after main() sets it
+
+
+def jittered(latency: float) -> float:
+    return latency * random.uniform(0.5, 1.5)
+
+
+def load_questions(mix: dict) -> dict:
+    """Questions per graph route, without the database mutations"""
+    from app.rag.db_fast_path import MUTATION  # imports no clients
+
+    questions = defaultdict(list)
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        for line in f:
+            item = json.loads(line)
+            if item["route"] in mix and not MUTATION.search(item["question"]):
+                questions[item["route"]].append(item["question"])
+    return dict(questions)
+
+
+def chat_handler(routes_by_question: dict, latency: float):
+    """OpenAI /v1/chat/completions answering the pipeline's routing, tool selection and answer calls"""
+    from app.rag.db_fast_path import plan_tool_calls
+
+    async def handle(body: dict):
+        await asyncio.sleep(jittered(latency))
+        messages = body.get("messages", [])
+        question = next((str(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+
+        if body.get("tools") and not any(m.get("role") == "tool" for m in messages):
+            names = {t["function"]["name"] for t in body["tools"]}
+            if "web_search" in names:
+                return chat_completion_response(body, tool_calls=[{"name": "web_search", "arguments": {"query": question}}])
+            calls = plan_tool_calls(question) or [{"name": "list_available_rooms", "args": {}}]
+            return chat_completion_response(body, tool_calls=[{"name": c["name"], "arguments": c["args"]} for c in calls])
+
+        for message in messages:
+            match = ROUTING_QUESTION.search(str(message.get("content") or ""))
+            if message.get("role") == "system" and match:
+                return chat_completion_response(body, routes_by_question.get(match.group(1).strip(), "rag"))
+        return chat_completion_response(body, ANSWER)
+    return handle
+
+
+def upstream_routes(args, routes_by_question: dict, link_base: str, dims: int) -> dict:
+    async def serper(body: dict):
+        await asyncio.sleep(jittered(args.serper_latency))
+        return serper_search_handler(body, link_base)
+
+    async def page(body: dict):
+        await asyncio.sleep(jittered(args.page_latency))
+        return PAGE
+
+    return {
+        ("POST", "/v1/chat/completions"): chat_handler(routes_by_question, args.llm_latency),
+        ("POST", "/v1/embeddings"): hashed_embeddings_handler(dims, args.embed_latency),
+        ("POST", "/search"): serper,
+        ("GET", "/page"): page,
+    }
+
+
+async def seed_knowledge_base(qdrant, questions: dict, chunks: int, dims: int):
+    """In-memory collection: one chunk answering each RAG question plus synthetic regulations"""
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import PointStruct
+
+    from app.core.schenma.reponse_schenma import DocumentEbedingRequest
+    from benchmarks.bench_hybrid_retrieval import make_corpus
+
+    await qdrant.client.close()
+    qdrant.client = AsyncQdrantClient(location=":memory:")
+    await qdrant.create_collection()
+
+    texts = [f"{q} {ANSWER}" for q in questions.get("rag", [])]
+    texts += [text for _, text in make_corpus(random.Random(0), max(chunks - len(texts), 0))]
+    points = []
+    for i, text in enumerate(texts):
+        request = DocumentEbedingRequest(
+            doc_id=f"kb_{i}", context=text, embeding=hashed_embedding(text, dims),
+            chunk_id="0", total_chunks=1, source="load_test"
+        )
+        points.append(PointStruct(id=i, vector=request.embeding, payload=qdrant.build_payload(request)))
+    await qdrant.client.upsert(collection_name=qdrant.collection_name, points=points)
+
+
+def seed_users(db, users: int):
+    from app.core.services.auth_service import get_password_hash
+
+    password_hash = get_password_hash(PASSWORD)  # bcrypt is slow, every account shares one hash
+    db.executemany(
+        "INSERT INTO users (username, password_hash, role, mssv) VALUES (?, ?, 'user', ?)",
+        [(f"loadtest_{i}", password_hash, f"SV{i + 1:03d}") for i in range(users)]
+    )
+
+
+class Recorder:
+    """Latency samples per endpoint and per graph route, from the end of the warm-up"""
+
+    def __init__(self, warmup_until: float):
+        self.warmup_until = warmup_until
+        self.endpoints = defaultdict(list)
+        self.routes = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.route_errors = defaultdict(int)
+
+    async def call(self, client, endpoint: str, url: str, route_of=None, **kwargs):
+        method = endpoint.split(" ", 1)[0]
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else None
+            ok = response.status_code < 400
+        except Exception as e:
+            print(f"{endpoint} failed: {e!r}", file=sys.stderr)
+            response, body, ok = None, None, False
+        elapsed = time.perf_counter() - start
+
+        if start >= self.warmup_until:
+            self.endpoints[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+            if route_of is not None and ok:
+                route = route_of(body)
+                self.routes[route].append(elapsed)
+                if not body.get("ok"):
+                    self.route_errors[route] += 1
+        return body if ok else None
+
+
+def percentile(samples: list, q: float) -> float:
+    return samples[int(q * (len(samples) - 1))]
+
+
+def summarize(samples: list, errors: int, window: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / window, 3),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 1),
+        "max_ms": round(samples[-1] * 1000, 1),
+    }
+
+
+def search_route(body: dict) -> str:
+    return "cached" if body.get("cached") else body.get("route", "unknown")
+
+
+async def virtual_user(index: int, client, recorder: Recorder, args, questions: dict, weights: dict, stop_at: float):
+    rng = random.Random(args.seed + index)
+    routes, shares = list(weights), list(weights.values())
+
+    async def think():
+        await asyncio.sleep(min(rng.expovariate(1 / args.think_time), stop_at - time.perf_counter()) if args.think_time else 0)
+
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+    while time.perf_counter() < stop_at:
+        # one visit: log in, list the chats, then ask in a new chat
+        login = await recorder.call(client, "POST /api/auth/login", "/api/auth/login",
+                                    json={"username": f"loadtest_{index}", "password": PASSWORD})
+        if login is None:
+            await think()
+            continue
+        headers = {"Authorization": f"Bearer {login['access_token']}"}
+        sessions = await recorder.call(client, "GET /api/chat/sessions", "/api/chat/sessions", headers=headers)
+        if sessions and rng.random() < args.reopen_share:
+            session_id = rng.choice(sessions)["session_id"]
+            await recorder.call(client, "GET /api/chat/sessions/{session_id}", f"/api/chat/sessions/{session_id}",
+                                headers=headers)
+        else:
+            created = await recorder.call(client, "POST /api/chat/sessions", "/api/chat/sessions",
+                                          json={"title": "New Chat"}, headers=headers)
+            if created is None:
+                continue
+            session_id = created["session_id"]
+
+        for turn in range(args.questions_per_visit):
+            if time.perf_counter() >= stop_at:
+                return
+            await think()
+            question = rng.choice(questions[rng.choices(routes, shares)[0]])
+            await recorder.call(client, "POST /api/chat/messages", "/api/chat/messages", headers=headers,
+                                json={"session_id": session_id, "role": "user", "content": question})
+            await recorder.call(client, "GET /api/chat/sessions", "/api/chat/sessions", headers=headers)
+            if turn == 0:
+                await recorder.call(client, "PUT /api/chat/sessions/{session_id}/title",
+                                    f"/api/chat/sessions/{session_id}/title", params={"title": question[:30]},
+                                    headers=headers)
+            answer = await recorder.call(client, "POST /api/generate/search", "/api/generate/search",
+                                         route_of=search_route, headers=headers,
+                                         json={"question": question, "session_id": session_id})
+            await recorder.call(client, "POST /api/chat/messages", "/api/chat/messages", headers=headers,
+                                json={"session_id": session_id, "role": "assistant",
+                                      "content": (answer or {}).get("answer") or "No response from server."})
+        await think()
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(title: str, rows: dict, baseline: dict):
+    print(f"\n{title:<42} {'count':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in sorted(rows.items()):
+        line = (f"{name:<42} {row['count']:>7} {row['errors']:>5} {row['throughput_rps']:>8.2f} "
+                f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+        if name in baseline:
+            before = baseline[name]
+            line += f"   p95 {row['p95_ms'] - before['p95_ms']:+.1f} ms, rps {row['throughput_rps'] - before['throughput_rps']:+.2f}"
+        print(line)
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        route, _, share = part.partition("=")
+        mix[route.strip()] = float(share)
+    return mix
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="Concurrent virtual students")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load, warm-up included")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load left out of the report")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Virtual users start spread over this many seconds")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between a user's actions")
+    parser.add_argument("--questions-per-visit", type=int, default=3)
+    parser.add_argument("--reopen-share", type=float, default=0.3, help="Share of visits continuing an old chat")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("rag=0.6,database=0.25,web_search=0.15"))
+    parser.add_argument("--llm-latency", type=float, default=0.6)
+    parser.add_argument("--embed-latency", type=float, default=0.1)
+    parser.add_argument("--serper-latency", type=float, default=0.4)
+    parser.add_argument("--page-latency", type=float, default=0.3)
+    parser.add_argument("--mysql-latency", type=float, default=0.002)
+    parser.add_argument("--kb-chunks", type=int, default=500, help="Chunks in the in-memory knowledge base")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="Report path (default benchmarks/results/load_test_<commit>.json)")
+    parser.add_argument("--baseline", type=Path, default=None, help="Earlier report to compare against")
+    parser.add_argument("--server-log", default=os.devnull, help="Where the server's own output goes")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    questions_by_route = load_questions(args.mix)
+    routes_by_question = {q: route for route, qs in questions_by_route.items() for q in qs}
+
+    routes = {}
+    async with StandInServer(routes) as upstream:
+        # environment first: the app reads it at import time
+        os.environ.update(
+            OPENAI_API_KEY="load-test", OPENAI_BASE_URL=f"{upstream.url}/v1",
+            SERPER_API_KEY="load-test", SERPER_URL=upstream.url,
+            OPENAI_SCHEDULER="false",  # the stand-ins have no rate limits to respect
+            WEB_READER_ALLOW_PRIVATE="true"  # and serve the result pages on 127.0.0.1
+        )
+        os.environ.pop("OPENAI_API_BASE", None)
+        from app.core.config.config import EMBEDDING_DIMS
+        routes.update(upstream_routes(args, routes_by_question, f"{upstream.url}/page", EMBEDDING_DIMS))
+
+        db = sqlite_mysql.create_database()
+        seed_users(db, args.users)
+        sqlite_mysql.install(db, args.mysql_latency)
+
+        import uvicorn
+        # the registry's remote Qdrant client is swapped for the in-memory one before any request
+        warnings.filterwarnings("ignore", message="Failed to obtain server version")
+        import app.rag.sparse_index as sparse_index
+        from app.core.services.client_registry import get_client_registry
+        from server import app
+
+        scratch = tempfile.TemporaryDirectory()
+        sparse_index._sparse_index = sparse_index.SparseIndex(Path(scratch.name) / "sparse_index.json")
+        await seed_knowledge_base(get_client_registry().qdrant, questions_by_route, args.kb_chunks, EMBEDDING_DIMS)
+
+        sock = socket.socket()
+        # accepted connections inherit it; without it Nagle + delayed ACK add 40 ms to keep-alive requests
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False, lifespan="on"))
+
+        import httpx
+        log = open(args.server_log, "w")
+        with contextlib.redirect_stdout(log):
+            # own thread and event loop: the stand-ins and the load generator do not queue behind the server
+            serving = threading.Thread(target=lambda: asyncio.run(server.serve(sockets=[sock])), daemon=True)
+            serving.start()
+            while not server.started:
+                await asyncio.sleep(0.05)
+
+            base_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+            limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+                start = time.perf_counter()
+                recorder = Recorder(warmup_until=start + args.warmup)
+                stop_at = start + args.duration
+                await asyncio.gather(*(
+                    virtual_user(i, client, recorder, args, questions_by_route, args.mix, stop_at)
+                    for i in range(args.users)
+                ))
+                window = time.perf_counter() - recorder.warmup_until
+
+            server.should_exit = True
+            await asyncio.to_thread(serving.join)
+        log.close()
+        scratch.cleanup()
+
+    samples = [s for values in recorder.endpoints.values() for s in values]
+    report = {
+        "commit": current_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "window_s": round(window, 2),
+        "total": summarize(samples, sum(recorder.errors.values()), window),
+        "endpoints": {name: summarize(s, recorder.errors[name], window) for name, s in recorder.endpoints.items()},
+        "routes": {name: summarize(s, recorder.route_errors[name], window) for name, s in recorder.routes.items()},
+        "upstream_requests": dict(upstream.requests),
+        "db_pool_waits": sum(pool.waits for pool in sqlite_mysql.pools),
+    }
+
+    output = args.output or RESULTS_DIR / f"load_test_{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else {}
+    print(f"commit {report['commit']}, {args.users} users, {report['window_s']}s measured, "
+          f"{report['total']['throughput_rps']:.2f} req/s, {report['total']['errors']} errors")
+    print_table("endpoint", report["endpoints"], baseline.get("endpoints", {}))
+    print_table("graph route (/api/generate/search)", report["routes"], baseline.get("routes", {}))
+    print(f"\nupstream requests: {report['upstream_requests']}, db pool waits: {report['db_pool_waits']}")
+    print(f"report saved to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
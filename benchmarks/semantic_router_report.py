@@ -0,0 +1,120 @@
+"""
+Offline accuracy and latency report for the semantic router.
+
+Embeds the labelled examples (app/rag/route_examples.json) and the labelled
+evaluation set once, caching the vectors in an .npz file so later runs need
+no network, then reports per-route accuracy, LLM fallback rate and routing
+latency. --hashed uses a hashed bag-of-words stand-in instead (no key
+needed; lexical only, so expect lower accuracy than with the model the
+thresholds were tuned for). With --compare-llm the LLM router is scored on
+the same set.
+
+    python -m benchmarks.semantic_router_report
+    python -m benchmarks.semantic_router_report --hashed
+    python -m benchmarks.semantic_router_report --compare-llm
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config.config import EMBEDDING_DIMS
+from app.core.embeding.openai_embeddings import embed_texts
+from app.rag.semantic_router import SemanticRouter
+from benchmarks.standins import hashed_embedding
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+class CachedEmbedder:
+    """Embeds through the OpenAI helper once and serves later runs from disk"""
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        self.vectors: Dict[str, np.ndarray] = {}
+        if cache_path.exists():
+            data = np.load(cache_path, allow_pickle=False)
+            self.vectors = dict(zip(data["texts"].tolist(), data["vectors"]))
+
+    async def __call__(self, texts: List[str]) -> List[List[float]]:
+        missing = [t for t in dict.fromkeys(texts) if t not in self.vectors]
+        if missing:
+            for text, vector in zip(missing, await embed_texts(missing)):
+                self.vectors[text] = np.asarray(vector, dtype=np.float32)
+            self.save()
+        return [self.vectors[t] for t in texts]
+
+    def save(self):
+        texts = list(self.vectors)
+        np.savez(self.cache_path, texts=np.asarray(texts), vectors=np.stack([self.vectors[t] for t in texts]))
+
+
+async def hashed_embedder(texts: List[str]) -> List[List[float]]:
+    return [hashed_embedding(t, EMBEDDING_DIMS) for t in texts]
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval-set", type=Path, default=DATA_DIR / "route_eval.jsonl")
+    parser.add_argument("--cache", type=Path, default=DATA_DIR / "route_embeddings.npz")
+    parser.add_argument("--hashed", action="store_true", help="Hashed bag-of-words embeddings instead of OpenAI")
+    parser.add_argument("--compare-llm", action="store_true", help="Also score the LLM router (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    with open(args.eval_set, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    if not args.hashed and not args.cache.exists() and not os.getenv("OPENAI_API_KEY"):
+        parser.error(f"{args.cache.name} is not there yet and embedding needs OPENAI_API_KEY; use --hashed to run offline")
+    embedder = hashed_embedder if args.hashed else CachedEmbedder(args.cache)
+    router = SemanticRouter(embed_fn=embedder)
+    await router.initialize()
+    embeddings = await embedder([row["question"] for row in rows])
+
+    correct, fallbacks, latencies = Counter(), Counter(), []
+    totals = Counter(row["route"] for row in rows)
+    for row, embedding in zip(rows, embeddings):
+        start = time.perf_counter()
+        decision = router.route(embedding)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if decision.route is None:
+            fallbacks[row["route"]] += 1
+        elif decision.route == row["route"]:
+            correct[row["route"]] += 1
+
+    decided = len(rows) - sum(fallbacks.values())
+    print(f"Semantic router on {len(rows)} questions, {'hashed stand-in' if args.hashed else 'openai'} embeddings "
+          f"(min_score={router.min_score}, min_margin={router.min_margin})")
+    print(f"{'route':>12} {'n':>4} {'correct':>8} {'fallback':>9}")
+    for route in router.routes:
+        print(f"{route:>12} {totals[route]:>4} {correct[route]:>8} {fallbacks[route]:>9}")
+    print(f"accuracy on decided: {sum(correct.values()) / max(decided, 1):.1%}")
+    print(f"fallback rate:       {sum(fallbacks.values()) / len(rows):.1%}")
+    print(f"routing latency:     p50={percentile(latencies, 50):.3f} ms p95={percentile(latencies, 95):.3f} ms "
+          f"(excludes the query embedding call)")
+
+    if args.compare_llm:
+        from app.rag.agentic import llm_route
+
+        llm_correct, llm_latencies = 0, []
+        for row in rows:
+            start = time.perf_counter()
+            route = await llm_route(row["question"])
+            llm_latencies.append((time.perf_counter() - start) * 1000)
+            llm_correct += route == row["route"]
+        print(f"LLM router accuracy: {llm_correct / len(rows):.1%}")
+        print(f"LLM router latency:  p50={percentile(llm_latencies, 50):.1f} ms p95={percentile(llm_latencies, 95):.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,222 @@
+"""
+In-process stand-in for the aiomysql pool, backed by an in-memory SQLite
+database with the tables of init_database.sql.
+
+install() replaces aiomysql.create_pool / aiomysql.connect, so
+MySQLService and the MCP tools run their own SQL unchanged: %s placeholders
+and NOW() are rewritten for SQLite, every statement waits `latency`
+seconds (the network round trip) and a pool hands out at most `maxsize`
+connections, queueing the rest like aiomysql does. All connections share
+one SQLite connection in autocommit mode; begin/rollback are bookkeeping
+only, which is enough for the read-mostly load tests.
+"""
+import asyncio
+import re
+import sqlite3
+from typing import Optional
+
+import aiomysql
+
+SCHEMA = """
+CREATE TABLE rooms (
+    room_id TEXT PRIMARY KEY,
+    capacity INTEGER NOT NULL DEFAULT 4,
+    building TEXT NOT NULL,
+    floor INTEGER NOT NULL,
+    room_number INTEGER NOT NULL
+);
+CREATE TABLE students (
+    mssv TEXT PRIMARY KEY,
+    ten TEXT NOT NULL,
+    nam_sinh INTEGER NOT NULL,
+    room_id TEXT REFERENCES rooms(room_id) ON DELETE SET NULL
+);
+CREATE TABLE room_status (
+    room_id TEXT PRIMARY KEY REFERENCES rooms(room_id) ON DELETE CASCADE,
+    current_students INTEGER NOT NULL DEFAULT 0,
+    capacity INTEGER NOT NULL DEFAULT 4,
+    available_slots INTEGER NOT NULL DEFAULT 4,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'user',
+    mssv TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP NULL,
+    is_active BOOLEAN DEFAULT TRUE
+);
+CREATE TABLE chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    title TEXT DEFAULT 'New Chat',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE INDEX idx_user_sessions ON chat_sessions (user_id, created_at DESC);
+CREATE TABLE chat_messages (
+    message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_session_messages ON chat_messages (session_id, created_at ASC);
+CREATE INDEX idx_session_message_id ON chat_messages (session_id, message_id);
+"""
+
+# Every pool handed out, for the pool wait counts
+pools = []
+
+_PLACEHOLDER = re.compile(r"%s")
+_NOW = re.compile(r"\bNOW\(\)", re.IGNORECASE)
+
+
+def to_sqlite(query: str) -> str:
+    return _NOW.sub("CURRENT_TIMESTAMP", _PLACEHOLDER.sub("?", query))
+
+
+def create_database(students_per_room: int = 2) -> sqlite3.Connection:
+    """Rooms A100-D403 as in init_database.sql, with `students_per_room` students each"""
+    db = sqlite3.connect(":memory:", isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES,
+                         check_same_thread=False)
+    db.execute("PRAGMA foreign_keys = ON")
+    db.executescript(SCHEMA)
+    rooms = [(f"{b}{f}0{n}", 4, b, f, f * 100 + n) for b in "ABCD" for f in range(1, 5) for n in range(4)]
+    db.executemany("INSERT INTO rooms VALUES (?, ?, ?, ?, ?)", rooms)
+    students = [(f"SV{i * students_per_room + j + 1:03d}", f"Sinh viên {i * students_per_room + j + 1}", 2003, room[0])
+                for i, room in enumerate(rooms) for j in range(students_per_room)]
+    db.executemany("INSERT INTO students VALUES (?, ?, ?, ?)", students)
+    db.execute("""
+        INSERT INTO room_status (room_id, current_students, capacity, available_slots)
+        SELECT r.room_id, COUNT(s.mssv), r.capacity, r.capacity - COUNT(s.mssv)
+        FROM rooms r LEFT JOIN students s ON r.room_id = s.room_id
+        GROUP BY r.room_id, r.capacity
+    """)
+    return db
+
+
+class _Awaitable:
+    """Result usable both as `await x` and `async with x`, like aiomysql's context managers"""
+
+    def __init__(self, coro, exit_fn=None):
+        self._coro = coro
+        self._exit_fn = exit_fn
+        self._obj = None
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self):
+        self._obj = await self._coro
+        return self._obj
+
+    async def __aexit__(self, *exc):
+        if self._exit_fn is not None:
+            await self._exit_fn(self._obj)
+        return False
+
+
+class Cursor:
+    def __init__(self, connection: "Connection", as_dict: bool):
+        self.connection = connection
+        self.as_dict = as_dict
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    async def execute(self, query: str, args=None):
+        await asyncio.sleep(self.connection.latency)
+        cursor = self.connection.db.execute(to_sqlite(query), tuple(args or ()))
+        columns = [d[0] for d in cursor.description or ()]
+        rows = cursor.fetchall()
+        self._rows = [dict(zip(columns, row)) for row in rows] if self.as_dict else rows
+        self.rowcount = cursor.rowcount if cursor.description is None else len(rows)
+        self.lastrowid = cursor.lastrowid
+        return self.rowcount
+
+    async def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    async def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    async def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, db: sqlite3.Connection, latency: float, pool: Optional["Pool"] = None):
+        self.db = db
+        self.latency = latency
+        self.pool = pool
+        self._in_transaction = False
+
+    def cursor(self, cursor_class=None) -> _Awaitable:
+        async def make():
+            return Cursor(self, as_dict=cursor_class is aiomysql.DictCursor)
+
+        async def close(cursor):
+            await cursor.close()
+        return _Awaitable(make(), close)
+
+    async def begin(self):
+        self._in_transaction = True
+
+    async def commit(self):
+        self._in_transaction = False
+
+    async def rollback(self):
+        self._in_transaction = False
+
+    def get_transaction_status(self) -> bool:
+        return self._in_transaction
+
+    def close(self):
+        pass
+
+
+class Pool:
+    def __init__(self, db: sqlite3.Connection, latency: float, maxsize: int):
+        self.db = db
+        self.latency = latency
+        self.maxsize = maxsize
+        self._slots = asyncio.Semaphore(maxsize)
+        self.waits = 0
+
+    def acquire(self) -> _Awaitable:
+        async def get():
+            if self._slots.locked():
+                self.waits += 1
+            await self._slots.acquire()
+            return Connection(self.db, self.latency, self)
+
+        async def put_back(conn):
+            self.release(conn)
+        return _Awaitable(get(), put_back)
+
+    def release(self, conn: Connection):
+        self._slots.release()
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+def install(db: sqlite3.Connection, latency: float = 0.0):
+    """Serve every aiomysql pool and connection from `db`"""
+    async def create_pool(maxsize: int = 10, **kwargs):
+        pools.append(Pool(db, latency, maxsize))
+        return pools[-1]
+
+    async def connect(**kwargs):
+        return Connection(db, latency)
+
+    aiomysql.create_pool = create_pool
+    aiomysql.connect = connect
@@ -0,0 +1,207 @@
+"""
+Minimal local HTTP/1.1 stand-in server for benchmarks.
+
+Routes are (method, path-prefix) -> handler(body: dict) returning a JSON-able
+object, an (status, object) tuple or an (status, body, content_type) tuple.
+Keep-alive is honoured, and the
+server counts TCP connections and requests so benchmarks can show how many
+connections a client opened.
+"""
+import asyncio
+import json
+import math
+import time
+import zlib
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+Handler = Callable[[dict], Union[Any, Awaitable[Any]]]
+
+
+class StandInServer:
+    def __init__(self, routes: Dict[Tuple[str, str], Handler], latency: float = 0.0, host: str = "127.0.0.1"):
+        self.routes = routes
+        self.latency = latency
+        self.host = host
+        self.port = None
+        self.connections = 0
+        self.requests = Counter()
+        self._server = None
+        self._writers = set()
+        self._tasks = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._serve, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        # let handlers see EOF and return rather than being cancelled at loop shutdown
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=1.0)
+        await self._server.wait_closed()
+
+    def _find(self, method: str, path: str):
+        for (route_method, prefix), handler in self.routes.items():
+            if route_method == method and path.startswith(prefix):
+                return prefix, handler
+        return None, None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        self._tasks.add(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                raw = await reader.readexactly(int(headers.get("content-length", 0)))
+                body = json.loads(raw) if raw else {}
+
+                prefix, handler = self._find(method, path.split("?")[0])
+                content_type = None
+                if handler is None:
+                    status, payload = 404, {"error": "not found"}
+                else:
+                    self.requests[prefix] += 1
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    payload = handler(body)
+                    if asyncio.iscoroutine(payload):
+                        payload = await payload
+                    status = 200
+                    if isinstance(payload, tuple) and len(payload) == 3:
+                        status, payload, content_type = payload
+                    elif isinstance(payload, tuple):
+                        status, payload = payload
+
+                if isinstance(payload, (bytes, str)):
+                    data = payload.encode() if isinstance(payload, str) else payload
+                    content_type = content_type or "text/html; charset=utf-8"
+                else:
+                    data = json.dumps(payload).encode()
+                    content_type = "application/json"
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._tasks.discard(asyncio.current_task())
+            writer.close()
+
+
+def embeddings_handler(dims: int):
+    """OpenAI-compatible /v1/embeddings returning deterministic vectors"""
+    def handle(body: dict):
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, text in enumerate(inputs):
+            seed = sum(map(ord, str(text))) or 1
+            data.append({"object": "embedding", "index": i,
+                         "embedding": [((seed * (j + 1)) % 97) / 97.0 for j in range(dims)]})
+        return {"object": "list", "data": data, "model": body.get("model", ""),
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}}
+    return handle
+
+
+def hashed_embedding(text: str, dims: int) -> list:
+    """Unit-length hashed bag of words: texts sharing words get similar vectors"""
+    vector = [0.0] * dims
+    for word in str(text).lower().split():
+        vector[zlib.crc32(word.strip(".,;:?!()\"'").encode()) % dims] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def hashed_embeddings_handler(dims: int, latency: float = 0.0):
+    """OpenAI-compatible /v1/embeddings whose cosine similarity follows word overlap"""
+    async def handle(body: dict):
+        await asyncio.sleep(latency)
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = [{"object": "embedding", "index": i, "embedding": hashed_embedding(text, dims)}
+                for i, text in enumerate(inputs)]
+        return {"object": "list", "data": data, "model": body.get("model", ""),
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}}
+    return handle
+
+
+def chat_completion_response(body: dict, content: str = "", tool_calls: Optional[List[dict]] = None):
+    """
+    OpenAI chat completion carrying `content` or `tool_calls` ({"name",
+    "arguments"} dicts), as one JSON object or, for stream=true requests,
+    as a server-sent event body
+    """
+    prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in body.get("messages", []))
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content.split()),
+             "total_tokens": prompt_tokens + len(content.split())}
+    calls = [{"id": f"call_{i}", "type": "function",
+              "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])}}
+             for i, call in enumerate(tool_calls or [])]
+    base = {"id": "chatcmpl-standin", "created": int(time.time()), "model": body.get("model", "")}
+    finish_reason = "tool_calls" if calls else "stop"
+
+    if not body.get("stream"):
+        message = {"role": "assistant", "content": content or None}
+        if calls:
+            message["tool_calls"] = calls
+        return {**base, "object": "chat.completion", "usage": usage,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}]}
+
+    chunks = [{"role": "assistant", "content": ""}]
+    chunks += [{"content": word + " "} for word in content.split()]
+    if calls:
+        chunks.append({"tool_calls": [{"index": i, **call} for i, call in enumerate(calls)]})
+    events = [{**base, "object": "chat.completion.chunk",
+               "choices": [{"index": 0, "delta": delta, "finish_reason": None}]} for delta in chunks]
+    events.append({**base, "object": "chat.completion.chunk",
+                   "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+    if (body.get("stream_options") or {}).get("include_usage"):
+        events.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+    text = "".join(f"data: {json.dumps(event, ensure_ascii=False)}\n\n" for event in events) + "data: [DONE]\n\n"
+    return 200, text, "text/event-stream"
+
+
+def qdrant_query_handler(body: dict):
+    """Qdrant REST points/query returning a fixed set of hits"""
+    limit = body.get("limit", 3)
+    return {"status": "ok", "time": 0.0, "result": {"points": [
+        {"id": i, "version": 0, "score": 1.0 - i / 10,
+         "payload": {"content": f"Stand-in chunk {i}", "chunk_id": str(i)}}
+        for i in range(limit)
+    ]}}
+
+
+def qdrant_root_handler(body: dict):
+    return {"title": "qdrant - vector search engine", "version": "1.12.0"}
+
+
+def serper_search_handler(body: dict, link_base: str = "https://example.com"):
+    """Serper /search returning organic results derived from the query"""
+    query = body.get("q", "")
+    return {"searchParameters": {"q": query}, "organic": [
+        {"title": f"{query} - result {i}", "link": f"{link_base}/{i}",
+         "snippet": f"Stand-in snippet {i} for {query}", "position": i + 1}
+        for i in range(body.get("num", 10))
+    ]}
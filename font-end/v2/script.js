@@ -419,10 +419,8 @@ document.addEventListener("DOMContentLoaded", async function () {
     try {
       const response = await fetch("http://127.0.0.1:8000/api/generate/search", {
         method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({ question: userInput }),
+        headers: getAuthHeaders(),
+        body: JSON.stringify({ question: userInput, session_id: currentSessionId }),
       });
 
       // Remove typing indicator
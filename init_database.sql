@@ -169,7 +169,8 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     content TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
-    INDEX idx_session_messages (session_id, created_at ASC)
+    INDEX idx_session_messages (session_id, created_at ASC),
+    INDEX idx_session_message_id (session_id, message_id)
 );
 
 SELECT 'Chat tables created successfully!' as status;
\ No newline at end of file
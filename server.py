@@ -1,12 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.rag.agentic import app as agentic_router
+from fastapi.responses import PlainTextResponse
+from app.rag.agentic import app as agentic_router, RAG_RERANK
 from app.api.auth import router as auth_router
 from app.api.admin import router as admin_router
 from app.api.chat import router as chat_router
 import time
+import asyncio
 from app.startup.startup import init_qdrant_service, get_qdrant_service
 from app.core.services.mysql_service import init_mysql_service, get_mysql_service
+from app.rag.semantic_router import init_semantic_router, get_semantic_router
+from app.core.services.client_registry import init_client_registry, close_client_registry, get_client_registry
+from app.rag.rerank import init_reranker
+from app.rag.sparse_index import init_sparse_index
+from app.rag.metrics import LATENCY_BUCKETS, histogram, render_prometheus
+from app.rag.tracing import TRACE_HEADER, new_trace_id, trace_id_var
 
 
 # tag
@@ -42,8 +50,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods, adjust as needed
     allow_headers=["*"],  # Allows all headers, adjust as needed
+    expose_headers=[TRACE_HEADER],
 )   
 
+def route_template(request: Request) -> str:
+    """Matched route template, so path parameters do not multiply the metric labels"""
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    # newer FastAPI versions resolve included routers lazily and keep the prefixed template here
+    context = (request.scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(context, "path_format", None) or route.path_format
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Give every request a trace id (X-Trace-Id) and time it per route"""
+    trace_id = new_trace_id(request.headers.get(TRACE_HEADER))
+    token = trace_id_var.set(trace_id)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        trace_id_var.reset(token)
+    histogram(
+        "http_request_duration_seconds", LATENCY_BUCKETS,
+        method=request.method,
+        route=route_template(request),
+        status=str(response.status_code)
+    ).observe(time.perf_counter() - start)
+    response.headers[TRACE_HEADER] = trace_id
+    return response
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 # Include routers
 app.include_router(agentic_router, prefix="/api/generate", tags=["RAG Basic"])
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
@@ -68,6 +113,21 @@ async def startup_event():
     mysql_service = get_mysql_service()
     print(f"MySQL service initialized: {mysql_service}")
     
+    # Shared HTTP/Qdrant/MySQL clients for the agent pipeline
+    await init_client_registry()
+    print("Client registry initialized")
+    
+    # Precompute semantic router centroids
+    await init_semantic_router()
+    print(f"Semantic router ready: {get_semantic_router().ready}")
+    
+    # Keyword index for hybrid retrieval, rebuilt from Qdrant if it is stale
+    await init_sparse_index(get_client_registry().qdrant)
+    
+    # Load the rerank model in the background; RAG skips reranking until it is ready
+    if RAG_RERANK:
+        app.state.reranker_loading = asyncio.create_task(init_reranker())
+    
     end = time.perf_counter()
     print(f"Application started in {end - start:.2f} seconds.")
 
@@ -80,3 +140,5 @@ async def shutdown_event():
     mysql_service = get_mysql_service()
     await mysql_service.close_pool()
     print("MySQL connection pool closed.")
+    await close_client_registry()
+    print("Shared clients closed.")